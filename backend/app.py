@@ -1,16 +1,38 @@
 """
 Flask API服务器
 """
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, stream_with_context
 from flask_cors import CORS
 from datetime import datetime, timedelta
-from models import Session, ComexWarehouse, SilverETF, SilverPrice, GoldData, DataLog, init_db
+from config import config
+from models import engine, read_engine, ReadSession, ComexWarehouse, SilverETF, SilverPrice, PriceCandle, GoldData, DataLog, init_db, valid_since
 from data_collector import collect_all_data
+from snapshot_store import snapshot_store
+from rollups import INTERVALS
+from pagination import decode_cursor, keyset_page, page_size
+from projection import projected_dict, projected_query, resolve_fields
+from formats import negotiate, render_rows
+from blob_store import BLOB_FIELDS, load_payload, resolve_payloads
+from retention import start_retention_thread
+from exporter import ExportRequest, stream_export
+from response_cache import cached_route, etag_route, response_cache
+from stream_hub import StreamHub
+from json_provider import FastJSONProvider
+from compression import init_compression
+from cluster import FileLock, FollowerSync, LeaderElection
+from snapshot_segment import SnapshotSegmentWriter, segment_path
 import logging
 import json
+import os
 import threading
 import time
 
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+api = Blueprint('api', __name__)
+
 # ==================== 后台任务 ====================
 
 def background_collector():
@@ -19,24 +41,61 @@ def background_collector():
     while True:
         try:
             collect_all_data()
-            time.sleep(2)  # 每2秒采集一次
+            time.sleep(config.COLLECTOR_INTERVAL)
         except Exception as e:
             logger.error(f"后台采集异常: {e}")
             time.sleep(5)
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# 在应用启动时开启线程
-collector_thread = threading.Thread(target=background_collector, daemon=True)
-collector_thread.start()
+def start_background_tasks():
+    """采集 leader: 启动采集线程，并按保留策略在后台分批清理过期数据"""
+    threading.Thread(target=background_collector, name='collector', daemon=True).start()
+    if config.RETENTION_ENABLED:
+        start_retention_thread(engine.url.database)
 
-# 初始化Flask应用
-app = Flask(__name__)
-CORS(app)
+# ==================== 应用工厂 ====================
 
-@app.route('/')
+def create_app():
+    """创建 Flask 应用
+    多 worker 部署时每个进程各自创建，只有获得 leader 锁的进程运行采集，其余进程同步 leader 的写入
+    """
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    init_compression(app)
+    # 轮询接口的 ETag 与分页游标需要暴露给前端脚本；预检结果缓存，避免每次轮询都发 OPTIONS
+    CORS(app, expose_headers=['ETag', 'X-Next-Cursor', 'X-Last-Confirmed'], max_age=600)
+    app.register_blueprint(api)
+
+    # 初始化数据库 (多个 worker 同时启动时串行执行建表与迁移)
+    db_path = engine.url.database
+    lock_path = config.LEADER_LOCK_PATH or f"{db_path}.leader.lock"
+    with FileLock(f"{lock_path}.init"):
+        init_db()
+
+    # 从数据库加载最新快照，重启后立即可用
+    snapshot_store.seed_from_db(ReadSession)
+
+    # 快照发布时向 SSE 客户端广播 (与接口使用相同的 JSON 编码)
+    app.extensions['stream_hub'] = StreamHub(snapshot_store, dumps=app.json.dumps)
+
+    follower = FollowerSync(db_path, snapshot_store, ReadSession)
+
+    def on_elected():
+        # 接任前补齐上一任 leader 最后提交的数据
+        follower.stop()
+        follower.sync_once()
+        # 快照发布时写入共享内存段，同机的监控脚本直接读取
+        if config.SNAPSHOT_SEGMENT_ENABLED:
+            SnapshotSegmentWriter(segment_path(db_path), snapshot_store).start()
+        start_background_tasks()
+
+    election = LeaderElection(lock_path, on_elected)
+    app.extensions['leader_election'] = election
+    election.start()
+    if not election.is_leader:
+        follower.start()
+    return app
+
+@api.route('/')
 def index():
     """后端状态页，引导至前端"""
     return """
@@ -51,11 +110,11 @@ def index():
     </ul>
     """
 
-# 初始化数据库
-init_db()
-
 # ==================== 辅助函数 ====================
 
+# 单次K线请求的最大数量
+MAX_CANDLES = 5000
+
 def serialize_datetime(obj):
     """序列化datetime对象"""
     if isinstance(obj, datetime):
@@ -68,16 +127,51 @@ def query_to_dict(model_instance):
         return None
     return {c.name: getattr(model_instance, c.name) for c in model_instance.__table__.columns}
 
+# 取值未变化时只延长的确认时间: 不参与最新快照接口的 ETag，最近一次确认时间由 X-Last-Confirmed 响应头给出
+CONFIRMATION_FIELDS = ('valid_until', 'updated_at')
+
+def snapshot_etag(kind):
+    """最新快照接口的 ETag: 按快照版本缓存响应，ETag 只由取值决定"""
+    def confirmed():
+        confirmed_at = snapshot_store.confirmed(kind)
+        return {'X-Last-Confirmed': confirmed_at.strftime('%Y-%m-%d %H:%M:%S')} if confirmed_at else {}
+    return etag_route(lambda: f"{kind}-{snapshot_store.kind_version(kind)}",
+                      ignore=CONFIRMATION_FIELDS, headers=confirmed)
+
+def with_payloads(table, *groups):
+    """快照行只保存审计内容的哈希: 按哈希从 payload_blob 加载，接口字段与内联存储时一致
+    (每个快照版本的响应只生成一次)"""
+    rows = [row for group in groups for row in group.values()]
+    if not any(row.get(f"{field}_hash") for row in rows for field in BLOB_FIELDS[table]):
+        return
+    session = ReadSession()
+    try:
+        for row in rows:
+            resolve_payloads(session, row, BLOB_FIELDS[table])
+    finally:
+        session.close()
+
+def page_args():
+    """历史接口的分页参数 (每页行数, 游标, 响应格式)，参数无效时抛出 ValueError"""
+    return (page_size(request.args.get('limit', type=int)), decode_cursor(request.args.get('cursor')),
+            negotiate(request.args.get('format'), request.accept_mimetypes))
+
 # ==================== 数据采集路由 ====================
 
-@app.route('/api/collect', methods=['POST'])
+@api.route('/api/collect', methods=['POST'])
 def trigger_collection():
-    """手动触发数据采集"""
+    """手动触发数据采集 (只在采集 leader 进程中执行，避免多个进程并发写入)"""
+    if not current_app.extensions['leader_election'].is_leader:
+        return jsonify({
+            'success': False,
+            'message': '当前进程不是采集 leader，请稍后重试'
+        }), 409
     try:
-        collect_all_data()
+        stats = collect_all_data()
         return jsonify({
             'success': True,
             'message': '数据采集成功',
+            'cycle': stats,
             'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
         })
     except Exception as e:
@@ -89,58 +183,40 @@ def trigger_collection():
 
 # ==================== COMEX数据路由 ====================
 
-@app.route('/api/comex/warehouse', methods=['GET'])
+@api.route('/api/comex/warehouse', methods=['GET'])
+@cached_route('comex_warehouse')
 def get_warehouse_data():
     """获取COMEX仓库库存数据"""
     try:
-        session = Session()
+        limit, cursor, fmt = page_args()
+        fields = resolve_fields(ComexWarehouse, request.args.get('fields'))
+        session = ReadSession()
         days = request.args.get('days', 30, type=int)
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        data = session.query(ComexWarehouse).filter(
-            ComexWarehouse.date >= start_date
-        ).order_by(ComexWarehouse.date.desc()).all()
-        
-        result = [query_to_dict(item) for item in data]
+        query = projected_query(session, ComexWarehouse, fields).filter(
+            valid_since(ComexWarehouse, start_date)
+        )
+        result, next_cursor = keyset_page(query, ComexWarehouse, projected_dict, limit, cursor,
+                                          'comex_warehouse', start_date, columns=fields)
         session.close()
         
-        return jsonify({
-            'success': True,
-            'count': len(result),
-            'data': result
-        })
+        return render_rows(fmt, ComexWarehouse, fields, result, next_cursor)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@app.route('/api/comex/latest', methods=['GET'])
+@api.route('/api/comex/latest', methods=['GET'])
+@snapshot_etag('warehouse')
 def get_warehouse_latest():
-    """获取最新库存数据 (COMEX & LME)"""
+    """获取最新库存数据 (COMEX & LME)，读取内存快照"""
     try:
-        session = Session()
-        
-        # 定义需要获取的数据源和金属
-        sources = {
-            'CME': ['silver', 'gold', 'copper'],
-            'LME': ['silver', 'copper']
-        }
-        
         result = {
-            'comex': {},
-            'lme': {}
+            'comex': snapshot_store.get_group('warehouse', 'CME', ['silver', 'gold', 'copper']),
+            'lme': snapshot_store.get_group('warehouse', 'LME', ['silver', 'copper'])
         }
-        
-        for source, metals in sources.items():
-            target_key = 'comex' if source == 'CME' else 'lme'
-            for metal in metals:
-                data = session.query(ComexWarehouse).filter(
-                    ComexWarehouse.source == source,
-                    ComexWarehouse.metal == metal
-                ).order_by(ComexWarehouse.date.desc()).first()
-                
-                if data:
-                    result[target_key][metal] = query_to_dict(data)
-        
-        session.close()
+        with_payloads('comex_warehouse', *result.values())
         
         return jsonify({
             'success': True,
@@ -149,51 +225,25 @@ def get_warehouse_latest():
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@app.route('/api/inventory/aggregated', methods=['GET'])
+@api.route('/api/inventory/aggregated', methods=['GET'])
+@snapshot_etag('warehouse')
 def get_inventory_aggregated():
-    """聚合三地库存数据 (COMEX, LME, SHFE)"""
+    """聚合三地库存数据 (COMEX, LME, SHFE)，读取内存快照"""
     try:
-        session = Session()
-        
-        # 1. 获取 COMEX (CME) 最新数据
-        comex_data = {}
-        for metal in ['silver', 'gold', 'copper']:
-            data = session.query(ComexWarehouse).filter(
-                ComexWarehouse.source == 'CME',
-                ComexWarehouse.metal == metal
-            ).order_by(ComexWarehouse.date.desc()).first()
-            if data:
-                comex_data[metal] = query_to_dict(data)
-        
-        # 2. 获取 LME 最新数据
-        lme_data = {}
-        for metal in ['silver', 'copper']:
-            data = session.query(ComexWarehouse).filter(
-                ComexWarehouse.source == 'LME',
-                ComexWarehouse.metal == metal
-            ).order_by(ComexWarehouse.date.desc()).first()
-            if data:
-                lme_data[metal] = query_to_dict(data)
-        
-        # 3. 获取 SHFE 最新数据
-        shfe_data = {}
-        for metal in ['silver', 'gold', 'copper']:
-            data = session.query(ComexWarehouse).filter(
-                ComexWarehouse.source == 'SHFE',
-                ComexWarehouse.metal == metal
-            ).order_by(ComexWarehouse.date.desc()).first()
-            if data:
-                shfe_data[metal] = query_to_dict(data)
-
-        session.close()
+        comex_data = snapshot_store.get_group('warehouse', 'CME', ['silver', 'gold', 'copper'])
+        lme_data = snapshot_store.get_group('warehouse', 'LME', ['silver', 'copper'])
+        shfe_data = snapshot_store.get_group('warehouse', 'SHFE', ['silver', 'gold', 'copper'])
+        with_payloads('comex_warehouse', comex_data, lme_data, shfe_data)
         
+        # 取数据的最新时间而非服务器当前时间，相同数据版本的响应内容完全一致 (ETag)
+        dates = [row['date'] for group in (comex_data, lme_data, shfe_data) for row in group.values() if row.get('date')]
         return jsonify({
             'success': True,
             'data': {
                 'comex': comex_data,
                 'lme': lme_data,
                 'shfe': shfe_data,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'timestamp': max(dates).strftime('%Y-%m-%d %H:%M:%S') if dates else None
             }
         })
     except Exception as e:
@@ -202,34 +252,36 @@ def get_inventory_aggregated():
 
 # ==================== ETF数据路由 ====================
 
-@app.route('/api/etf/holdings', methods=['GET'])
+@api.route('/api/etf/holdings', methods=['GET'])
+@cached_route('silver_etf')
 def get_etf_data():
     """获取ETF持仓数据"""
     try:
-        session = Session()
+        limit, cursor, fmt = page_args()
+        fields = resolve_fields(SilverETF, request.args.get('fields'))
+        session = ReadSession()
         days = request.args.get('days', 30, type=int)
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        data = session.query(SilverETF).filter(
-            SilverETF.date >= start_date
-        ).order_by(SilverETF.date.desc()).all()
-        
-        result = [query_to_dict(item) for item in data]
+        query = projected_query(session, SilverETF, fields).filter(
+            valid_since(SilverETF, start_date)
+        )
+        result, next_cursor = keyset_page(query, SilverETF, projected_dict, limit, cursor,
+                                          'silver_etf', start_date, columns=fields)
         session.close()
         
-        return jsonify({
-            'success': True,
-            'count': len(result),
-            'data': result
-        })
+        return render_rows(fmt, SilverETF, fields, result, next_cursor)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@app.route('/api/etf/latest', methods=['GET'])
+@api.route('/api/etf/latest', methods=['GET'])
+@cached_route('silver_etf')
 def get_etf_latest():
     """获取最新ETF数据"""
     try:
-        session = Session()
+        session = ReadSession()
         data = session.query(SilverETF).order_by(
             SilverETF.date.desc()
         ).all()
@@ -251,56 +303,48 @@ def get_etf_latest():
 
 # ==================== 价格数据路由 ====================
 
-@app.route('/api/price/all', methods=['GET'])
+@api.route('/api/price/all', methods=['GET'])
+@cached_route('silver_price')
 def get_all_prices():
     """获取所有市场价格"""
     try:
-        session = Session()
+        limit, cursor, fmt = page_args()
+        fields = resolve_fields(SilverPrice, request.args.get('fields'))
+        session = ReadSession()
         days = request.args.get('days', 30, type=int)
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        data = session.query(SilverPrice).filter(
-            SilverPrice.date >= start_date
-        ).order_by(SilverPrice.date.desc()).all()
-        
-        result = [query_to_dict(item) for item in data]
+        query = projected_query(session, SilverPrice, fields).filter(
+            valid_since(SilverPrice, start_date)
+        )
+        result, next_cursor = keyset_page(query, SilverPrice, projected_dict, limit, cursor,
+                                          'silver_price', start_date, columns=fields)
         session.close()
         
-        return jsonify({
-            'success': True,
-            'count': len(result),
-            'data': result
-        })
+        return render_rows(fmt, SilverPrice, fields, result, next_cursor)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@app.route('/api/price/latest', methods=['GET'])
+@api.route('/api/price/latest', methods=['GET'])
+@snapshot_etag('price')
 def get_latest_prices():
-    """获取最新价格（各市场各金属最新数据）"""
+    """获取最新价格（各市场各金属最新数据），读取内存快照"""
     try:
-        session = Session()
         markets = ['London', 'Shanghai', 'Comex']
         metals = ['silver', 'gold', 'copper']
         
         result = {}
         for market in markets:
-            market_data = {}
-            for metal in metals:
-                data = session.query(SilverPrice).filter(
-                    SilverPrice.market == market,
-                    SilverPrice.metal == metal
-                ).order_by(SilverPrice.date.desc()).first()
-                
-                if data:
-                    market_data[metal] = query_to_dict(data)
-                    # 兼容前端字段名 price
-                    market_data[metal]['price'] = market_data[metal].get('spot_price') or market_data[metal].get('futures_price') or 0.0
+            market_data = snapshot_store.get_group('price', market, metals)
+            for item in market_data.values():
+                # 兼容前端字段名 price
+                item['price'] = item.get('spot_price') or item.get('futures_price') or 0.0
             
-            logger.info(f"Market {market} data keys: {list(market_data.keys())}")
             if market_data:
                 result[market] = market_data
-        
-        session.close()
+        with_payloads('silver_price', *result.values())
         
         return jsonify({
             'success': True,
@@ -309,25 +353,74 @@ def get_latest_prices():
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@app.route('/api/price/by-market/<market>', methods=['GET'])
+@api.route('/api/price/by-market/<market>', methods=['GET'])
+@cached_route('silver_price')
 def get_market_prices(market):
     """获取特定市场的价格数据"""
     try:
-        session = Session()
+        limit, cursor, fmt = page_args()
+        fields = resolve_fields(SilverPrice, request.args.get('fields'))
+        session = ReadSession()
         days = request.args.get('days', 30, type=int)
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        data = session.query(SilverPrice).filter(
+        query = projected_query(session, SilverPrice, fields).filter(
             SilverPrice.market == market,
-            SilverPrice.date >= start_date
-        ).order_by(SilverPrice.date.desc()).all()
+            valid_since(SilverPrice, start_date)
+        )
+        result, next_cursor = keyset_page(query, SilverPrice, projected_dict, limit, cursor,
+                                          'silver_price', start_date, {'market': market}, columns=fields)
+        session.close()
         
-        result = [query_to_dict(item) for item in data]
+        return render_rows(fmt, SilverPrice, fields, result, next_cursor, market=market)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@api.route('/api/price/candles', methods=['GET'])
+@cached_route('price_candle')
+def get_price_candles():
+    """获取K线数据 (读取汇总表，不扫描原始报价)"""
+    try:
+        market = request.args.get('market', 'Comex')
+        metal = request.args.get('metal', 'silver')
+        interval = request.args.get('interval', '1m')
+        if interval not in INTERVALS:
+            return jsonify({'success': False, 'message': f'Unsupported interval: {interval}, expected one of {list(INTERVALS)}'}), 400
+        
+        try:
+            end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else datetime.utcnow()
+            # 默认返回最近 500 根K线
+            start = datetime.fromisoformat(request.args['from']) if request.args.get('from') \
+                else end - timedelta(seconds=INTERVALS[interval] * 500)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': f'Invalid from/to: {e}'}), 400
+        
+        session = ReadSession()
+        data = session.query(PriceCandle).filter(
+            PriceCandle.market == market,
+            PriceCandle.metal == metal,
+            PriceCandle.interval == interval,
+            PriceCandle.bucket_start >= start,
+            PriceCandle.bucket_start <= end
+        ).order_by(PriceCandle.bucket_start.asc()).limit(MAX_CANDLES).all()
+        
+        result = [{
+            'time': item.bucket_start,
+            'open': item.open,
+            'high': item.high,
+            'low': item.low,
+            'close': item.close,
+            'ticks': item.tick_count
+        } for item in data]
         session.close()
         
         return jsonify({
             'success': True,
             'market': market,
+            'metal': metal,
+            'interval': interval,
             'count': len(result),
             'data': result
         })
@@ -336,41 +429,40 @@ def get_market_prices(market):
 
 # ==================== 分析数据路由 ====================
 
-@app.route('/api/analytics', methods=['GET'])
+@api.route('/api/analytics', methods=['GET'])
+@cached_route('gold_data')
 def get_analytics():
     """获取投资分析数据"""
     try:
-        session = Session()
+        limit, cursor, fmt = page_args()
+        fields = resolve_fields(GoldData, request.args.get('fields'))
+        session = ReadSession()
         category = request.args.get('category')
         days = request.args.get('days', 30, type=int)
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        query = session.query(GoldData).filter(
-            GoldData.date >= start_date
+        query = projected_query(session, GoldData, fields).filter(
+            valid_since(GoldData, start_date)
         )
         
         if category:
             query = query.filter(GoldData.category == category)
         
-        data = query.order_by(GoldData.date.desc()).all()
-        
-        result = [query_to_dict(item) for item in data]
+        result, next_cursor = keyset_page(query, GoldData, projected_dict, limit, cursor)
         session.close()
         
-        return jsonify({
-            'success': True,
-            'count': len(result),
-            'category': category,
-            'data': result
-        })
+        return render_rows(fmt, GoldData, fields, result, next_cursor, category=category)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@app.route('/api/analytics/summary', methods=['GET'])
+@api.route('/api/analytics/summary', methods=['GET'])
+@cached_route('gold_data')
 def get_analytics_summary():
     """获取分析摘要"""
     try:
-        session = Session()
+        session = ReadSession()
         categories = ['认知层级', '逻辑层级', '数据层级', '风险层级']
         
         result = {}
@@ -393,11 +485,12 @@ def get_analytics_summary():
 
 # ==================== 日志路由 ====================
 
-@app.route('/api/logs', methods=['GET'])
+@api.route('/api/logs', methods=['GET'])
+@cached_route('data_log')
 def get_logs():
     """获取数据采集日志"""
     try:
-        session = Session()
+        session = ReadSession()
         limit = request.args.get('limit', 50, type=int)
         
         data = session.query(DataLog).order_by(
@@ -417,7 +510,8 @@ def get_logs():
 
 # ==================== 调试元信息路由 ====================
 
-@app.route('/api/debug/raw', methods=['GET'])
+@api.route('/api/debug/raw', methods=['GET'])
+@cached_route('silver_price', 'comex_warehouse', 'payload_blob')
 def get_debug_raw():
     """获取特定 key 的原始调试元信息 (P0-2)"""
     try:
@@ -425,7 +519,7 @@ def get_debug_raw():
         if not key:
             return jsonify({'success': False, 'message': 'Missing key parameter'}), 400
         
-        session = Session()
+        session = ReadSession()
         
         # 尝试从价格表中查找 (metal 为 key)
         price_data = session.query(SilverPrice).filter(
@@ -444,11 +538,14 @@ def get_debug_raw():
         if not data:
             session.close()
             return jsonify({'success': False, 'message': f'No data found for key: {key}'}), 404
-            
+        
+        # 审计内容按需从 payload_blob 加载解码
+        raw_payload = load_payload(session, data, 'raw_payload')
+        mapping = load_payload(session, data, 'mapping')
         result = {
             'key': key,
-            'raw_payload': json.loads(data.raw_payload) if data.raw_payload else {},
-            'mapping': json.loads(data.mapping) if data.mapping else {},
+            'raw_payload': json.loads(raw_payload) if raw_payload else {},
+            'mapping': json.loads(mapping) if mapping else {},
             'source': data.source,
             'provider_as_of': data.provider_as_of,
             'field_used': data.field_used,
@@ -466,18 +563,79 @@ def get_debug_raw():
         logger.error(f"获取调试信息失败: {str(e)}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
+# ==================== 实时推送 ====================
+
+@api.route('/api/stream', methods=['GET'])
+def stream_updates():
+    """SSE 推送: 先发完整快照 (或按 Last-Event-ID 补发)，之后推送每个品种的变化。
+    每个连接占用一个服务线程，超过本进程的连接上限时返回 503 (前端退回轮询)"""
+    hub = current_app.extensions['stream_hub']
+    if not hub.reserve():
+        return jsonify({
+            'success': False,
+            'message': '推送连接已满，请使用轮询接口'
+        }), 503, {'Retry-After': str(config.STREAM_RETRY_MS // 1000)}
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    response = Response(
+        stream_with_context(hub.stream(last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # 连接关闭时 (包括响应尚未开始输出) 归还名额
+    response.call_on_close(hub.release)
+    return response
+
+# ==================== 数据导出 ====================
+
+@api.route('/api/export/<table>', methods=['GET'])
+def export_table(table):
+    """流式导出表数据 (format=csv|ndjson|parquet, columns=a,b, from/to, gzip=1)"""
+    try:
+        start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else None
+        end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else None
+        columns = [c for c in request.args.get('columns', '').split(',') if c] or None
+        req = ExportRequest(
+            table,
+            fmt=request.args.get('format', 'csv'),
+            columns=columns,
+            start=start,
+            end=end,
+            compress=request.args.get('gzip', '0').lower() in ('1', 'true', 'yes')
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    def generate():
+        # 只读连接在整个响应期间持有，输出结束后归还连接池
+        conn = read_engine.raw_connection()
+        try:
+            for chunk in stream_export(conn.driver_connection, req):
+                yield chunk
+        finally:
+            conn.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=req.content_type,
+        headers={'Content-Disposition': f'attachment; filename={req.filename}'}
+    )
+
 # ==================== 健康检查 ====================
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     """健康检查"""
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
-        'service': 'Silver & Gold Market Data API'
+        'service': 'Silver & Gold Market Data API',
+        'cache': response_cache.stats(),
+        'stream': current_app.extensions['stream_hub'].stats(),
+        'role': 'leader' if current_app.extensions['leader_election'].is_leader else 'follower',
+        'pid': os.getpid()
     })
 
-@app.route('/api', methods=['GET'])
+@api.route('/api', methods=['GET'])
 def api_info():
     """API信息"""
     return jsonify({
@@ -489,10 +647,16 @@ def api_info():
             'comex': '/api/comex/warehouse',
             'etf': '/api/etf/holdings',
             'prices': '/api/price/all',
+            'candles': '/api/price/candles',
             'analytics': '/api/analytics',
-            'logs': '/api/logs'
+            'logs': '/api/logs',
+            'export': '/api/export/<table>',
+            'stream': '/api/stream'
         }
     })
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # 导入本模块不创建应用 (不初始化数据库、不参与 leader 选举)；
+    # 服务入口为工厂: gunicorn 'app:create_app()' / serve.py
+    app = create_app()
+    app.run(debug=True, host=config.SERVER_HOST, port=config.SERVER_PORT)
@@ -0,0 +1,207 @@
+"""
+冷数据归档 (Parquet)
+已收盘日期的历史数据按天写入 data/archive/<表>/day=YYYY-MM-DD/，再分批从 SQLite 删除；
+审计内容从 payload_blob 解码后内联写入归档文件 (热库中不再被引用的内容随后清理)；
+历史接口查询范围早于归档上界 (最新归档日期的次日) 时透明读取归档
+"""
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any
+import logging
+from sqlalchemy import Integer, Float, DateTime
+try:
+    from config import config
+    from models import ComexWarehouse, SilverETF, SilverPrice
+    from blob_store import BLOB_FIELDS, load_blobs
+    from retention import delete_in_batches
+except ImportError:
+    from backend.config import config
+    from backend.models import ComexWarehouse, SilverETF, SilverPrice
+    from backend.blob_store import BLOB_FIELDS, load_blobs
+    from backend.retention import delete_in_batches
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 可归档的表
+ARCHIVE_MODELS = {
+    'silver_price': SilverPrice,
+    'comex_warehouse': ComexWarehouse,
+    'silver_etf': SilverETF,
+}
+
+def arrow_schema(model, columns: Optional[List[str]] = None):
+    """由模型列定义得到 Parquet 结构 (可只取部分列)"""
+    fields = []
+    for column in model.__table__.columns:
+        if columns is not None and column.name not in columns:
+            continue
+        if isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp('us')
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+def parse_row(row, datetime_idx) -> List[Any]:
+    values = list(row)
+    for i in datetime_idx:
+        if isinstance(values[i], str):
+            values[i] = datetime.fromisoformat(values[i])
+    return values
+
+def inline_payloads(conn: sqlite3.Connection, rows: List[List[Any]], blob_fields: List[tuple]):
+    """把行中按哈希引用的审计内容解码后写入内联列 (blob_fields: [(内联列序号, 哈希列序号)])"""
+    digests = {values[h] for values in rows for i, h in blob_fields if values[i] is None and values[h]}
+    if not digests:
+        return
+    payloads = load_blobs(conn, digests)
+    for values in rows:
+        for i, h in blob_fields:
+            if values[i] is None and values[h]:
+                values[i] = payloads.get(values[h])
+
+def _table_dir(table: str, archive_dir: Optional[str] = None) -> str:
+    return os.path.join(archive_dir or config.ARCHIVE_DIR, table)
+
+def archived_days(table: str, archive_dir: Optional[str] = None) -> List[str]:
+    """已归档的日期分区 (YYYY-MM-DD，升序)"""
+    path = _table_dir(table, archive_dir)
+    if not os.path.isdir(path):
+        return []
+    return sorted(name[4:] for name in os.listdir(path) if name.startswith('day='))
+
+# 归档目录 -> (目录修改时间, 归档上界)
+_horizons: Dict[str, tuple] = {}
+
+def archive_horizon(table: str, archive_dir: Optional[str] = None) -> Optional[datetime]:
+    """归档数据的上界 (最新归档日期的次日零点)，没有归档时为 None；
+    按目录修改时间缓存，新增日期分区后重新列出"""
+    path = _table_dir(table, archive_dir)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _horizons.get(path)
+    if cached is None or cached[0] != mtime:
+        days = archived_days(table, archive_dir)
+        horizon = datetime.strptime(days[-1], '%Y-%m-%d') + timedelta(days=1) if days else None
+        cached = _horizons[path] = (mtime, horizon)
+    return cached[1]
+
+def reaches_archive(table: str, start_date: datetime, archive_dir: Optional[str] = None) -> bool:
+    """从 start_date 开始的查询是否可能包含归档的行"""
+    horizon = archive_horizon(table, archive_dir)
+    return horizon is not None and start_date - timedelta(seconds=config.DEDUP_MAX_SPAN) < horizon
+
+def archive_table(conn: sqlite3.Connection, table: str, before: datetime,
+                  archive_dir: Optional[str] = None, batch_size: int = 50000,
+                  delete_batch_size: Optional[int] = None, pause: Optional[float] = None) -> int:
+    """把 before 之前的完整日期逐天写入 Parquet 后删除，返回归档行数
+
+    每天的热数据按主键区间分批删除 (与数据保留相同，每批一个短写事务)，不会长时间占用写锁
+    """
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("归档需要 pyarrow: pip install pyarrow")
+    model = ARCHIVE_MODELS[table]
+    schema = arrow_schema(model)
+    columns = [f.name for f in schema]
+    datetime_idx = [i for i, f in enumerate(schema) if pa.types.is_timestamp(f.type)]
+    blob_fields = [(columns.index(field), columns.index(f"{field}_hash")) for field in BLOB_FIELDS.get(table, ())]
+    cutoff_day = before.strftime('%Y-%m-%d')
+
+    conn.commit()
+    days = [row[0] for row in conn.execute(
+        f"SELECT DISTINCT substr(date, 1, 10) FROM {table} WHERE date < ? ORDER BY 1",
+        (cutoff_day,)
+    )]
+
+    total = 0
+    for day in days:
+        day_start = f"{day} 00:00:00"
+        day_end = (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d 00:00:00')
+        part_dir = os.path.join(_table_dir(table, archive_dir), f"day={day}")
+        os.makedirs(part_dir, exist_ok=True)
+        # 同一天再次归档时写入新的分片，读取时按 id 去重
+        part_name = f"part-{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}.parquet"
+        part_path = os.path.join(part_dir, part_name)
+        # "_" 前缀的临时文件会被数据集扫描忽略
+        tmp_path = os.path.join(part_dir, f"_{part_name}.tmp")
+
+        cursor = conn.execute(
+            f"SELECT {', '.join(columns)} FROM {table} WHERE date >= ? AND date < ? ORDER BY date",
+            (day_start, day_end)
+        )
+        count = 0
+        with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                parsed = [parse_row(row, datetime_idx) for row in rows]
+                inline_payloads(conn, parsed, blob_fields)
+                writer.write_table(pa.Table.from_pylist(
+                    [dict(zip(columns, values)) for values in parsed], schema=schema
+                ))
+                count += len(rows)
+        os.replace(tmp_path, part_path)
+
+        # 文件落盘后再删除热数据
+        delete_in_batches(conn, table, "date >= ? AND date < ?", (day_start, day_end),
+                          delete_batch_size, pause)
+        total += count
+        logger.info(f"[Archive] {table} {day}: {count} rows -> {part_path}")
+    return total
+
+def read_archive(table: str, start_date: datetime, filters: Optional[Dict[str, Any]] = None,
+                 archive_dir: Optional[str] = None, before: Optional[tuple] = None,
+                 limit: Optional[int] = None, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """读取 start_date 之后仍有效的归档行 (按日期分区裁剪并下推过滤条件)，按 (date, id) 降序
+
+    before 为分页游标 (date, id)，只返回排在它之后的行；给出 limit 时从最新的分区开始逐天读取，
+    凑够 limit 行即停止；columns 只读取部分列 (须包含 id 和 date)
+    """
+    if not PARQUET_AVAILABLE:
+        return []
+    lower = start_date - timedelta(seconds=config.DEDUP_MAX_SPAN)
+    first_day = lower.strftime('%Y-%m-%d')
+    last_day = before[0].strftime('%Y-%m-%d') if before is not None else None
+    days = [day for day in archived_days(table, archive_dir)
+            if day >= first_day and (last_day is None or day <= last_day)]
+    if not days:
+        return []
+
+    # 显式给出结构: 旧分片缺少的新增列读为空值
+    schema = arrow_schema(ARCHIVE_MODELS[table]).append(pa.field('day', pa.string()))
+    dataset = ds.dataset(_table_dir(table, archive_dir), format='parquet', partitioning='hive', schema=schema)
+    expr = (ds.field('date') >= pa.scalar(lower, pa.timestamp('us'))) \
+        & (ds.field('valid_until') >= pa.scalar(start_date, pa.timestamp('us')))
+    if before is not None:
+        expr = expr & (ds.field('date') <= pa.scalar(before[0], pa.timestamp('us')))
+    for name, value in (filters or {}).items():
+        expr = expr & (ds.field(name) == value)
+    columns = columns or [c.name for c in ARCHIVE_MODELS[table].__table__.columns]
+
+    unique: Dict[int, Dict[str, Any]] = {}
+    # 分区按日期划分，较新的分区中的行一定排在较旧分区之前
+    for day_range in ([days] if limit is None else [[day] for day in reversed(days)]):
+        day_expr = (ds.field('day') >= day_range[0]) & (ds.field('day') <= day_range[-1])
+        for row in dataset.to_table(columns=columns, filter=expr & day_expr).to_pylist():
+            if before is None or (row['date'], row['id']) < before:
+                unique[row['id']] = row
+        if limit is not None and len(unique) >= limit:
+            break
+    rows = sorted(unique.values(), key=lambda row: (row['date'], row['id']), reverse=True)
+    return rows if limit is None else rows[:limit]
@@ -0,0 +1,247 @@
+"""
+在线备份 (分步复制 + 变更页增量)
+备份连接先固定一个 WAL 读快照，再按 BACKUP_PAGES_PER_STEP 页分步复制，
+步与步之间暂停，采集线程照常写入 (WAL 下读快照不阻塞写入，备份也不会因源库被修改而重新开始)
+
+data/backup 下的布局:
+    full-<时间>.db       完整备份
+    full-<时间>.pages    完整备份每页的摘要，用于计算增量
+    incr-<时间>.delta    相对最近一次完整备份变化的页 (gzip)，恢复时 = 完整备份 + 增量
+"""
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+try:
+    from config import config
+except ImportError:
+    from backend.config import config
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 16
+
+def _timestamp() -> str:
+    return datetime.now().strftime('%Y%m%d_%H%M%S')
+
+def online_copy(src_path: str, dest_path: str, pages: Optional[int] = None,
+                pause: Optional[float] = None):
+    """分步复制数据库的一致快照"""
+    pages = pages or config.BACKUP_PAGES_PER_STEP
+    pause = config.BACKUP_STEP_PAUSE if pause is None else pause
+
+    def progress(status, remaining, total):
+        if pause:
+            time.sleep(pause)
+
+    src = sqlite3.connect(src_path, timeout=config.SQLITE_BUSY_TIMEOUT / 1000.0, isolation_level=None)
+    dest = sqlite3.connect(dest_path)
+    try:
+        # 固定读快照: 复制期间其他连接的写入对本次备份不可见，也不会触发重新开始
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        src.backup(dest, pages=pages, progress=progress)
+        src.execute("COMMIT")
+        # 备份文件使用回滚日志模式，单个文件即完整备份 (打开时不会生成 -wal/-shm)
+        dest.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dest.close()
+        src.close()
+
+def verify(path: str) -> bool:
+    """对备份文件做完整性检查"""
+    conn = sqlite3.connect(path)
+    try:
+        result = conn.execute(f"PRAGMA {config.BACKUP_INTEGRITY_CHECK}").fetchone()[0]
+    finally:
+        conn.close()
+    if result != 'ok':
+        logger.error(f"[Backup] {path} 完整性检查失败: {result}")
+    return result == 'ok'
+
+def _page_size(path: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        conn.close()
+
+def _iter_pages(path: str, page_size: int):
+    with open(path, 'rb') as f:
+        while True:
+            page = f.read(page_size)
+            if not page:
+                break
+            yield page
+
+def _digest(page: bytes) -> bytes:
+    return hashlib.blake2b(page, digest_size=DIGEST_SIZE).digest()
+
+def _snapshot(db_path: str, backup_dir: str, name: str) -> str:
+    """复制并校验一个快照，返回临时文件路径 ("_" 前缀，轮换时忽略)"""
+    os.makedirs(backup_dir, exist_ok=True)
+    tmp_path = os.path.join(backup_dir, f"_{name}.tmp")
+    online_copy(db_path, tmp_path)
+    if not verify(tmp_path):
+        os.remove(tmp_path)
+        raise RuntimeError(f"备份快照完整性检查失败: {db_path}")
+    return tmp_path
+
+def create_full_backup(db_path: str, backup_dir: Optional[str] = None) -> str:
+    """完整备份，同时记录每页摘要"""
+    backup_dir = backup_dir or config.BACKUP_DIR
+    name = f"full-{_timestamp()}"
+    tmp_path = _snapshot(db_path, backup_dir, name)
+    page_size = _page_size(tmp_path)
+    with open(os.path.join(backup_dir, f"{name}.pages"), 'wb') as f:
+        for page in _iter_pages(tmp_path, page_size):
+            f.write(_digest(page))
+    path = os.path.join(backup_dir, f"{name}.db")
+    os.replace(tmp_path, path)
+    logger.info(f"[Backup] 完整备份: {path}")
+    return path
+
+def _full_backups(backup_dir: str) -> List[str]:
+    if not os.path.isdir(backup_dir):
+        return []
+    return sorted(n[:-3] for n in os.listdir(backup_dir) if n.startswith('full-') and n.endswith('.db'))
+
+def _incremental_backups(backup_dir: str) -> List[str]:
+    if not os.path.isdir(backup_dir):
+        return []
+    return sorted(n for n in os.listdir(backup_dir) if n.startswith('incr-') and n.endswith('.delta'))
+
+def create_incremental_backup(db_path: str, backup_dir: Optional[str] = None) -> str:
+    """增量备份: 只保存相对最近一次完整备份变化的页；没有完整备份时做完整备份"""
+    backup_dir = backup_dir or config.BACKUP_DIR
+    fulls = _full_backups(backup_dir)
+    if not fulls:
+        return create_full_backup(db_path, backup_dir)
+    base = fulls[-1]
+    with open(os.path.join(backup_dir, f"{base}.pages"), 'rb') as f:
+        base_digests = f.read()
+
+    name = f"incr-{_timestamp()}"
+    tmp_path = _snapshot(db_path, backup_dir, name)
+    page_size = _page_size(tmp_path)
+    path = os.path.join(backup_dir, f"{name}.delta")
+    page_count = os.path.getsize(tmp_path) // page_size
+    changed = 0
+    try:
+        with open(path, 'wb') as f:
+            # 文件头: 长度 + JSON，之后是 gzip 压缩的 (页号, 页内容) 记录
+            header = json.dumps({
+                'base': f"{base}.db",
+                'page_size': page_size,
+                'page_count': page_count,
+            }).encode('utf-8')
+            f.write(struct.pack('>I', len(header)))
+            f.write(header)
+            with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=6) as out:
+                for page_no, page in enumerate(_iter_pages(tmp_path, page_size)):
+                    offset = page_no * DIGEST_SIZE
+                    if base_digests[offset:offset + DIGEST_SIZE] != _digest(page):
+                        out.write(struct.pack('>I', page_no))
+                        out.write(page)
+                        changed += 1
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    finally:
+        os.remove(tmp_path)
+    logger.info(f"[Backup] 增量备份: {path} ({changed}/{page_count} 页变化，基于 {base})")
+    return path
+
+def read_delta_header(path: str) -> Dict:
+    with open(path, 'rb') as f:
+        size = struct.unpack('>I', f.read(4))[0]
+        return json.loads(f.read(size).decode('utf-8'))
+
+def restore_backup(backup_path: str, dest_path: str) -> str:
+    """恢复到 dest_path: 完整备份直接复制，增量备份 = 基础完整备份 + 变化页；恢复后做完整性检查"""
+    backup_dir = os.path.dirname(backup_path)
+    if backup_path.endswith('.delta'):
+        header = read_delta_header(backup_path)
+        base_path = os.path.join(backup_dir, header['base'])
+    else:
+        header = None
+        base_path = backup_path
+
+    with open(base_path, 'rb') as src, open(dest_path, 'wb') as dest:
+        while True:
+            chunk = src.read(1 << 20)
+            if not chunk:
+                break
+            dest.write(chunk)
+
+    if header is not None:
+        page_size = header['page_size']
+        with open(backup_path, 'rb') as f:
+            f.seek(4 + struct.unpack('>I', f.read(4))[0])
+            with gzip.open(f, 'rb') as body, open(dest_path, 'r+b') as dest:
+                dest.truncate(header['page_count'] * page_size)
+                while True:
+                    record = body.read(4)
+                    if not record:
+                        break
+                    page_no = struct.unpack('>I', record)[0]
+                    dest.seek(page_no * page_size)
+                    dest.write(body.read(page_size))
+
+    if not verify(dest_path):
+        raise RuntimeError(f"恢复结果完整性检查失败: {dest_path}")
+    return dest_path
+
+def rotate_backups(backup_dir: Optional[str] = None, keep_full: Optional[int] = None,
+                   keep_incremental: Optional[int] = None) -> List[str]:
+    """保留最近 keep_full 个完整备份和最近 keep_incremental 个增量备份；
+    基础完整备份已删除的增量一并删除，返回删除的文件"""
+    backup_dir = backup_dir or config.BACKUP_DIR
+    keep_full = keep_full or config.BACKUP_KEEP_FULL
+    keep_incremental = config.BACKUP_KEEP_INCREMENTAL if keep_incremental is None else keep_incremental
+    removed = []
+
+    fulls = _full_backups(backup_dir)
+    kept_fulls = set(fulls[-keep_full:])
+    for base in fulls:
+        if base not in kept_fulls:
+            for suffix in ('.db', '.pages'):
+                path = os.path.join(backup_dir, base + suffix)
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed.append(path)
+
+    incrementals = _incremental_backups(backup_dir)
+    recent = set(incrementals[-keep_incremental:]) if keep_incremental else set()
+    for name in incrementals:
+        path = os.path.join(backup_dir, name)
+        base = read_delta_header(path)['base'][:-3]
+        if name not in recent or base not in kept_fulls:
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+def run_backup(db_path: str, mode: str = 'auto', backup_dir: Optional[str] = None) -> str:
+    """mode: full / incremental / auto (最近的完整备份超过 BACKUP_FULL_INTERVAL_DAYS 天时做完整备份)"""
+    backup_dir = backup_dir or config.BACKUP_DIR
+    if mode == 'auto':
+        fulls = _full_backups(backup_dir)
+        mode = 'full'
+        if fulls:
+            last = datetime.strptime(fulls[-1][len('full-'):], '%Y%m%d_%H%M%S')
+            if (datetime.now() - last).days < config.BACKUP_FULL_INTERVAL_DAYS:
+                mode = 'incremental'
+    if mode == 'full':
+        path = create_full_backup(db_path, backup_dir)
+    else:
+        path = create_incremental_backup(db_path, backup_dir)
+    for removed in rotate_backups(backup_dir):
+        logger.info(f"[Backup] 轮换删除: {removed}")
+    return path
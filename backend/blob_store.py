@@ -0,0 +1,129 @@
+"""
+审计原始数据的内容寻址存储
+raw_payload / mapping 按 SHA256 去重压缩后存入 payload_blob，数据行只保存哈希
+"""
+import hashlib
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import logging
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+CODEC = 'zlib'
+
+# 表 -> 存入 payload_blob 的字段 (行中保存 <字段>_hash)
+BLOB_FIELDS = {
+    'silver_price': ('raw_payload', 'mapping'),
+    'comex_warehouse': ('raw_payload',),
+}
+
+INSERT_BLOB_SQL = (
+    "INSERT OR IGNORE INTO payload_blob (hash, codec, data, size, created_at) "
+    "VALUES (:hash, :codec, :data, :size, CURRENT_TIMESTAMP)"
+)
+
+def encode_payload(payload: str) -> Tuple[str, bytes]:
+    """返回 (SHA256 哈希, 压缩后的内容)"""
+    raw = payload.encode('utf-8')
+    return hashlib.sha256(raw).hexdigest(), zlib.compress(raw, 6)
+
+def decode_payload(codec: str, data: bytes) -> str:
+    if codec == CODEC:
+        return zlib.decompress(data).decode('utf-8')
+    return bytes(data).decode('utf-8')
+
+class BlobStore:
+    """payload_blob 的读写入口，带解码结果的 LRU 缓存"""
+
+    def __init__(self, cache_size: int = 256):
+        self._lock = threading.Lock()
+        self._decoded = OrderedDict()
+        self.cache_size = cache_size
+
+    def params(self, payload: str) -> Dict[str, Any]:
+        """INSERT_BLOB_SQL 的参数 (可攒批后 executemany)"""
+        digest, data = encode_payload(payload)
+        return {'hash': digest, 'codec': CODEC, 'data': data, 'size': len(payload)}
+
+    def get(self, session, digest: Optional[str]) -> Optional[str]:
+        """按哈希读取并解码内容"""
+        if not digest:
+            return None
+        with self._lock:
+            cached = self._decoded.get(digest)
+        if cached is not None:
+            return cached
+        row = session.execute(
+            text("SELECT codec, data FROM payload_blob WHERE hash = :hash"), {'hash': digest}
+        ).fetchone()
+        if row is None:
+            return None
+        payload = decode_payload(row[0], row[1])
+        with self._lock:
+            self._decoded[digest] = payload
+            while len(self._decoded) > self.cache_size:
+                self._decoded.popitem(last=False)
+        return payload
+
+def load_payload(session, row, field: str) -> Optional[str]:
+    """读取行的审计内容：优先内联列 (旧数据)，否则按哈希从 payload_blob 加载"""
+    inline = getattr(row, field, None)
+    if inline:
+        return inline
+    return blob_store.get(session, getattr(row, f"{field}_hash", None))
+
+def resolve_payloads(session, row: Dict[str, Any], fields) -> Dict[str, Any]:
+    """字典行 (如最新快照) 的审计内容: 内联列为空时按哈希从 payload_blob 加载，写回原字段"""
+    for field in fields:
+        if row.get(field) is None and row.get(f"{field}_hash"):
+            row[field] = blob_store.get(session, row[f"{field}_hash"])
+    return row
+
+def load_blobs(conn: sqlite3.Connection, digests, batch_size: int = 500) -> Dict[str, str]:
+    """按哈希批量读取并解码 (sqlite3 连接)"""
+    digests = list(digests)
+    result = {}
+    for i in range(0, len(digests), batch_size):
+        chunk = digests[i:i + batch_size]
+        rows = conn.execute(
+            f"SELECT hash, codec, data FROM payload_blob WHERE hash IN ({', '.join('?' * len(chunk))})", chunk
+        ).fetchall()
+        for digest, codec, data in rows:
+            result[digest] = decode_payload(codec, data)
+    return result
+
+def externalize_existing(table: str, fields, batch_size: int = 1000):
+    """迁移步骤: 把已有行的内联内容移入 payload_blob，并清空内联列"""
+    def step(conn: sqlite3.Connection):
+        moved = 0
+        for field in fields:
+            last_id = 0
+            while True:
+                rows = conn.execute(
+                    f"SELECT id, {field} FROM {table} WHERE id > ? AND {field} IS NOT NULL ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                for row_id, payload in rows:
+                    digest, data = encode_payload(payload)
+                    conn.execute(
+                        "INSERT OR IGNORE INTO payload_blob (hash, codec, data, size, created_at) "
+                        "VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)",
+                        (digest, CODEC, data, len(payload))
+                    )
+                    conn.execute(
+                        f"UPDATE {table} SET {field}_hash = ?, {field} = NULL WHERE id = ?",
+                        (digest, row_id)
+                    )
+                moved += len(rows)
+                last_id = rows[-1][0]
+        logger.info(f"[Migration] {table}: moved {moved} payloads to payload_blob")
+    return step
+
+# 全局内容存储
+blob_store = BlobStore()
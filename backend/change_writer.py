@@ -0,0 +1,105 @@
+"""
+仅变更写入层
+取值与上一行相同时不再插入新行，只延长上一行的 valid_until
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Any
+import logging
+try:
+    from config import config
+    from models import ComexWarehouse, SilverETF, SilverPrice, GoldData
+    from snapshot_store import row_to_dict
+except ImportError:
+    from backend.config import config
+    from backend.models import ComexWarehouse, SilverETF, SilverPrice, GoldData
+    from backend.snapshot_store import row_to_dict
+
+logger = logging.getLogger(__name__)
+
+# 模型 -> (序列键字段, 参与比较的取值字段)
+DEDUP_POLICIES = {
+    SilverPrice: (
+        ('market', 'metal'),
+        ('spot_price', 'futures_price', 'premium', 'premium_type', 'source', 'quality', 'is_error')
+    ),
+    ComexWarehouse: (
+        ('source', 'metal'),
+        ('total_oz', 'eligible_oz', 'registered_oz', 'price', 'report_date', 'file_hash', 'quality')
+    ),
+    SilverETF: (
+        ('etf_name',),
+        ('holdings_oz', 'yoy_change', 'price', 'source')
+    ),
+    GoldData: (
+        ('category', 'indicator'),
+        ('value', 'description')
+    ),
+}
+
+class ChangeOnlyWriter:
+    """记住每个序列最后写入的一行，相同取值合并为一行"""
+
+    def __init__(self, max_span: int = config.DEDUP_MAX_SPAN):
+        self._lock = threading.Lock()
+        self._last: Dict[tuple, Dict[str, Any]] = {}
+        self.max_span = timedelta(seconds=max_span)
+        self.inserted = 0
+        self.extended = 0
+
+    def _with_defaults(self, model, row: Dict[str, Any]) -> Dict[str, Any]:
+        """补上尚未 flush 的列默认值 (如 is_error=0)，避免与已入库的行比较时误判为变化"""
+        for column in model.__table__.columns:
+            if row.get(column.name) is None and column.default is not None and column.default.is_scalar:
+                row[column.name] = column.default.arg
+        return row
+
+    def _key(self, model, row: Dict[str, Any]) -> tuple:
+        key_fields, _ = DEDUP_POLICIES[model]
+        return (model.__tablename__,) + tuple(row.get(f) for f in key_fields)
+
+    def _last_row(self, session, model, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """序列的上一行：先查内存，未命中时从数据库加载一次"""
+        key = self._key(model, row)
+        with self._lock:
+            last = self._last.get(key)
+        if last is not None:
+            return last
+        key_fields, _ = DEDUP_POLICIES[model]
+        latest = session.query(model).filter(
+            *[getattr(model, f) == row.get(f) for f in key_fields]
+        ).order_by(model.date.desc()).first()
+        if latest is None:
+            return None
+        last = row_to_dict(latest)
+        with self._lock:
+            self._last.setdefault(key, last)
+        return last
+
+    def classify(self, session, instance) -> Optional[Dict[str, Any]]:
+        """判断一行是否需要插入：需要插入时返回 None (并设置 valid_until)，
+        否则返回延长上一行所需的更新参数 (由调用方批量执行)"""
+        model = type(instance)
+        row = self._with_defaults(model, row_to_dict(instance))
+        observed_at = row.get('date') or datetime.utcnow()
+        _, value_fields = DEDUP_POLICIES[model]
+
+        last = self._last_row(session, model, row)
+        if last is not None and last.get('date') is not None \
+                and observed_at - last['date'] < self.max_span \
+                and all(row.get(f) == last.get(f) for f in value_fields):
+            self.extended += 1
+            return {'id': last['id'], 'valid_until': observed_at, 'updated_at': datetime.utcnow()}
+
+        # 取值变化或超过最长合并跨度: 插入新行 (跨度上限保证区间查询可以走 date 索引)
+        instance.valid_until = observed_at
+        self.inserted += 1
+        return None
+
+    def remember(self, instance_dict: Dict[str, Any], model):
+        """事务提交后记录序列的最新一行"""
+        with self._lock:
+            self._last[self._key(model, instance_dict)] = instance_dict
+
+# 全局写入层 (跨采集周期保留每个序列的最后一行)
+change_writer = ChangeOnlyWriter()
@@ -0,0 +1,184 @@
+"""
+多进程部署 (gunicorn 等多个 worker) 的采集 leader 选举
+所有 worker 竞争同一个锁文件的排它锁，持有者 (leader) 运行采集与数据清理线程，其余 worker 只提供读服务；
+follower 定期检查数据库是否有其他进程的提交，同步新插入的快照行 (SSE 同样推送) 并使响应缓存失效。
+持有者进程退出时操作系统自动释放锁，其他 worker 在下一次尝试时接任
+"""
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Optional
+import logging
+from sqlalchemy import func
+try:
+    from config import config
+    from models import Base
+    from snapshot_store import SNAPSHOT_KINDS, row_to_dict
+    from response_cache import data_versions
+except ImportError:
+    from backend.config import config
+    from backend.models import Base
+    from backend.snapshot_store import SNAPSHOT_KINDS, row_to_dict
+    from backend.response_cache import data_versions
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+class FileLock:
+    """跨进程的排它文件锁 (flock / msvcrt.locking)，进程退出时自动释放"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        f = open(self.path, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class FollowerSync:
+    """follower 进程: 数据库有其他连接提交时 (PRAGMA data_version 变化)，
+    发布各快照表中新插入的行、记录最新行被延长的 valid_until (确认时间)，并使所有表的响应缓存失效"""
+
+    def __init__(self, db_path: str, store, session_factory, interval: Optional[float] = None):
+        self.db_path = db_path
+        self.store = store
+        self.session_factory = session_factory
+        self.interval = interval or config.FOLLOWER_SYNC_INTERVAL
+        self._stop = threading.Event()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._data_version = None
+        self._last_ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.syncs = 0
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.db_path, timeout=config.SQLITE_BUSY_TIMEOUT / 1000.0,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA query_only=ON")
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        for kind, (model, _) in SNAPSHOT_KINDS.items():
+            self._last_ids[kind] = self._conn.execute(
+                f"SELECT COALESCE(MAX(id), 0) FROM {model.__tablename__}"
+            ).fetchone()[0]
+
+    def sync_once(self) -> bool:
+        """有新提交时同步，返回是否有变化"""
+        with self._lock:
+            return self._sync()
+
+    def _sync(self) -> bool:
+        if self._conn is None:
+            self._connect()
+            return False
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return False
+        self._data_version = version
+        _, current = self.store.dump()
+        session = self.session_factory()
+        try:
+            for kind, (model, _) in SNAPSHOT_KINDS.items():
+                rows = [row_to_dict(item) for item in session.query(model).filter(
+                    model.id > self._last_ids[kind]
+                ).order_by(model.id).all()]
+                if rows:
+                    self._last_ids[kind] = rows[-1]['id']
+                    self.store.publish(kind, rows)
+                # 取值未变化时 leader 只延长快照中那一行的 valid_until: 与 leader 一样只记录确认时间
+                latest = [row['id'] for metals in current[kind].values() for row in metals.values()]
+                if latest:
+                    confirmed_at = session.query(func.max(model.valid_until)).filter(model.id.in_(latest)).scalar()
+                    if confirmed_at is not None:
+                        self.store.confirm(kind, confirmed_at)
+        finally:
+            session.close()
+        # 不区分具体的表: leader 每个采集周期都会提交，缓存最多每周期失效一次
+        data_versions.bump(*Base.metadata.tables)
+        self.syncs += 1
+        return True
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sync_once()
+            except Exception as e:
+                logger.error(f"[Cluster] 同步失败: {e}")
+
+    def start(self) -> threading.Thread:
+        self._connect()
+        thread = threading.Thread(target=self.run, name='follower-sync', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+class LeaderElection:
+    """反复尝试获取 leader 锁，获得后调用 on_elected (只调用一次，之后一直持有到进程退出)"""
+
+    def __init__(self, lock_path: str, on_elected: Callable[[], None],
+                 retry_interval: Optional[float] = None):
+        self.lock = FileLock(lock_path)
+        self.on_elected = on_elected
+        self.retry_interval = retry_interval or config.LEADER_RETRY_INTERVAL
+        self.is_leader = False
+
+    def try_acquire(self) -> bool:
+        if self.is_leader:
+            return True
+        if not self.lock.acquire(blocking=False):
+            return False
+        self.is_leader = True
+        # 记录 leader 的进程号，便于排查
+        self.lock._file.truncate(0)
+        self.lock._file.write(str(os.getpid()))
+        self.lock._file.flush()
+        logger.info(f"[Cluster] 进程 {os.getpid()} 成为采集 leader")
+        self.on_elected()
+        return True
+
+    def run(self):
+        while not self.try_acquire():
+            threading.Event().wait(self.retry_interval)
+
+    def start(self):
+        """先同步尝试一次 (单进程时立即成为 leader)，失败后在后台线程中重试"""
+        if not self.try_acquire():
+            threading.Thread(target=self.run, name='leader-election', daemon=True).start()
@@ -0,0 +1,143 @@
+"""
+响应压缩 (gzip / brotli)
+按 Accept-Encoding 协商，只压缩超过 COMPRESS_MIN_SIZE 的可压缩类型；流式响应 (SSE、导出) 不处理。
+静态内容在启动时压缩一次 (StaticAsset)；带强 ETag 的响应 (最新快照) 每个版本只压缩一次。
+Flask 应用用 init_compression 注册，标准库 http.server 的处理器用 encode_body / StaticAsset
+"""
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import logging
+try:
+    from config import config
+except ImportError:
+    from backend.config import config
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 服务端支持的编码 (同等权重时优先 brotli)
+ENCODINGS = ('br', 'gzip') if BROTLI_AVAILABLE else ('gzip',)
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """按 Accept-Encoding 选择编码，客户端不接受任何压缩时返回 None"""
+    accepted: Dict[str, float] = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def compress(data: bytes, encoding: str, static: bool = False) -> bytes:
+    """static 为启动时一次性压缩的内容，使用最高压缩级别"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if static else config.COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=9 if static else config.COMPRESS_GZIP_LEVEL, mtime=0)
+
+def compressible(content_type: Optional[str]) -> bool:
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    return mimetype in config.COMPRESS_MIMETYPES
+
+def encode_body(body: bytes, content_type: str, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """动态内容: 返回 (响应体, Content-Encoding)，未压缩时编码为 None"""
+    if not config.COMPRESS_ENABLED or len(body) < config.COMPRESS_MIN_SIZE or not compressible(content_type):
+        return body, None
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return body, None
+    return compress(body, encoding), encoding
+
+class StaticAsset:
+    """启动时压缩一次的静态内容，请求时按 Accept-Encoding 选择已压缩的版本"""
+
+    def __init__(self, body: bytes, content_type: str):
+        self.content_type = content_type
+        self.variants: Dict[Optional[str], bytes] = {None: body}
+        if config.COMPRESS_ENABLED and len(body) >= config.COMPRESS_MIN_SIZE and compressible(content_type):
+            for encoding in ENCODINGS:
+                self.variants[encoding] = compress(body, encoding, static=True)
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        encoding = choose_encoding(accept_encoding)
+        if encoding in self.variants:
+            return self.variants[encoding], encoding
+        return self.variants[None], None
+
+class _EncodedCache:
+    """(请求, 强 ETag, 编码) -> 压缩后的响应体"""
+
+    def __init__(self, max_entries: int = 64):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self.max_entries = max_entries
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data: bytes):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+def init_compression(app):
+    """为 Flask 应用注册响应压缩"""
+    from flask import request
+
+    encoded_cache = _EncodedCache()
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code == 304:
+            # 304 沿用客户端缓存的 (压缩后的) 表示的弱 ETag
+            etag, weak = response.get_etag()
+            if etag and not weak and request.if_none_match.is_weak(etag):
+                response.set_etag(etag, weak=True)
+            return response
+        if not config.COMPRESS_ENABLED or response.status_code != 200 or response.direct_passthrough \
+                or response.is_streamed or 'Content-Encoding' in response.headers \
+                or not compressible(response.content_type):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None or (response.content_length or 0) < config.COMPRESS_MIN_SIZE:
+            return response
+
+        etag, weak = response.get_etag()
+        key = (request.full_path, etag, encoding) if etag and not weak else None
+        data = encoded_cache.get(key) if key else None
+        if data is None:
+            data = compress(response.get_data(), encoding)
+            if key:
+                encoded_cache.put(key, data)
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            # 压缩后的表示与原文字节不同，按 RFC 9110 改为弱 ETag (条件请求用弱比较)
+            response.set_etag(etag, weak=True)
+        return response
@@ -11,13 +11,107 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{DB_PATH}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # SQLite 并发配置 (采集线程写、请求线程读)
+    SQLITE_JOURNAL_MODE = 'WAL'
+    SQLITE_SYNCHRONOUS = 'NORMAL'
+    SQLITE_BUSY_TIMEOUT = 5000  # 毫秒
+    DB_WRITE_POOL_TIMEOUT = 30  # 秒，等待写连接的最长时间
+    DB_READ_POOL_SIZE = 8
+    DB_READ_POOL_OVERFLOW = 8
+    
+    # 冷数据归档配置 (Parquet)
+    ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'archive')
+    ARCHIVE_HOT_DAYS = 30  # SQLite 中保留的热数据天数
+    
+    # 数据保留策略: 表 -> 保留天数 (后台分批删除，每批一个短事务)
+    RETENTION_POLICIES = {
+        'comex_warehouse': 365,
+        'silver_etf': 365,
+        'silver_price': 365,
+        'gold_data': 365,
+        'data_log': 90,
+    }
+    RETENTION_ENABLED = True
+    RETENTION_BATCH_SIZE = 1000  # 每批最多删除的主键范围
+    RETENTION_PAUSE = 0.05  # 批次之间让出写锁的时间（秒）
+    RETENTION_INTERVAL = 3600  # 后台清理间隔（秒）
+    
+    # 在线备份配置
+    BACKUP_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'backup')
+    BACKUP_PAGES_PER_STEP = 1024  # 每步复制的页数
+    BACKUP_STEP_PAUSE = 0.05  # 步与步之间的暂停（秒），让出 I/O 给采集线程
+    BACKUP_INTEGRITY_CHECK = 'integrity_check'  # 大库可改为 quick_check
+    BACKUP_FULL_INTERVAL_DAYS = 7  # auto 模式下完整备份的间隔，其余为增量备份
+    BACKUP_KEEP_FULL = 4
+    BACKUP_KEEP_INCREMENTAL = 14
+    
+    # 实时推送 (SSE) 配置
+    STREAM_HISTORY_SIZE = 1000  # 断线重连可补发的最近事件数
+    STREAM_CLIENT_QUEUE_SIZE = 64  # 每个客户端最多待发送的品种数，溢出后改发完整快照
+    STREAM_HEARTBEAT = 15  # 秒
+    STREAM_RETRY_MS = 3000  # 浏览器断线重连间隔
+    # 每个 SSE 连接在整个生命周期内占用一个服务线程: 每个进程最多 SERVER_THREADS - STREAM_RESERVED_THREADS 个连接，
+    # 其余线程留给轮询和历史接口，超出的连接返回 503
+    STREAM_RESERVED_THREADS = 8
+    STREAM_MAX_CLIENTS = None  # 设置后覆盖上面的默认上限
+    
+    # 历史接口分页
+    PAGE_SIZE_DEFAULT = 500  # 未指定 limit 时每页行数
+    PAGE_SIZE_MAX = 5000  # 每页行数上限
+    
+    # 导出配置
+    EXPORT_BATCH_SIZE = 5000  # 流式导出每批读取的行数
+    
     # 数据采集配置
     DATA_UPDATE_INTERVAL = 3600  # 1小时更新一次
+    DEDUP_MAX_SPAN = 3600  # 相同取值最长合并跨度（秒），超过后写入新行
     
     # API配置
     FLASK_ENV = 'development'
     DEBUG = True
     JSON_AS_ASCII = False
+    JSON_PROVIDER = 'auto'  # auto: 安装了 orjson 时使用 orjson / orjson / json
+    
+    # 生产部署 (serve.py): 多 worker 进程，每个进程多线程
+    SERVER_HOST = '0.0.0.0'
+    SERVER_PORT = 5000
+    SERVER_WORKERS = 4
+    SERVER_THREADS = 64  # SSE 连接各占一个线程 (见 STREAM_RESERVED_THREADS)
+    
+    # 采集 leader 选举: 多个 worker 中只有持有锁文件的进程运行采集
+    LEADER_LOCK_PATH = None  # 默认为数据库文件旁的 <db>.leader.lock
+    LEADER_RETRY_INTERVAL = 5  # 秒，follower 尝试接任的间隔
+    FOLLOWER_SYNC_INTERVAL = 1  # 秒，follower 检查 leader 新写入的间隔
+    COLLECTOR_INTERVAL = 2  # 秒，后台采集周期
+    COLLECT_MAX_WORKERS = 24  # 一个采集周期并发的上游请求数上限 (每周期约 24 个请求)
+    
+    # 上游 HTTP 客户端 (http_client.py): 按主机保持长连接，失败按指数退避重试
+    HTTP_CONNECT_TIMEOUT = 3  # 秒
+    HTTP_READ_TIMEOUT = 10  # 秒
+    HTTP_RETRIES = 2  # 连接失败、429、5xx 的重试次数
+    HTTP_BACKOFF_FACTOR = 0.5  # 第 n 次重试前等待 backoff * 2^(n-1) 秒
+    HTTP_RETRY_STATUSES = [429, 500, 502, 503, 504]
+    HTTP_POOL_HOSTS = 16  # 保持连接池的主机数
+    HTTP_POOL_MAXSIZE = 24  # 每个主机的最大连接数 (不小于 COLLECT_MAX_WORKERS)
+    
+    # 最新快照共享内存段: leader 写入，同机的监控脚本等进程直接读取
+    SNAPSHOT_SEGMENT_ENABLED = True
+    SNAPSHOT_SEGMENT_PATH = None  # 默认为数据库文件旁的 <db>.snapshot
+    SNAPSHOT_SEGMENT_SLOTS = 64  # 最多保存的行数 (类别 x 市场/来源 x 金属)
+    SNAPSHOT_SEGMENT_HEARTBEAT = 2  # 秒，写入方刷新 heartbeat 的间隔
+    SNAPSHOT_SEGMENT_STALE = 10  # 秒，heartbeat 超过该时间未刷新视为采集进程未运行
+    SNAPSHOT_SEGMENT_MAX_AGE = 30  # 秒，段中数据超过该时间未确认 (采集持续失败) 视为不可用
+    SNAPSHOT_SEGMENT_FALLBACK_TTL = 60  # 秒，段中没有的代码 (汇率等) 直接获取后的缓存时间
+    
+    # 响应压缩 (gzip，安装了 brotli 时优先 br)
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 1024  # 字节，小于该大小的响应不压缩
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 5
+    COMPRESS_MIMETYPES = [
+        'application/json', 'application/vnd.columnar+json', 'application/msgpack',
+        'text/html', 'text/css', 'text/plain', 'text/csv', 'application/javascript',
+    ]
     
     # 数据源URL
     COMEX_WAREHOUSE_URL = 'https://www.cmegroup.com/market-data/datamine/open-interest.html'
@@ -25,7 +119,10 @@ class Config:
     
     # 缓存配置
     CACHE_ENABLED = True
-    CACHE_TIMEOUT = 3600
+    CACHE_TIMEOUT = 3600  # 秒，数据版本未变化时的最长缓存时间
+    CACHE_MAX_ENTRIES = 512
+    CACHE_MAX_BYTES = 64 * 1024 * 1024  # 缓存的响应字节总数上限 (每个进程)
+    CACHE_MAX_ENTRY_BYTES = 4 * 1024 * 1024  # 超过该大小的响应 (如大页的 fields=all) 不缓存
 
 # 开发环境
 class DevelopmentConfig(Config):
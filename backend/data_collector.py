@@ -1,61 +1,96 @@
 """
 数据采集模块 - 获取金银市场数据
 """
-import requests
 import json
 import random
 import time
-import hashlib
 import os
 import io
 import re
+import threading
 import pandas as pd
-from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
 import logging
-from models import Session, ComexWarehouse, SilverETF, SilverPrice, GoldData, DataLog
+from config import config
+import http_client
+from models import ComexWarehouse, SilverETF, SilverPrice, GoldData
+from rollups import tick_price
+from raw_archive import raw_archive
+from write_batch import WriteBatch
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_fetch_pool: Optional[ThreadPoolExecutor] = None
+_fetch_pool_lock = threading.Lock()
+
+def fetch_pool() -> ThreadPoolExecutor:
+    """上游请求共用的线程池 (进程内创建一次，最多 COLLECT_MAX_WORKERS 个并发请求)"""
+    global _fetch_pool
+    with _fetch_pool_lock:
+        if _fetch_pool is None:
+            _fetch_pool = ThreadPoolExecutor(max_workers=config.COLLECT_MAX_WORKERS, thread_name_prefix='fetch')
+        return _fetch_pool
+
 class DataCollector:
-    """数据采集器基类"""
+    """数据采集器基类
+
+    写入先暂存在 WriteBatch 中；传入共享批次时由 collect_all_data 在周期结束统一提交，
+    单独使用时每次 commit_and_publish / log_data_collection 立即提交。
+    上游请求经 self.http 发出: 传入周期共享的 RequestMemo 时，各采集器的相同请求只发出一次
+    """
     
-    def __init__(self):
-        self.session = Session()
-        self.raw_data_base_path = Path("data/raw")
-        self.raw_data_base_path.mkdir(parents=True, exist_ok=True)
+    def __init__(self, batch: Optional[WriteBatch] = None, memo: Optional[http_client.RequestMemo] = None):
+        self.batch = batch or WriteBatch()
+        self.http = memo if memo is not None else http_client
+        self._owns_batch = batch is None
+        self._mark = self.batch.mark()
     
     def save_raw_report(self, source: str, content: bytes, filename: str) -> str:
-        """保存原始报表文件并返回 SHA256 哈希值"""
+        """保存原始报表 (按内容去重，未变化时不写盘) 并返回 SHA256 哈希值"""
         try:
-            date_str = datetime.now().strftime("%Y-%m-%d")
-            save_dir = self.raw_data_base_path / source / date_str
-            save_dir.mkdir(parents=True, exist_ok=True)
-            
-            file_path = save_dir / filename
-            with open(file_path, "wb") as f:
-                f.write(content)
-            
-            # 计算哈希
-            file_hash = hashlib.sha256(content).hexdigest()
-            logger.info(f"[{source}] Saved raw report: {file_path}, hash: {file_hash}")
-            return file_hash
+            return raw_archive.store(source, filename, content)
         except Exception as e:
             logger.error(f"[{source}] Failed to save raw report: {e}")
             return ""
 
+    def externalize(self, row: Any, *fields: str):
+        """把审计大字段移入 payload_blob，行内只保存哈希"""
+        for field in fields:
+            setattr(row, f"{field}_hash", self.batch.add_blob(getattr(row, field)))
+            setattr(row, field, None)
+
+    def stage(self, row: Any, *blob_fields: str) -> bool:
+        """暂存一行；取值与上一行相同时只延长上一行的 valid_until。
+        只有插入新行时才把 blob_fields 移入 payload_blob (延长时没有行引用本次的审计内容)"""
+        inserted = self.batch.stage(row)
+        if inserted:
+            self.externalize(row, *blob_fields)
+        return inserted
+
+    def commit_and_publish(self, kind: Optional[str] = None):
+        """完成一组写入，新插入的行在提交后发布到最新快照存储"""
+        if kind:
+            self.batch.tag(self._mark, kind)
+        if self._owns_batch:
+            self.batch.commit()
+        self._mark = self.batch.mark()
+
+    def rollback(self):
+        """丢弃本组尚未提交的写入"""
+        self.batch.discard(self._mark)
+
     def log_data_collection(self, source: str, status: str, message: str = ""):
         """记录数据采集日志"""
-        try:
-            log = DataLog(source=source, status=status, message=message)
-            self.session.add(log)
-            self.session.commit()
-            logger.info(f"[{source}] {status}: {message}")
-        except Exception as e:
-            logger.error(f"记录日志失败: {str(e)}")
-            self.session.rollback()
+        self.batch.add_log(source, status, message)
+        logger.info(f"[{source}] {status}: {message}")
+        if self._owns_batch:
+            try:
+                self.batch.commit()
+            except Exception as e:
+                logger.error(f"记录日志失败: {str(e)}")
 
 class ComexDataCollector(DataCollector):
     """COMEX & LME 库存数据采集 - 增强审计链 (P0)"""
@@ -63,7 +98,7 @@ class ComexDataCollector(DataCollector):
     def _fetch_quandl_silver(self) -> Optional[Dict[str, Any]]:
         try:
             url = "https://www.quandl.com/api/v3/datasets/CFTC/SI_FO_L_ALL"
-            resp = requests.get(url, params={"api_key": "free", "rows": 1}, timeout=10)
+            resp = self.http.get(url, params={"api_key": "free", "rows": 1})
             if resp.status_code != 200:
                 return None
             payload = resp.json()
@@ -140,41 +175,51 @@ class ComexDataCollector(DataCollector):
         except Exception as e:
             logger.error(f"[COMEX] CME report parse failed: {e}")
             return None
-    def collect_warehouse_data(self) -> Optional[List[Dict]]:
-        """采集仓库库存数据 (COMEX/LME)"""
+    CME_REPORTS = {
+        "silver": "https://www.cmegroup.com/delivery_reports/Silver_Stocks.xls",
+        "gold": "https://www.cmegroup.com/delivery_reports/Gold_Stocks.xls",
+        "copper": "https://www.cmegroup.com/delivery_reports/Copper_Stocks.xls"
+    }
+
+    def _fetch_cme_report(self, metal: str, url: str) -> tuple:
+        """下载并解析一份 CME 库存日报 (白银失败时退回 Quandl)，返回 (解析结果, 原始文件哈希)"""
+        report_resp = self.http.get(url)
+        if report_resp.status_code == 200:
+            filename = url.split("/")[-1]
+            file_hash = self.save_raw_report("CME", report_resp.content, filename)
+            parsed = self._parse_cme_report(report_resp.content)
+        else:
+            parsed = None
+            file_hash = ""
+
+        if not parsed and metal == "silver":
+            qd = self._fetch_quandl_silver()
+            if qd:
+                parsed = {
+                    "total": qd["total"],
+                    "eligible": qd["eligible"],
+                    "registered": qd["registered"],
+                    "report_date": qd["date"],
+                    "header_row": "quandl"
+                }
+                file_hash = ""
+        return parsed, file_hash
+
+    def fetch_warehouse_data(self, pool: ThreadPoolExecutor) -> Dict[str, Future]:
+        """抓取阶段: 并发下载各金属的日报"""
+        return {metal: pool.submit(self._fetch_cme_report, metal, url) for metal, url in self.CME_REPORTS.items()}
+
+    def collect_warehouse_data(self, fetched: Optional[Dict[str, Future]] = None) -> Optional[List[Dict]]:
+        """采集仓库库存数据 (COMEX/LME)，fetched 为 fetch_warehouse_data 的结果 (未传入时在此抓取)"""
         try:
             results = []
             now = datetime.now(timezone.utc)
             as_of_date = now.strftime("%Y-%m-%d")
+            if fetched is None:
+                fetched = self.fetch_warehouse_data(fetch_pool())
 
-            cme_reports = {
-                "silver": "https://www.cmegroup.com/delivery_reports/Silver_Stocks.xls",
-                "gold": "https://www.cmegroup.com/delivery_reports/Gold_Stocks.xls",
-                "copper": "https://www.cmegroup.com/delivery_reports/Copper_Stocks.xls"
-            }
-
-            for metal, url in cme_reports.items():
-                report_resp = requests.get(url, timeout=10)
-                if report_resp.status_code == 200:
-                    filename = url.split("/")[-1]
-                    file_hash = self.save_raw_report("CME", report_resp.content, filename)
-                    parsed = self._parse_cme_report(report_resp.content)
-                else:
-                    parsed = None
-                    file_hash = ""
-
-                if not parsed and metal == "silver":
-                    qd = self._fetch_quandl_silver()
-                    if qd:
-                        parsed = {
-                            "total": qd["total"],
-                            "eligible": qd["eligible"],
-                            "registered": qd["registered"],
-                            "report_date": qd["date"],
-                            "header_row": "quandl"
-                        }
-                        file_hash = ""
-
+            for metal, url in self.CME_REPORTS.items():
+                parsed, file_hash = fetched[metal].result()
                 if not parsed:
                     continue
 
@@ -217,15 +262,15 @@ class ComexDataCollector(DataCollector):
                     "mapping": f"Total({total}) = Eligible({eligible}) + Registered({registered})"
                 }
                 warehouse = ComexWarehouse(**data)
-                self.session.add(warehouse)
+                self.stage(warehouse, 'raw_payload')
                 results.append(data)
                 
-            self.session.commit()
+            self.commit_and_publish('warehouse')
             self.log_data_collection('WAREHOUSE', 'success', f"Collected {len(results)} inventory items with audit chain")
             return results
         except Exception as e:
+            self.rollback()
             self.log_data_collection('WAREHOUSE', 'fail', str(e))
-            self.session.rollback()
             return None
 
 class ETFDataCollector(DataCollector):
@@ -238,7 +283,7 @@ class ETFDataCollector(DataCollector):
             headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
             }
-            resp = requests.get(url, params=params, headers=headers, timeout=10)
+            resp = self.http.get(url, params=params, headers=headers)
             if resp.status_code != 200:
                 return None
             data = resp.json()
@@ -251,7 +296,7 @@ class ETFDataCollector(DataCollector):
     def _fetch_metals_spot(self, metal: str) -> Optional[float]:
         try:
             url = f"https://api.metals.live/v1/spot/{metal}"
-            resp = requests.get(url, timeout=10)
+            resp = self.http.get(url)
             if resp.status_code != 200:
                 return None
             payload = resp.json()
@@ -270,25 +315,31 @@ class ETFDataCollector(DataCollector):
             logger.error(f"[ETF] Metals.Live fetch failed: {e}")
             return None
 
-    def collect_etf_data(self) -> Optional[List[Dict]]:
-        """采集白银ETF持仓数据"""
+    ETF_LIST = [
+        {"symbol": "SLV", "metal": "silver"},
+        {"symbol": "PSLV", "metal": "silver"},
+        {"symbol": "AGX", "metal": "silver"},
+        {"symbol": "GLD", "metal": "gold"},
+        {"symbol": "IAU", "metal": "gold"}
+    ]
+
+    def fetch_etf_data(self, pool: ThreadPoolExecutor) -> Dict[str, Dict[str, Future]]:
+        """抓取阶段: 并发请求现货价与各 ETF 行情"""
+        return {
+            "spot": {metal: pool.submit(self._fetch_metals_spot, metal) for metal in ("silver", "gold")},
+            "quotes": {etf["symbol"]: pool.submit(self._fetch_yahoo_quote, etf["symbol"]) for etf in self.ETF_LIST}
+        }
+
+    def collect_etf_data(self, fetched: Optional[Dict[str, Dict[str, Future]]] = None) -> Optional[List[Dict]]:
+        """采集白银ETF持仓数据，fetched 为 fetch_etf_data 的结果 (未传入时在此抓取)"""
         try:
-            etf_list = [
-                {"symbol": "SLV", "metal": "silver"},
-                {"symbol": "PSLV", "metal": "silver"},
-                {"symbol": "AGX", "metal": "silver"},
-                {"symbol": "GLD", "metal": "gold"},
-                {"symbol": "IAU", "metal": "gold"}
-            ]
-
             results = []
             now = datetime.now(timezone.utc)
-            spot_cache = {
-                "silver": self._fetch_metals_spot("silver"),
-                "gold": self._fetch_metals_spot("gold")
-            }
-            for etf in etf_list:
-                quote = self._fetch_yahoo_quote(etf["symbol"])
+            if fetched is None:
+                fetched = self.fetch_etf_data(fetch_pool())
+            spot_cache = {metal: future.result() for metal, future in fetched["spot"].items()}
+            for etf in self.ETF_LIST:
+                quote = fetched["quotes"][etf["symbol"]].result()
                 if not quote:
                     continue
                 price = quote.get("price", {}).get("regularMarketPrice", {}).get("raw")
@@ -307,7 +358,7 @@ class ETFDataCollector(DataCollector):
                     source="Yahoo Finance",
                     provider_as_of=quote.get("price", {}).get("regularMarketTime")
                 )
-                self.session.add(etf_data)
+                self.stage(etf_data)
                 results.append({
                     "etf_name": etf["symbol"],
                     "holdings_oz": holdings_oz,
@@ -316,12 +367,12 @@ class ETFDataCollector(DataCollector):
                     "source": "Yahoo Finance"
                 })
             
-            self.session.commit()
+            self.commit_and_publish()
             self.log_data_collection('ETF_DATA', 'success', f"Collected {len(results)} ETFs (Yahoo Finance)")
             return results
         except Exception as e:
+            self.rollback()
             self.log_data_collection('ETF_DATA', 'fail', str(e))
-            self.session.rollback()
             return None
 
 class PriceDataCollector(DataCollector):
@@ -349,7 +400,7 @@ class PriceDataCollector(DataCollector):
             url = f"{self.SINA_URL}{','.join(symbols)}"
             proxies = {"http": None, "https": None}
             headers = {"Referer": "http://finance.sina.com.cn"}
-            resp = requests.get(url, headers=headers, timeout=5, proxies=proxies)
+            resp = self.http.get(url, headers=headers, proxies=proxies)
             content = resp.text
             
             results = {}
@@ -400,19 +451,16 @@ class PriceDataCollector(DataCollector):
                 "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
                 "Accept-Language": "en-US,en;q=0.9"
             }
-            for attempt in range(2):
-                try:
-                    resp = requests.get(url, headers=headers, timeout=5, proxies=proxies)
-                    if resp.status_code == 200:
-                        data = resp.json()
-                        meta = data["chart"]["result"][0]["meta"]
-                        price = meta.get("regularMarketPrice")
-                        ts = meta.get("regularMarketTime")
-                        logger.info(f"[Yahoo] Successfully fetched {symbol}: {price}")
-                        return {"price": float(price), "time": ts, "raw": meta}
-                    time.sleep(1)
-                except Exception as ex:
-                    logger.warning(f"[Yahoo] Attempt {attempt+1} failed for {symbol}: {ex}")
+            # 连接失败、429 与 5xx 由 http_client 按退避策略重试
+            resp = self.http.get(url, headers=headers, proxies=proxies)
+            if resp.status_code == 200:
+                data = resp.json()
+                meta = data["chart"]["result"][0]["meta"]
+                price = meta.get("regularMarketPrice")
+                ts = meta.get("regularMarketTime")
+                logger.info(f"[Yahoo] Successfully fetched {symbol}: {price}")
+                return {"price": float(price), "time": ts, "raw": meta}
+            logger.warning(f"[Yahoo] HTTP {resp.status_code} for {symbol}")
             return {}
         except Exception as e:
             logger.error(f"[Yahoo] Critical error fetching {symbol}: {e}")
@@ -421,7 +469,7 @@ class PriceDataCollector(DataCollector):
     def _fetch_metals_live(self, metal: str) -> Dict[str, Any]:
         try:
             url = f"https://api.metals.live/v1/spot/{metal}"
-            resp = requests.get(url, timeout=10)
+            resp = self.http.get(url)
             if resp.status_code != 200:
                 return {}
             payload = resp.json()
@@ -467,34 +515,66 @@ class PriceDataCollector(DataCollector):
             
         return {"is_error": is_error, "quality": quality}
 
-    def collect_prices_by_market(self, market: str) -> Optional[List[Dict]]:
-        """按市场采集价格数据 (真实数据)"""
+    METALS = ["gold", "silver", "copper"]
+    # 以 Metals.Live 为主源的金属 (新浪作备源)
+    METALS_LIVE = {"London": ["gold", "silver"]}
+
+    def fetch_market(self, pool: ThreadPoolExecutor, market: str) -> Dict[str, Any]:
+        """抓取阶段: 并发请求一个市场的全部上游 (新浪批量行情、伦敦金银的 Metals.Live 与各金属的 Yahoo)
+        Yahoo 是 COMEX 的主源、新浪数据的备源，预先请求；Metals.Live 的金属只在主源或新浪缺失时
+        回退请求 Yahoo (fetch_yahoo_fallbacks)"""
+        sina_symbols = [self.SYMBOL_MAP[f"{market}_{m}"][0] for m in self.METALS]
+        metals_live = self.METALS_LIVE.get(market, [])
+        return {
+            "sina": pool.submit(self._fetch_sina, sina_symbols),
+            "metals_live": {metal: pool.submit(self._fetch_metals_live, metal) for metal in metals_live},
+            "yahoo": {
+                metal: pool.submit(self._fetch_yahoo, self.SYMBOL_MAP[f"{market}_{metal}"][1])
+                for metal in self.METALS if metal not in metals_live
+            }
+        }
+
+    def fetch_yahoo_fallbacks(self, pool: ThreadPoolExecutor, market: str, fetched: Dict[str, Any],
+                              sina_data: Dict[str, Any]):
+        """Metals.Live 没有价格或新浪缺少该品种时 (Yahoo 作主源回退或备源)，补发 Yahoo 请求"""
+        for metal, future in fetched["metals_live"].items():
+            if metal in fetched["yahoo"]:
+                continue
+            symbols = self.SYMBOL_MAP[f"{market}_{metal}"]
+            if not future.result().get("price") or symbols[0] not in sina_data:
+                fetched["yahoo"][metal] = pool.submit(self._fetch_yahoo, symbols[1])
+
+    def collect_prices_by_market(self, market: str, fetched: Optional[Dict[str, Any]] = None) -> Optional[List[Dict]]:
+        """按市场采集价格数据 (真实数据)，fetched 为 fetch_market 的结果 (未传入时在此抓取)"""
         try:
             results = []
             now = datetime.now(timezone.utc)
-            metals = ["gold", "silver", "copper"]
+            metals = self.METALS
+            if fetched is None:
+                fetched = self.fetch_market(fetch_pool(), market)
 
-            sina_symbols = [self.SYMBOL_MAP[f"{market}_{m}"][0] for m in metals]
-            sina_data = self._fetch_sina(sina_symbols)
+            sina_data = fetched["sina"].result()
+            self.fetch_yahoo_fallbacks(fetch_pool(), market, fetched, sina_data)
 
             for metal in metals:
                 map_key = f"{market}_{metal}"
-                sina_sym, yahoo_sym = self.SYMBOL_MAP[map_key]
+                sina_sym = self.SYMBOL_MAP[map_key][0]
 
                 main_val = None
                 as_of_str = ""
                 raw_payload = {}
                 source = ""
 
-                if market == "London" and metal in ["gold", "silver"]:
-                    api = self._fetch_metals_live(metal)
+                yahoo = fetched["yahoo"][metal].result() if metal in fetched["yahoo"] else {}
+                if metal in fetched["metals_live"]:
+                    api = fetched["metals_live"][metal].result()
                     if api.get("price"):
                         main_val = api["price"]
                         as_of_str = str(api.get("time") or "")
                         raw_payload = api.get("raw") or {}
                         source = "Metals.Live"
                 if main_val is None and market == "Comex":
-                    api = self._fetch_yahoo(yahoo_sym)
+                    api = yahoo
                     if api.get("price"):
                         main_val = api["price"]
                         as_of_str = str(api.get("time") or "")
@@ -506,7 +586,7 @@ class PriceDataCollector(DataCollector):
                     raw_payload = sina_data[sina_sym]["raw"]
                     source = "Sina"
                 if main_val is None:
-                    api = self._fetch_yahoo(yahoo_sym)
+                    api = yahoo
                     if api.get("price"):
                         main_val = api["price"]
                         as_of_str = str(api.get("time") or "")
@@ -519,10 +599,8 @@ class PriceDataCollector(DataCollector):
                 backup_val = None
                 if source != "Sina" and sina_sym in sina_data:
                     backup_val = sina_data[sina_sym]["last"]
-                if backup_val is None:
-                    backup = self._fetch_yahoo(yahoo_sym)
-                    if backup.get("price"):
-                        backup_val = backup["price"]
+                if backup_val is None and yahoo.get("price"):
+                    backup_val = yahoo["price"]
                 
                 if map_key == "Comex_copper" and main_val > 100:
                     main_val = main_val / 100.0
@@ -565,14 +643,15 @@ class PriceDataCollector(DataCollector):
                 }
 
                 price = SilverPrice(**data)
-                self.session.add(price)
+                self.stage(price, 'raw_payload', 'mapping')
+                self.batch.add_candles(market, metal, tick_price(spot_price, futures_price), now)
                 results.append(data)
                 
-            self.session.commit()
+            self.commit_and_publish('price')
             return results
         except Exception as e:
             logger.error(f"采集 {market} 价格失败: {str(e)}")
-            self.session.rollback()
+            self.rollback()
             return None
 
     def collect_london_price(self) -> Optional[List[Dict]]:
@@ -614,44 +693,67 @@ class InvestmentAnalyticsCollector(DataCollector):
                     indicator=item['indicator'],
                     value=item['value']
                 )
-                self.session.add(data)
+                self.stage(data)
                 results.append(item)
             
-            self.session.commit()
+            self.commit_and_publish()
             self.log_data_collection('ANALYTICS_DATA', 'success', "Analytics benchmarks loaded")
             return results
         except Exception as e:
+            self.rollback()
             self.log_data_collection('ANALYTICS_DATA', 'fail', str(e))
-            self.session.rollback()
             return None
 
-def collect_all_data():
-    """采集所有数据"""
+def collect_all_data() -> Optional[Dict[str, Any]]:
+    """采集所有数据，整个周期的写入在一个事务内提交，返回本次提交的统计"""
     logger.info("=" * 50)
     logger.info("开始数据采集...")
     logger.info("=" * 50)
     
+    batch = WriteBatch()
+    # 周期内的相同请求 (两个采集器的 Metals.Live 现货、多个市场共用的 Yahoo 品种) 只发出一次
+    memo = http_client.RequestMemo()
+    comex_collector = ComexDataCollector(batch, memo)
+    etf_collector = ETFDataCollector(batch, memo)
+    price_collector = PriceDataCollector(batch, memo)
+    markets = ["London", "Shanghai", "Comex"]
+    
+    # 抓取阶段: 所有数据源的上游请求同时发出，周期耗时约为最慢的单个请求
+    fetch_started = time.perf_counter()
+    pool = fetch_pool()
+    comex_fetched = comex_collector.fetch_warehouse_data(pool)
+    etf_fetched = etf_collector.fetch_etf_data(pool)
+    price_fetched = {market: price_collector.fetch_market(pool, market) for market in markets}
+    
+    # 解析/写入阶段: 按固定顺序等待结果并暂存 (WriteBatch 只在本线程使用)
     # COMEX库存
-    comex_collector = ComexDataCollector()
-    comex_collector.collect_warehouse_data()
+    comex_collector.collect_warehouse_data(comex_fetched)
     
     # ETF数据
-    etf_collector = ETFDataCollector()
-    etf_collector.collect_etf_data()
+    etf_collector.collect_etf_data(etf_fetched)
     
     # 价格数据
-    price_collector = PriceDataCollector()
-    price_collector.collect_london_price()
-    price_collector.collect_shanghai_price()
-    price_collector.collect_comex_price()
+    for market in markets:
+        price_collector.collect_prices_by_market(market, price_fetched[market])
+    collect_ms = round((time.perf_counter() - fetch_started) * 1000, 1)
     
     # 分析数据
-    analytics_collector = InvestmentAnalyticsCollector()
+    analytics_collector = InvestmentAnalyticsCollector(batch)
     analytics_collector.collect_analytics_data()
     
+    stats = batch.commit()
+    stats['collect_ms'] = collect_ms
+    stats.update(memo.stats())
+    logger.info(
+        f"[Cycle] 上游请求 {stats['requests']} 次 (合并重复 {stats['memo_hits']} 次), 抓取与解析 {collect_ms}ms, 写入 {stats['rows']} 行 (新增 {stats['inserted']}, 延长 {stats['extended']}, "
+        f"K线 {stats['candles']}, 日志 {stats['logs']}) / {stats['statements']} 条语句 / 1 次提交, "
+        f"写入 {stats['write_ms']}ms, 提交 {stats['commit_ms']}ms"
+    )
+    
     logger.info("=" * 50)
     logger.info("数据采集完成！")
     logger.info("=" * 50)
+    return stats
 
 if __name__ == '__main__':
     from models import init_db
@@ -7,6 +7,24 @@ import sqlite3
 import os
 from datetime import datetime, timedelta
 import argparse
+try:
+    from config import config
+    from migrations import migrate
+    from rollups import backfill_candles
+    from archive import archive_table, ARCHIVE_MODELS
+    from raw_archive import raw_archive
+    from retention import purge_table, purge_orphan_blobs, apply_retention, run_retention_loop
+    from exporter import ExportRequest, EXPORT_TABLES, EXPORT_FORMATS, export_to_file
+    from backup import run_backup, restore_backup
+except ImportError:
+    from backend.config import config
+    from backend.migrations import migrate
+    from backend.rollups import backfill_candles
+    from backend.archive import archive_table, ARCHIVE_MODELS
+    from backend.raw_archive import raw_archive
+    from backend.retention import purge_table, purge_orphan_blobs, apply_retention, run_retention_loop
+    from backend.exporter import ExportRequest, EXPORT_TABLES, EXPORT_FORMATS, export_to_file
+    from backend.backup import run_backup, restore_backup
 
 DB_PATH = 'data/silver_gold.db'
 
@@ -16,46 +34,28 @@ def get_db():
     conn.row_factory = sqlite3.Row
     return conn
 
-def backup_database():
-    """备份数据库"""
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_path = f'data/backup/silver_gold_{timestamp}.db'
-    
-    # 创建备份目录
-    os.makedirs('data/backup', exist_ok=True)
-    
-    conn = get_db()
-    backup_conn = sqlite3.connect(backup_path)
-    conn.backup(backup_conn)
-    backup_conn.close()
-    conn.close()
-    
-    print(f"✓ 数据库备份完成: {backup_path}")
+def backup_database(mode='auto'):
+    """在线备份数据库 (分步复制，不阻塞采集写入)，并按保留策略轮换"""
+    path = run_backup(DB_PATH, mode)
+    size = os.path.getsize(path) / 1024 / 1024  # MB
+    print(f"✓ 数据库备份完成: {path} ({size:.2f} MB)")
+
+def restore_database(backup_path, dest_path):
+    """从完整备份或增量备份恢复到新文件"""
+    restore_backup(backup_path, dest_path)
+    print(f"✓ 已恢复到 {dest_path} (完整性检查通过)")
 
 def cleanup_old_logs(days=90):
-    """清理旧日志"""
+    """清理旧日志 (分批删除)"""
     conn = get_db()
-    cursor = conn.cursor()
-    
-    cutoff_date = datetime.now() - timedelta(days=days)
-    
-    cursor.execute(
-        "DELETE FROM data_log WHERE created_at < ?",
-        (cutoff_date.isoformat(),)
-    )
-    
-    deleted = cursor.rowcount
-    conn.commit()
+    deleted = purge_table(conn, 'data_log', days)
     conn.close()
     
     print(f"✓ 已删除 {deleted} 条旧日志记录 (超过 {days} 天)")
 
 def cleanup_old_data(days=365):
-    """清理旧数据"""
+    """清理旧数据 (分批删除，不长时间占用写锁)"""
     conn = get_db()
-    cursor = conn.cursor()
-    
-    cutoff_date = datetime.now() - timedelta(days=days)
     
     tables = [
         'comex_warehouse',
@@ -66,17 +66,63 @@ def cleanup_old_data(days=365):
     
     total_deleted = 0
     for table in tables:
-        cursor.execute(
-            f"DELETE FROM {table} WHERE created_at < ?",
-            (cutoff_date.isoformat(),)
-        )
-        total_deleted += cursor.rowcount
-        print(f"  {table}: 删除 {cursor.rowcount} 条记录")
+        deleted = purge_table(conn, table, days)
+        total_deleted += deleted
+        print(f"  {table}: 删除 {deleted} 条记录")
     
-    conn.commit()
+    # 被删除的行引用的审计内容
+    blobs = purge_orphan_blobs(conn)
     conn.close()
     
-    print(f"✓ 已删除总共 {total_deleted} 条旧数据 (超过 {days} 天)")
+    print(f"✓ 已删除总共 {total_deleted} 条旧数据 (超过 {days} 天)，{blobs} 条不再被引用的审计内容")
+
+def run_retention(once=False, interval=None):
+    """按 config.RETENTION_POLICIES 清理过期数据；默认持续运行"""
+    if once:
+        conn = get_db()
+        results = apply_retention(conn)
+        conn.close()
+        for table, deleted in results.items():
+            if table in config.RETENTION_POLICIES:
+                print(f"  {table}: 删除 {deleted} 条记录 (保留 {config.RETENTION_POLICIES[table]} 天)")
+            else:
+                print(f"  {table}: 删除 {deleted} 条不再被引用的审计内容")
+        print(f"✓ 已删除总共 {sum(results.values())} 条过期数据")
+        return
+    
+    print(f"持续运行数据保留策略 (每 {interval or config.RETENTION_INTERVAL} 秒)，Ctrl+C 退出")
+    try:
+        run_retention_loop(DB_PATH, interval)
+    except KeyboardInterrupt:
+        print("✓ 已停止")
+
+def archive_old_data(days=config.ARCHIVE_HOT_DAYS, tables=None):
+    """把超过热数据窗口的完整日期归档为 Parquet"""
+    conn = get_db()
+    before = datetime.utcnow() - timedelta(days=days)
+    
+    total_archived = 0
+    for table in tables or list(ARCHIVE_MODELS):
+        archived = archive_table(conn, table, before)
+        total_archived += archived
+        print(f"  {table}: 归档 {archived} 条记录")
+    
+    # 归档文件中已内联审计内容，热库中不再被引用的内容可以删除
+    blobs = purge_orphan_blobs(conn) if total_archived else 0
+    conn.close()
+    if blobs:
+        print(f"  payload_blob: 删除 {blobs} 条不再被引用的审计内容")
+    
+    print(f"✓ 已归档总共 {total_archived} 条记录 (早于 {before.strftime('%Y-%m-%d')})")
+    print("  提示: 运行 optimize 以回收数据库空间")
+
+def pack_raw_reports():
+    """导入旧布局的原始报表，并把已结束日期的报表打包"""
+    imported = raw_archive.import_legacy()
+    print(f"  导入旧布局报表: {imported} 个")
+    
+    packed = raw_archive.pack_closed_days()
+    print(f"✓ 已打包 {packed} 个原始报表")
 
 def get_statistics():
     """获取数据库统计信息"""
@@ -131,53 +177,55 @@ def optimize_database():
     # 分析表以优化查询
     cursor.execute("ANALYZE")
     
-    # 创建索引（如果不存在）
-    indexes = [
-        "CREATE INDEX IF NOT EXISTS idx_comex_date ON comex_warehouse(date)",
-        "CREATE INDEX IF NOT EXISTS idx_etf_date ON silver_etf(date)",
-        "CREATE INDEX IF NOT EXISTS idx_etf_name ON silver_etf(etf_name)",
-        "CREATE INDEX IF NOT EXISTS idx_price_market ON silver_price(market)",
-        "CREATE INDEX IF NOT EXISTS idx_price_date ON silver_price(date)",
-        "CREATE INDEX IF NOT EXISTS idx_gold_category ON gold_data(category)",
-        "CREATE INDEX IF NOT EXISTS idx_log_date ON data_log(created_at)",
-    ]
-    
-    for idx in indexes:
-        cursor.execute(idx)
+    # 索引由迁移统一维护 (见 migrations.py)
+    version = migrate(conn)
+    print(f"  结构版本: v{version}")
     
     conn.commit()
     conn.close()
     
     print("✓ 数据库优化完成")
 
-def export_to_csv(table):
-    """导出表数据为CSV"""
-    import csv
-    
+def rebuild_rollups():
+    """从原始报价重建K线汇总表"""
     conn = get_db()
-    cursor = conn.cursor()
+    migrate(conn)
     
-    cursor.execute(f"SELECT * FROM {table}")
-    columns = [description[0] for description in cursor.description]
-    rows = cursor.fetchall()
-    
-    filename = f"export_{table}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    print("重建K线汇总中...")
+    total = backfill_candles(conn)
+    conn.close()
     
-    with open(filename, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(columns)
-        for row in rows:
-            writer.writerow(row)
+    print(f"✓ 已重建 {total} 根K线")
+
+def export_table(table, fmt='csv', columns=None, start=None, end=None, compress=False, output=None):
+    """流式导出表数据 (CSV / NDJSON / Parquet，按批读取，内存占用与表大小无关)"""
+    req = ExportRequest(
+        table, fmt=fmt, columns=columns,
+        start=datetime.fromisoformat(start) if start else None,
+        end=datetime.fromisoformat(end) if end else None,
+        compress=compress
+    )
     
-    print(f"✓ 已导出 {len(rows)} 条记录到 {filename}")
+    conn = sqlite3.connect(DB_PATH)
+    path = export_to_file(conn, req, output)
     conn.close()
+    
+    size = os.path.getsize(path) / 1024 / 1024  # MB
+    print(f"✓ 已导出 {table} 到 {path} ({size:.2f} MB)")
 
 def main():
     parser = argparse.ArgumentParser(description='数据库管理工具')
     subparsers = parser.add_subparsers(dest='command')
     
     # 备份命令
-    subparsers.add_parser('backup', help='备份数据库')
+    backup = subparsers.add_parser('backup', help='在线备份数据库')
+    backup.add_argument('--mode', default='auto', choices=['auto', 'full', 'incremental'],
+                        help='备份方式 (auto: 完整备份过期时做完整备份，否则增量)')
+    
+    # 恢复备份
+    restore = subparsers.add_parser('restore', help='从备份恢复到新的数据库文件')
+    restore.add_argument('backup', help='备份文件 (.db 或 .delta)')
+    restore.add_argument('dest', help='恢复到的数据库文件')
     
     # 清理旧日志
     cleanup_logs = subparsers.add_parser('cleanup-logs', help='清理旧日志')
@@ -187,30 +235,62 @@ def main():
     cleanup_data = subparsers.add_parser('cleanup-data', help='清理旧数据')
     cleanup_data.add_argument('--days', type=int, default=365, help='清理多少天前的数据')
     
+    # 数据保留策略
+    retention = subparsers.add_parser('retention', help='按保留策略分批清理过期数据 (默认持续运行)')
+    retention.add_argument('--once', action='store_true', help='只清理一次')
+    retention.add_argument('--interval', type=int, help='清理间隔（秒）')
+    
+    # 归档冷数据
+    archive = subparsers.add_parser('archive', help='将已收盘日期的历史数据归档为Parquet')
+    archive.add_argument('--days', type=int, default=config.ARCHIVE_HOT_DAYS, help='SQLite中保留多少天的热数据')
+    archive.add_argument('--tables', nargs='+', choices=list(ARCHIVE_MODELS), help='要归档的表 (默认全部)')
+    
+    # 打包原始报表
+    subparsers.add_parser('pack-raw', help='按内容去重并打包已结束日期的原始报表')
+    
     # 统计信息
     subparsers.add_parser('stats', help='显示数据库统计信息')
     
     # 优化数据库
     subparsers.add_parser('optimize', help='优化数据库')
     
+    # 重建K线
+    subparsers.add_parser('rollup-backfill', help='从原始报价重建K线汇总表')
+    
     # 导出数据
-    export = subparsers.add_parser('export', help='导出表数据为CSV')
-    export.add_argument('table', help='表名')
+    export = subparsers.add_parser('export', help='导出表数据 (CSV/NDJSON/Parquet)')
+    export.add_argument('table', choices=list(EXPORT_TABLES), help='表名')
+    export.add_argument('--format', default='csv', choices=list(EXPORT_FORMATS), help='导出格式')
+    export.add_argument('--columns', nargs='+', help='只导出这些列')
+    export.add_argument('--from', dest='start', help='开始时间 (ISO 格式)')
+    export.add_argument('--to', dest='end', help='结束时间 (ISO 格式)')
+    export.add_argument('--gzip', action='store_true', help='gzip 压缩 (CSV/NDJSON)')
+    export.add_argument('--output', help='输出文件路径')
     
     args = parser.parse_args()
     
     if args.command == 'backup':
-        backup_database()
+        backup_database(args.mode)
+    elif args.command == 'restore':
+        restore_database(args.backup, args.dest)
     elif args.command == 'cleanup-logs':
         cleanup_old_logs(args.days)
     elif args.command == 'cleanup-data':
         cleanup_old_data(args.days)
+    elif args.command == 'retention':
+        run_retention(args.once, args.interval)
+    elif args.command == 'archive':
+        archive_old_data(args.days, args.tables)
+    elif args.command == 'pack-raw':
+        pack_raw_reports()
     elif args.command == 'stats':
         get_statistics()
     elif args.command == 'optimize':
         optimize_database()
+    elif args.command == 'rollup-backfill':
+        rebuild_rollups()
     elif args.command == 'export':
-        export_to_csv(args.table)
+        export_table(args.table, args.format, args.columns, args.start, args.end, args.gzip, args.output)
     else:
         parser.print_help()
 
@@ -0,0 +1,190 @@
+"""
+流式导出 (CSV / NDJSON / Parquet，可选 gzip)
+按固定批次从游标读取并逐块输出，内存占用与表大小无关；
+db_manager export 命令与 /api/export/<table> 共用
+"""
+import csv
+import io
+import json
+import sqlite3
+import zlib
+from datetime import datetime
+from typing import Iterator, List, Optional, Any
+import logging
+try:
+    from config import config
+    from models import ComexWarehouse, SilverETF, SilverPrice, PriceCandle, GoldData, DataLog
+    from archive import PARQUET_AVAILABLE, arrow_schema, parse_row
+except ImportError:
+    from backend.config import config
+    from backend.models import ComexWarehouse, SilverETF, SilverPrice, PriceCandle, GoldData, DataLog
+    from backend.archive import PARQUET_AVAILABLE, arrow_schema, parse_row
+
+if PARQUET_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# 可导出的表 -> (模型, 时间范围过滤使用的列)
+EXPORT_TABLES = {
+    'comex_warehouse': (ComexWarehouse, 'date'),
+    'silver_etf': (SilverETF, 'date'),
+    'silver_price': (SilverPrice, 'date'),
+    'gold_data': (GoldData, 'date'),
+    'price_candle': (PriceCandle, 'bucket_start'),
+    'data_log': (DataLog, 'created_at'),
+}
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+class ExportRequest:
+    """校验后的导出参数 (开始输出前完成校验，错误以 ValueError 抛出)"""
+
+    def __init__(self, table: str, fmt: str = 'csv', columns: Optional[List[str]] = None,
+                 start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 compress: bool = False):
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Unsupported table: {table}, expected one of {list(EXPORT_TABLES)}")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}, expected one of {list(EXPORT_FORMATS)}")
+        if fmt == 'parquet' and not PARQUET_AVAILABLE:
+            raise ValueError("Parquet 导出需要 pyarrow: pip install pyarrow")
+        self.model, self.time_column = EXPORT_TABLES[table]
+        all_columns = [c.name for c in self.model.__table__.columns]
+        if columns:
+            unknown = [c for c in columns if c not in all_columns]
+            if unknown:
+                raise ValueError(f"Unknown columns for {table}: {unknown}")
+            # 保持表定义中的列顺序，与 Parquet 结构一致
+            columns = [c for c in all_columns if c in columns]
+        self.table = table
+        self.fmt = fmt
+        self.columns = columns or all_columns
+        self.start = start
+        self.end = end
+        # Parquet 自带列压缩，不再套 gzip
+        self.compress = compress and fmt != 'parquet'
+
+    @property
+    def content_type(self) -> str:
+        return 'application/gzip' if self.compress else EXPORT_FORMATS[self.fmt][0]
+
+    @property
+    def filename(self) -> str:
+        name = f"export_{self.table}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{EXPORT_FORMATS[self.fmt][1]}"
+        return name + '.gz' if self.compress else name
+
+def iter_batches(conn: sqlite3.Connection, req: ExportRequest, batch_size: Optional[int] = None) -> Iterator[List[tuple]]:
+    """按批读取行 (有时间范围时走时间列索引，否则按主键顺序)"""
+    batch_size = batch_size or config.EXPORT_BATCH_SIZE
+    where, params = [], []
+    if req.start is not None:
+        where.append(f"{req.time_column} >= ?")
+        params.append(req.start.strftime('%Y-%m-%d %H:%M:%S'))
+    if req.end is not None:
+        where.append(f"{req.time_column} <= ?")
+        params.append(req.end.strftime('%Y-%m-%d %H:%M:%S.%f'))
+    sql = f"SELECT {', '.join(req.columns)} FROM {req.table}"
+    if where:
+        sql += f" WHERE {' AND '.join(where)} ORDER BY {req.time_column}"
+    else:
+        sql += " ORDER BY id"
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+def _csv_chunks(batches: Iterator[List[tuple]], columns: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def _ndjson_chunks(batches: Iterator[List[tuple]], columns: List[str]) -> Iterator[bytes]:
+    for rows in batches:
+        yield ''.join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + '\n' for row in rows
+        ).encode('utf-8')
+
+class _ChunkSink(io.RawIOBase):
+    """ParquetWriter 的输出目标：写入的字节暂存，由生成器逐块取走"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def _parquet_chunks(batches: Iterator[List[tuple]], req: ExportRequest) -> Iterator[bytes]:
+    schema = arrow_schema(req.model, req.columns)
+    datetime_idx = [i for i, f in enumerate(schema) if pa.types.is_timestamp(f.type)]
+    sink = _ChunkSink()
+    # 每批写成一个 row group，写完即输出
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for rows in batches:
+            writer.write_table(pa.Table.from_pylist(
+                [dict(zip(req.columns, parse_row(row, datetime_idx))) for row in rows], schema=schema
+            ))
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream_export(conn: sqlite3.Connection, req: ExportRequest, batch_size: Optional[int] = None) -> Iterator[bytes]:
+    """导出内容的字节块生成器"""
+    batches = iter_batches(conn, req, batch_size)
+    if req.fmt == 'csv':
+        chunks = _csv_chunks(batches, req.columns)
+    elif req.fmt == 'ndjson':
+        chunks = _ndjson_chunks(batches, req.columns)
+    else:
+        chunks = _parquet_chunks(batches, req)
+    return _gzip(chunks) if req.compress else chunks
+
+def export_to_file(conn: sqlite3.Connection, req: ExportRequest, path: Optional[str] = None) -> str:
+    """导出到文件，返回文件路径"""
+    path = path or req.filename
+    with open(path, 'wb') as f:
+        for chunk in stream_export(conn, req):
+            f.write(chunk)
+    return path
@@ -0,0 +1,87 @@
+"""
+历史接口的响应格式 (内容协商)
+由 format= 参数或 Accept 头选择:
+    json       行对象数组 (默认)
+    columnar   按列的 JSON: {"columns": [...], "data": {列: [值...]}}
+    msgpack    与 columnar 结构相同的 MessagePack (需要 msgpack)
+    arrow      Arrow IPC 流 (需要 pyarrow)，分页游标在 X-Next-Cursor 响应头中
+按列的格式不重复字段名，体积更小，可直接构造 DataFrame，无需逐行解析
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from flask import current_app
+try:
+    from archive import PARQUET_AVAILABLE, arrow_schema
+except ImportError:
+    from backend.archive import PARQUET_AVAILABLE, arrow_schema
+
+if PARQUET_AVAILABLE:
+    import pyarrow as pa
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+RESPONSE_FORMATS = {
+    'json': 'application/json',
+    'columnar': 'application/vnd.columnar+json',
+    'msgpack': 'application/msgpack',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+def negotiate(requested: Optional[str], accept) -> str:
+    """format 参数优先，其次按 Accept 头匹配，默认 json；格式未知或依赖未安装时抛出 ValueError"""
+    if requested:
+        if requested not in RESPONSE_FORMATS:
+            raise ValueError(f"Unsupported format: {requested}, expected one of {list(RESPONSE_FORMATS)}")
+        fmt = requested
+    else:
+        mimetype = accept.best_match(list(RESPONSE_FORMATS.values()), default=RESPONSE_FORMATS['json'])
+        fmt = next(name for name, value in RESPONSE_FORMATS.items() if value == mimetype)
+    if fmt == 'msgpack' and not MSGPACK_AVAILABLE:
+        raise ValueError("MessagePack 响应需要 msgpack: pip install msgpack")
+    if fmt == 'arrow' and not PARQUET_AVAILABLE:
+        raise ValueError("Arrow 响应需要 pyarrow: pip install pyarrow")
+    return fmt
+
+def _msgpack_default(o: Any) -> Any:
+    # 无时区的时间按 UTC 打包为 MessagePack Timestamp
+    if isinstance(o, datetime) and o.tzinfo is None:
+        return o.replace(tzinfo=timezone.utc)
+    raise TypeError(f"Type {type(o)} not serializable")
+
+def _arrow_stream(model, fields: List[str], columns: Dict[str, List[Any]]) -> bytes:
+    table = pa.Table.from_pydict(columns, schema=arrow_schema(model, fields))
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression='zstd')
+    with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def render_rows(fmt: str, model, fields: List[str], rows: List[Dict[str, Any]],
+                next_cursor: Optional[str] = None, **meta: Any):
+    """按协商的格式输出一页行数据，meta 为附加的顶层字段"""
+    if fmt == 'json':
+        response = current_app.json.response({
+            'success': True, **meta, 'count': len(rows), 'data': rows, 'next_cursor': next_cursor
+        })
+    else:
+        columns = {name: [row.get(name) for row in rows] for name in fields}
+        payload = {
+            'success': True, **meta, 'count': len(rows), 'columns': fields, 'data': columns,
+            'next_cursor': next_cursor
+        }
+        if fmt == 'columnar':
+            response = current_app.json.response(payload)
+        elif fmt == 'msgpack':
+            body = msgpack.packb(payload, default=_msgpack_default, use_bin_type=True, datetime=True)
+            response = current_app.response_class(body)
+        else:
+            response = current_app.response_class(_arrow_stream(model, fields, columns))
+        response.mimetype = RESPONSE_FORMATS[fmt]
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    response.headers['Vary'] = 'Accept'
+    return response
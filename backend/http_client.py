@@ -0,0 +1,110 @@
+"""
+采集器共用的 HTTP 客户端
+进程内共用一个 requests.Session: 按主机保持长连接 (每个主机一个连接池)，
+连接失败、429 与 5xx 按指数退避自动重试，默认超时见 config.HTTP_*。
+每个采集周期不再为每个请求重新建立 TCP/TLS 连接；RequestMemo 在一个周期内合并相同的请求
+"""
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+try:
+    from config import config
+except ImportError:
+    from backend.config import config
+
+logger = logging.getLogger(__name__)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=config.HTTP_RETRIES,
+        backoff_factor=config.HTTP_BACKOFF_FACTOR,
+        status_forcelist=config.HTTP_RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        # 重试用尽后返回最后一次的响应，由调用方按 status_code 处理 (与不重试时一致)
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config.HTTP_POOL_HOSTS,
+        pool_maxsize=config.HTTP_POOL_MAXSIZE,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def get_session() -> requests.Session:
+    """进程内共享的 Session (首次使用时创建；gunicorn worker 各自创建自己的连接池)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+def get(url: str, timeout=None, **kwargs) -> requests.Response:
+    """GET 请求，参数同 requests.get；timeout 默认为 (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)"""
+    if timeout is None:
+        timeout = (config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT)
+    return get_session().get(url, timeout=timeout, **kwargs)
+
+def _freeze(value: Any) -> Any:
+    """把参数转换为可哈希的形式，作为记忆的键"""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+class RequestMemo:
+    """一个采集周期内的请求记忆: 相同的 GET 只发出一次，并发发出的相同请求等待同一个结果；
+    接口与 http_client.get 相同，可互换使用。
+    相同指方法、URL、查询参数、请求头 (名称不区分大小写) 与 proxies 等其余参数都相同，
+    请求头不同 (如 Sina 需要 Referer) 的请求各自发出；带 auth/cookies/data 等的请求不记忆"""
+
+    UNCACHED_KWARGS = frozenset(['auth', 'cookies', 'data', 'json', 'files', 'stream', 'hooks'])
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: Dict[tuple, Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None, **kwargs) -> tuple:
+        kwargs.pop('timeout', None)
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        return ('GET', url, _freeze(params or {}), _freeze(headers), _freeze(kwargs))
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> requests.Response:
+        if self.UNCACHED_KWARGS.intersection(kwargs):
+            with self._lock:
+                self.misses += 1
+            return get(url, params=params, **kwargs)
+        key = self.key(url, params, **kwargs)
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if owner:
+            try:
+                future.set_result(get(url, params=params, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'requests': self.misses, 'memo_hits': self.hits}
@@ -0,0 +1,76 @@
+"""
+API 的 JSON 编码
+安装了 orjson 时使用 orjson (C 实现，原生处理 datetime，直接输出 UTF-8 字节)，否则使用标准库 json；
+两种实现的输出格式一致: datetime 统一为精确到秒的 ISO 8601，无时区的按 UTC 处理
+(2024-01-02T03:04:05+00:00)，中文不转义
+"""
+import json
+from datetime import date, datetime
+from typing import Any
+from flask.json.provider import DefaultJSONProvider
+try:
+    from config import config
+except ImportError:
+    from backend.config import config
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def _default(o: Any) -> Any:
+    """标准库 json 不支持的类型"""
+    if isinstance(o, datetime):
+        o = o.replace(microsecond=0)
+        return o.isoformat() + '+00:00' if o.tzinfo is None else o.isoformat()
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider: config.JSON_PROVIDER 为 auto (有 orjson 时使用) / orjson / json"""
+
+    ensure_ascii = False
+    sort_keys = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        backend = config.JSON_PROVIDER
+        if backend == 'orjson' and not ORJSON_AVAILABLE:
+            raise RuntimeError("JSON_PROVIDER = 'orjson' 需要安装 orjson: pip install orjson")
+        self.use_orjson = ORJSON_AVAILABLE and backend in ('auto', 'orjson')
+
+    def _indent(self) -> bool:
+        return (self.compact is None and self._app.debug) or self.compact is False
+
+    def dumpb(self, obj: Any, indent: bool = False) -> bytes:
+        """序列化为 UTF-8 字节"""
+        if self.use_orjson:
+            option = orjson.OPT_NAIVE_UTC | orjson.OPT_OMIT_MICROSECONDS | orjson.OPT_NON_STR_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=DefaultJSONProvider.default, option=option)
+        return json.dumps(
+            obj, default=_default, ensure_ascii=False,
+            **({'indent': 2} if indent else {'separators': (',', ':')})
+        ).encode('utf-8')
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if self.use_orjson and not kwargs:
+            return self.dumpb(obj).decode('utf-8')
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', False)
+        if 'indent' not in kwargs:
+            kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """直接由字节构造响应，不经过 str"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumpb(obj, self._indent()) + b'\n', mimetype=self.mimetype)
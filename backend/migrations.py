@@ -0,0 +1,125 @@
+"""
+数据库结构迁移
+使用 SQLite 的 PRAGMA user_version 记录结构版本，按顺序原地升级已有的 silver_gold.db
+"""
+import sqlite3
+import logging
+try:
+    from blob_store import externalize_existing
+except ImportError:
+    from backend.blob_store import externalize_existing
+
+logger = logging.getLogger(__name__)
+
+def _column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    """检查表中是否已有某列 (create_all 新建的库已包含最新列)"""
+    rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    return any(row[1] == column for row in rows)
+
+def add_column(table: str, column: str, ddl: str):
+    """生成一个幂等的 ADD COLUMN 迁移步骤"""
+    def step(conn: sqlite3.Connection):
+        if not _column_exists(conn, table, column):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+    return step
+
+# (版本号, 说明, 步骤列表)；步骤为 SQL 字符串或接收连接的函数
+# 已发布的迁移不可修改，结构变更只能追加新版本
+MIGRATIONS = [
+    (1, '为最新值查询与历史区间查询创建复合索引', [
+        "CREATE INDEX IF NOT EXISTS ix_silver_price_market_metal_date ON silver_price (market, metal, date)",
+        "CREATE INDEX IF NOT EXISTS ix_silver_price_market_date ON silver_price (market, date)",
+        "CREATE INDEX IF NOT EXISTS ix_silver_price_date ON silver_price (date)",
+        "CREATE INDEX IF NOT EXISTS ix_comex_warehouse_source_metal_date ON comex_warehouse (source, metal, date)",
+        "CREATE INDEX IF NOT EXISTS ix_comex_warehouse_date ON comex_warehouse (date)",
+        "CREATE INDEX IF NOT EXISTS ix_silver_etf_etf_name_date ON silver_etf (etf_name, date)",
+        "CREATE INDEX IF NOT EXISTS ix_silver_etf_date ON silver_etf (date)",
+        "CREATE INDEX IF NOT EXISTS ix_gold_data_category_date ON gold_data (category, date)",
+        "CREATE INDEX IF NOT EXISTS ix_gold_data_date ON gold_data (date)",
+        "CREATE INDEX IF NOT EXISTS ix_data_log_created_at ON data_log (created_at)",
+        # db_manager optimize 旧建的单列索引已被上面的索引覆盖
+        "DROP INDEX IF EXISTS idx_comex_date",
+        "DROP INDEX IF EXISTS idx_etf_date",
+        "DROP INDEX IF EXISTS idx_etf_name",
+        "DROP INDEX IF EXISTS idx_price_market",
+        "DROP INDEX IF EXISTS idx_price_date",
+        "DROP INDEX IF EXISTS idx_gold_category",
+        "DROP INDEX IF EXISTS idx_log_date",
+        "ANALYZE",
+    ]),
+    (2, '增加 valid_until 列，相同取值合并为一行', [
+        add_column('silver_price', 'valid_until', 'DATETIME'),
+        add_column('comex_warehouse', 'valid_until', 'DATETIME'),
+        add_column('silver_etf', 'valid_until', 'DATETIME'),
+        add_column('gold_data', 'valid_until', 'DATETIME'),
+        "UPDATE silver_price SET valid_until = date WHERE valid_until IS NULL",
+        "UPDATE comex_warehouse SET valid_until = date WHERE valid_until IS NULL",
+        "UPDATE silver_etf SET valid_until = date WHERE valid_until IS NULL",
+        "UPDATE gold_data SET valid_until = date WHERE valid_until IS NULL",
+    ]),
+    (3, '创建价格K线汇总表 price_candle', [
+        """CREATE TABLE IF NOT EXISTS price_candle (
+            id INTEGER NOT NULL PRIMARY KEY,
+            market VARCHAR(50),
+            metal VARCHAR(20),
+            interval VARCHAR(10),
+            bucket_start DATETIME,
+            open FLOAT,
+            high FLOAT,
+            low FLOAT,
+            close FLOAT,
+            tick_count INTEGER,
+            updated_at DATETIME
+        )""",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_price_candle_series ON price_candle (market, metal, interval, bucket_start)",
+    ]),
+    (4, '审计原始数据移入内容寻址的 payload_blob 表', [
+        """CREATE TABLE IF NOT EXISTS payload_blob (
+            hash VARCHAR(64) NOT NULL PRIMARY KEY,
+            codec VARCHAR(10),
+            data BLOB,
+            size INTEGER,
+            created_at DATETIME
+        )""",
+        add_column('silver_price', 'raw_payload_hash', 'VARCHAR(64)'),
+        add_column('silver_price', 'mapping_hash', 'VARCHAR(64)'),
+        add_column('comex_warehouse', 'raw_payload_hash', 'VARCHAR(64)'),
+        externalize_existing('silver_price', ['raw_payload', 'mapping']),
+        externalize_existing('comex_warehouse', ['raw_payload']),
+    ]),
+    (5, '为 payload_blob 的引用列创建索引 (清理不再被引用的内容)', [
+        "CREATE INDEX IF NOT EXISTS ix_silver_price_raw_payload_hash ON silver_price (raw_payload_hash)",
+        "CREATE INDEX IF NOT EXISTS ix_silver_price_mapping_hash ON silver_price (mapping_hash)",
+        "CREATE INDEX IF NOT EXISTS ix_comex_warehouse_raw_payload_hash ON comex_warehouse (raw_payload_hash)",
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """读取当前结构版本"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """执行所有未应用的迁移，每个版本一个事务，返回最终版本号"""
+    conn.commit()
+    current = get_schema_version(conn)
+    for version, description, steps in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info(f"[Migration] v{current} -> v{version}: {description}")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"[Migration] v{version} 失败，已回滚")
+            raise
+        current = version
+    return current
@@ -1,23 +1,67 @@
 """
 数据模型定义
 """
-from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, Float, String, DateTime
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, func, Column, Integer, Float, String, DateTime, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 try:
     from config import config
+    from migrations import migrate
 except ImportError:
     from backend.config import config
+    from backend.migrations import migrate
+
+# 写引擎: 采集线程专用的单连接，SQLite 同一时刻只允许一个写事务
+engine = create_engine(
+    config.SQLALCHEMY_DATABASE_URI,
+    echo=False,
+    pool_size=1,
+    max_overflow=0,
+    pool_timeout=config.DB_WRITE_POOL_TIMEOUT,
+    connect_args={'timeout': config.SQLITE_BUSY_TIMEOUT / 1000.0}
+)
+
+# 读引擎: 请求线程使用的只读连接池，WAL 模式下读不等待写事务
+read_engine = create_engine(
+    config.SQLALCHEMY_DATABASE_URI,
+    echo=False,
+    pool_size=config.DB_READ_POOL_SIZE,
+    max_overflow=config.DB_READ_POOL_OVERFLOW,
+    connect_args={'timeout': config.SQLITE_BUSY_TIMEOUT / 1000.0}
+)
+
+@event.listens_for(engine, 'connect')
+def _configure_writer(dbapi_conn, connection_record):
+    """写连接: WAL 日志 + NORMAL 同步级别 (WAL 下掉电只丢最后的事务，不损坏数据库)"""
+    cursor = dbapi_conn.cursor()
+    cursor.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT}")
+    cursor.close()
+
+@event.listens_for(read_engine, 'connect')
+def _configure_reader(dbapi_conn, connection_record):
+    """读连接: 禁止写入"""
+    cursor = dbapi_conn.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT}")
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
 
-# 创建数据库引擎
-engine = create_engine(config.SQLALCHEMY_DATABASE_URI, echo=False)
 Session = sessionmaker(bind=engine)
+ReadSession = sessionmaker(bind=read_engine)
 Base = declarative_base()
 
 class ComexWarehouse(Base):
     """COMEX仓库库存"""
     __tablename__ = 'comex_warehouse'
+    __table_args__ = (
+        # 最新库存: WHERE source=? AND metal=? ORDER BY date DESC LIMIT 1
+        Index('ix_comex_warehouse_source_metal_date', 'source', 'metal', 'date'),
+        Index('ix_comex_warehouse_date', 'date'),
+        # 清理 payload_blob 时检查内容是否仍被引用
+        Index('ix_comex_warehouse_raw_payload_hash', 'raw_payload_hash'),
+    )
     
     id = Column(Integer, primary_key=True)
     date = Column(DateTime, default=datetime.utcnow)
@@ -37,8 +81,10 @@ class ComexWarehouse(Base):
     file_hash = Column(String(100), comment='原始文件SHA256哈希')
     quality = Column(String(50), comment='数据质量 (REALTIME/STALE/ERROR_DIFF/UNKNOWN_SPEC)')
     
-    raw_payload = Column(String(4000), comment='原始数据提取内容')
+    raw_payload = Column(String(4000), comment='原始数据提取内容 (旧数据内联，新数据见 raw_payload_hash)')
+    raw_payload_hash = Column(String(64), comment='原始数据在 payload_blob 中的哈希')
     mapping = Column(String(1000), comment='映射逻辑说明')
+    valid_until = Column(DateTime, comment='取值有效截止时间 (相同取值合并为一行)')
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -46,6 +92,10 @@ class ComexWarehouse(Base):
 class SilverETF(Base):
     """白银ETF持仓数据"""
     __tablename__ = 'silver_etf'
+    __table_args__ = (
+        Index('ix_silver_etf_etf_name_date', 'etf_name', 'date'),
+        Index('ix_silver_etf_date', 'date'),
+    )
     
     id = Column(Integer, primary_key=True)
     date = Column(DateTime, default=datetime.utcnow)
@@ -57,6 +107,7 @@ class SilverETF(Base):
     # Debug 元信息
     source = Column(String(100), comment='数据源')
     provider_as_of = Column(String(100), comment='数据源时间戳')
+    valid_until = Column(DateTime, comment='取值有效截止时间 (相同取值合并为一行)')
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -64,6 +115,15 @@ class SilverETF(Base):
 class SilverPrice(Base):
     """现货/期货价格"""
     __tablename__ = 'silver_price'
+    __table_args__ = (
+        # 最新价格: WHERE market=? AND metal=? ORDER BY date DESC LIMIT 1
+        Index('ix_silver_price_market_metal_date', 'market', 'metal', 'date'),
+        # 按市场历史: WHERE market=? AND date>=? ORDER BY date DESC
+        Index('ix_silver_price_market_date', 'market', 'date'),
+        Index('ix_silver_price_date', 'date'),
+        Index('ix_silver_price_raw_payload_hash', 'raw_payload_hash'),
+        Index('ix_silver_price_mapping_hash', 'mapping_hash'),
+    )
     
     id = Column(Integer, primary_key=True)
     date = Column(DateTime, default=datetime.utcnow)
@@ -79,16 +139,43 @@ class SilverPrice(Base):
     provider_as_of = Column(String(100), comment='数据源时间戳')
     field_used = Column(String(100), comment='使用的字段')
     quality = Column(String(50), comment='数据质量')
-    raw_payload = Column(String(4000), comment='原始数据')
-    mapping = Column(String(1000), comment='字段映射')
+    raw_payload = Column(String(4000), comment='原始数据 (旧数据内联，新数据见 raw_payload_hash)')
+    raw_payload_hash = Column(String(64), comment='原始数据在 payload_blob 中的哈希')
+    mapping = Column(String(1000), comment='字段映射 (旧数据内联，新数据见 mapping_hash)')
+    mapping_hash = Column(String(64), comment='字段映射在 payload_blob 中的哈希')
     is_error = Column(Integer, default=0, comment='是否数据异常')
+    valid_until = Column(DateTime, comment='取值有效截止时间 (相同取值合并为一行)')
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class PriceCandle(Base):
+    """价格K线汇总 (由 silver_price 增量维护)"""
+    __tablename__ = 'price_candle'
+    __table_args__ = (
+        # K线区间查询: WHERE market=? AND metal=? AND interval=? AND bucket_start BETWEEN ? AND ?
+        Index('ux_price_candle_series', 'market', 'metal', 'interval', 'bucket_start', unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    market = Column(String(50), comment='市场（London/Shanghai/Comex）')
+    metal = Column(String(20), comment='金属类型（silver/gold/copper）')
+    interval = Column(String(10), comment='周期（1m/5m/1h/1d）')
+    bucket_start = Column(DateTime, comment='K线起始时间 (UTC)')
+    open = Column(Float, comment='开盘价')
+    high = Column(Float, comment='最高价')
+    low = Column(Float, comment='最低价')
+    close = Column(Float, comment='收盘价')
+    tick_count = Column(Integer, default=0, comment='报价数量')
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class GoldData(Base):
     """黄金基础数据"""
     __tablename__ = 'gold_data'
+    __table_args__ = (
+        Index('ix_gold_data_category_date', 'category', 'date'),
+        Index('ix_gold_data_date', 'date'),
+    )
     
     id = Column(Integer, primary_key=True)
     date = Column(DateTime, default=datetime.utcnow)
@@ -96,12 +183,26 @@ class GoldData(Base):
     indicator = Column(String(255), comment='指标名称')
     value = Column(Float, comment='数值')
     description = Column(String(1000), comment='描述')
+    valid_until = Column(DateTime, comment='取值有效截止时间 (相同取值合并为一行)')
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class PayloadBlob(Base):
+    """审计原始数据 (按 SHA256 去重，压缩存储)"""
+    __tablename__ = 'payload_blob'
+    
+    hash = Column(String(64), primary_key=True, comment='原始内容 SHA256')
+    codec = Column(String(10), comment='压缩方式')
+    data = Column(LargeBinary, comment='压缩后的内容')
+    size = Column(Integer, comment='原始长度')
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class DataLog(Base):
     """数据采集日志"""
     __tablename__ = 'data_log'
+    __table_args__ = (
+        Index('ix_data_log_created_at', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     source = Column(String(100), comment='数据源')
@@ -109,10 +210,24 @@ class DataLog(Base):
     message = Column(String(500), comment='消息')
     created_at = Column(DateTime, default=datetime.utcnow)
 
-# 创建表
+def valid_since(model, start_date):
+    """区间查询条件: start_date 之后仍然有效的行
+    
+    相同取值合并后一行最长跨度为 DEDUP_MAX_SPAN，因此只需把 date 下界前移一个跨度，
+    仍可走 date 索引
+    """
+    return (model.date >= start_date - timedelta(seconds=config.DEDUP_MAX_SPAN)) & \
+        (func.coalesce(model.valid_until, model.date) >= start_date)
+
+# 创建表并升级已有数据库的结构
 def init_db():
     Base.metadata.create_all(engine)
-    print("数据库初始化完成")
+    raw_conn = engine.raw_connection()
+    try:
+        version = migrate(raw_conn.driver_connection)
+    finally:
+        raw_conn.close()
+    print(f"数据库初始化完成 (schema v{version})")
 
 if __name__ == '__main__':
     init_db()
@@ -0,0 +1,76 @@
+"""
+历史接口的游标分页 (keyset)
+按 (date, id) 降序翻页，游标是上一页最后一行的 (date, id)，下一页从该位置之后的索引处继续读取，
+深翻页与首页代价相同；每页行数由服务端限制在 PAGE_SIZE_MAX 以内。
+热数据读完、且查询范围早于归档上界时接着读取归档 (归档的日期都早于热数据)
+"""
+import base64
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, or_
+try:
+    from config import config
+    from archive import reaches_archive, read_archive
+except ImportError:
+    from backend.config import config
+    from backend.archive import reaches_archive, read_archive
+
+Cursor = Tuple[datetime, int]
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """由一行的 (date, id) 生成游标"""
+    raw = f"{row['date'].strftime('%Y-%m-%d %H:%M:%S.%f')}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token: Optional[str]) -> Optional[Cursor]:
+    """解析游标，格式错误时抛出 ValueError"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+        date, row_id = raw.split('|')
+        return datetime.strptime(date, '%Y-%m-%d %H:%M:%S.%f'), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+
+def page_size(requested: Optional[int]) -> int:
+    """每页行数: 默认 PAGE_SIZE_DEFAULT，最多 PAGE_SIZE_MAX"""
+    if not requested or requested < 1:
+        return config.PAGE_SIZE_DEFAULT
+    return min(requested, config.PAGE_SIZE_MAX)
+
+def keyset_query(query, model, limit: int, cursor: Optional[Cursor] = None):
+    """(date, id) 降序、从游标之后开始的一页 (多取一行用于判断是否还有下一页)
+
+    date 上界走 date 索引的范围扫描，(date, id) 排序由索引末尾隐含的 rowid 提供，不需要额外排序
+    """
+    if cursor is not None:
+        query = query.filter(
+            model.date <= cursor[0],
+            or_(model.date < cursor[0], and_(model.date == cursor[0], model.id < cursor[1]))
+        )
+    return query.order_by(model.date.desc(), model.id.desc()).limit(limit + 1)
+
+def keyset_page(query, model, to_dict: Callable[[Any], Dict[str, Any]], limit: int,
+                cursor: Optional[Cursor] = None, table: Optional[str] = None,
+                start_date: Optional[datetime] = None, filters: Optional[Dict[str, Any]] = None,
+                columns: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """读取一页，返回 (行, 下一页游标)；没有更多数据时游标为 None
+    给出 table 时，热数据不足一页则从归档补足 (归档同样只读取 columns 列)；
+    start_date 不早于归档上界时 (只查询热数据窗口) 不读取归档
+    """
+    rows = [to_dict(item) for item in keyset_query(query, model, limit, cursor).all()]
+
+    if len(rows) <= limit and table is not None and start_date is not None \
+            and reaches_archive(table, start_date):
+        # 热数据已读完: 剩余部分从归档读取 (同一行可能同时存在于两处，按 id 去重)
+        hot_ids = {row['id'] for row in rows}
+        archived = read_archive(table, start_date, filters, before=cursor,
+                                limit=limit + 1 - len(rows), columns=columns)
+        rows += [row for row in archived if row['id'] not in hot_ids]
+        rows.sort(key=lambda row: (row['date'], row['id']), reverse=True)
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
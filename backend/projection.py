@@ -0,0 +1,40 @@
+"""
+列表接口的字段投影
+fields 参数指定返回的列 (逗号分隔，all 为全部列)，未指定时使用精简字段；
+只在 SQL 中选择这些列，不构造 ORM 对象，审计字段 (raw_payload、mapping、cell_ref 等) 按需才读取
+"""
+from typing import Any, Dict, List, Optional
+
+# 分页游标需要的列，总是返回
+KEY_FIELDS = ('id', 'date')
+
+# 默认的精简字段: 看板所需的数值、时间与数据质量
+LEAN_FIELDS = {
+    'silver_price': ['market', 'metal', 'spot_price', 'futures_price', 'premium', 'quality', 'is_error', 'valid_until'],
+    'comex_warehouse': ['source', 'metal', 'total_oz', 'registered_oz', 'eligible_oz', 'report_date', 'quality', 'valid_until'],
+    'silver_etf': ['etf_name', 'holdings_oz', 'yoy_change', 'price', 'valid_until'],
+    'gold_data': ['category', 'indicator', 'value', 'valid_until'],
+}
+
+def resolve_fields(model, requested: Optional[str] = None) -> List[str]:
+    """fields 参数 -> 列名列表 (按表定义顺序)，包含未知列时抛出 ValueError"""
+    all_columns = [c.name for c in model.__table__.columns]
+    if requested == 'all':
+        return all_columns
+    if requested:
+        wanted = {name.strip() for name in requested.split(',') if name.strip()}
+        unknown = wanted - set(all_columns)
+        if unknown:
+            raise ValueError(f"Unknown fields for {model.__tablename__}: {sorted(unknown)}")
+    else:
+        wanted = set(LEAN_FIELDS[model.__tablename__])
+    wanted.update(KEY_FIELDS)
+    return [name for name in all_columns if name in wanted]
+
+def projected_query(session, model, fields: List[str]):
+    """只查询 fields 列的 Query (结果为行元组)"""
+    return session.query(*(getattr(model, name) for name in fields))
+
+def projected_dict(row) -> Dict[str, Any]:
+    """投影查询的一行 -> 字典"""
+    return dict(row._mapping)
@@ -0,0 +1,168 @@
+"""
+原始报表归档 (内容寻址)
+每份不同的报表按 SHA256 只保存一次，按日期记录 日期 -> 哈希 索引；
+已结束的日期打包为压缩包，按哈希随机读取，审计链 (file_hash) 始终可解析
+"""
+import hashlib
+import json
+import os
+import threading
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RawReportArchive:
+    """data/raw 下的布局:
+        objects/<hash前2位>/<hash>   未打包的报表
+        index/<YYYY-MM-DD>.jsonl     当天出现过的 (source, filename, hash)
+        packs/<YYYY-MM-DD>.zip       已结束日期首次出现的报表
+    """
+
+    def __init__(self, base_path="data/raw"):
+        self.base_path = Path(base_path)
+        self.objects_path = self.base_path / "objects"
+        self.index_path = self.base_path / "index"
+        self.packs_path = self.base_path / "packs"
+        self._lock = threading.Lock()
+        self._seen: Dict[str, Set[tuple]] = {}
+        self._pack_map: Optional[Dict[str, str]] = None
+        self._current_day: Optional[str] = None
+
+    def _object_file(self, file_hash: str) -> Path:
+        return self.objects_path / file_hash[:2] / file_hash
+
+    def _index_file(self, day: str) -> Path:
+        return self.index_path / f"{day}.jsonl"
+
+    def _day_entries(self, day: str) -> Set[tuple]:
+        """某天已记录的 (source, filename, hash)，首次访问时从索引文件加载"""
+        if day not in self._seen:
+            entries = set()
+            index_file = self._index_file(day)
+            if index_file.exists():
+                with open(index_file, "r", encoding="utf-8") as f:
+                    for line in f:
+                        item = json.loads(line)
+                        entries.add((item["source"], item["filename"], item["hash"]))
+            self._seen[day] = entries
+        return self._seen[day]
+
+    def _packed(self) -> Dict[str, str]:
+        """哈希 -> 所在压缩包 (读取各压缩包的目录)"""
+        if self._pack_map is None:
+            self._pack_map = {}
+            if self.packs_path.exists():
+                for pack in sorted(self.packs_path.glob("*.zip")):
+                    with zipfile.ZipFile(pack) as zf:
+                        for name in zf.namelist():
+                            self._pack_map[name] = pack.name
+        return self._pack_map
+
+    def store(self, source: str, filename: str, content: bytes, day: Optional[str] = None) -> str:
+        """保存报表并返回 SHA256；内容未变化时不产生任何磁盘写入"""
+        file_hash = hashlib.sha256(content).hexdigest()
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        with self._lock:
+            object_file = self._object_file(file_hash)
+            if not object_file.exists() and file_hash not in self._packed():
+                object_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = object_file.with_suffix(".tmp")
+                with open(tmp_file, "wb") as f:
+                    f.write(content)
+                os.replace(tmp_file, object_file)
+                logger.info(f"[{source}] Stored new raw report {filename}: {file_hash}")
+
+            entries = self._day_entries(day)
+            entry = (source, filename, file_hash)
+            if entry not in entries:
+                self.index_path.mkdir(parents=True, exist_ok=True)
+                with open(self._index_file(day), "a", encoding="utf-8") as f:
+                    f.write(json.dumps({
+                        "source": source,
+                        "filename": filename,
+                        "hash": file_hash,
+                        "first_seen": datetime.now().isoformat()
+                    }) + "\n")
+                entries.add(entry)
+
+            rolled_over = self._current_day is not None and day != self._current_day
+            self._current_day = day
+        if rolled_over:
+            # 日期切换后把已结束的日期打包
+            self.pack_closed_days(day)
+        return file_hash
+
+    def hashes_for(self, day: str, source: Optional[str] = None) -> List[dict]:
+        """某天出现过的报表"""
+        with self._lock:
+            entries = sorted(self._day_entries(day))
+        return [{"source": s, "filename": f, "hash": h} for s, f, h in entries if source in (None, s)]
+
+    def load(self, file_hash: str) -> Optional[bytes]:
+        """按哈希读取报表 (未打包或已打包)"""
+        with self._lock:
+            object_file = self._object_file(file_hash)
+            if object_file.exists():
+                return object_file.read_bytes()
+            pack = self._packed().get(file_hash)
+        if pack is None:
+            return None
+        with zipfile.ZipFile(self.packs_path / pack) as zf:
+            return zf.read(file_hash)
+
+    def import_legacy(self) -> int:
+        """把旧布局 data/raw/<source>/<YYYY-MM-DD>/<filename> 导入归档并删除原文件"""
+        imported = 0
+        for source_dir in self.base_path.iterdir():
+            if not source_dir.is_dir() or source_dir.name in ("objects", "index", "packs"):
+                continue
+            for day_dir in source_dir.iterdir():
+                if not day_dir.is_dir():
+                    continue
+                for report in day_dir.iterdir():
+                    self.store(source_dir.name, report.name, report.read_bytes(), day=day_dir.name)
+                    report.unlink()
+                    imported += 1
+                day_dir.rmdir()
+            if not any(source_dir.iterdir()):
+                source_dir.rmdir()
+        return imported
+
+    def pack_closed_days(self, today: Optional[str] = None) -> int:
+        """把首次出现于已结束日期的未打包报表移入该日期的压缩包，返回打包数量"""
+        today = today or datetime.now().strftime("%Y-%m-%d")
+        packed = 0
+        with self._lock:
+            first_seen: Dict[str, str] = {}
+            if self.index_path.exists():
+                for index_file in sorted(self.index_path.glob("*.jsonl")):
+                    day = index_file.stem
+                    for _, _, file_hash in self._day_entries(day):
+                        first_seen.setdefault(file_hash, day)
+
+            for file_hash, day in first_seen.items():
+                object_file = self._object_file(file_hash)
+                if day >= today or not object_file.exists():
+                    continue
+                self.packs_path.mkdir(parents=True, exist_ok=True)
+                pack = self.packs_path / f"{day}.zip"
+                with zipfile.ZipFile(pack, "a", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+                    if file_hash not in zf.namelist():
+                        zf.write(object_file, arcname=file_hash)
+                self._packed()[file_hash] = pack.name
+                object_file.unlink()
+                try:
+                    object_file.parent.rmdir()
+                except OSError:
+                    pass
+                packed += 1
+        if packed:
+            logger.info(f"[RawArchive] Packed {packed} raw reports")
+        return packed
+
+# 全局原始报表归档
+raw_archive = RawReportArchive()
@@ -4,13 +4,15 @@
 """
 
 import json
-import urllib.request
-import urllib.error
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import logging
 import time
 import random
+try:
+    import http_client
+except ImportError:
+    from backend import http_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -64,18 +66,16 @@ class RealTimeMarketDataSimulator:
             return None
         
         try:
-            if params:
-                param_str = '&'.join([f"{k}={v}" for k, v in params.items()])
-                api_url = f"{api_url}?{param_str}"
-            
-            req = urllib.request.Request(
+            response = http_client.get(
                 api_url,
-                headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
+                params=params,
+                headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'},
+                timeout=5
             )
-            with urllib.request.urlopen(req, timeout=5) as response:
-                data = json.loads(response.read().decode('utf-8'))
-                logger.info(f"✓ Real API data fetched from {api_url}")
-                return data
+            response.raise_for_status()
+            data = response.json()
+            logger.info(f"✓ Real API data fetched from {response.url}")
+            return data
         except Exception as e:
             logger.debug(f"API fetch failed: {e}")
             return None
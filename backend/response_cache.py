@@ -0,0 +1,245 @@
+"""
+GET 接口响应缓存
+按 (路径, 查询参数) 缓存序列化后的响应；每张表有一个数据版本号，采集周期提交 (及清理删除)
+时递增，缓存条目记录生成时所依赖表的版本，版本变化时立即移除，CACHE_TIMEOUT 兜底过期。
+缓存按响应字节总数 (CACHE_MAX_BYTES) 限制大小，超过 CACHE_MAX_ENTRY_BYTES 的响应不缓存。
+同一键同时只有一个请求查询数据库 (single-flight)，其余请求等待并复用其结果；
+轮询接口另有按响应内容生成的 ETag / 304 (etag_route)，每个快照版本的响应字节同样只生成一次
+"""
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Any
+import logging
+from flask import current_app, make_response, request
+try:
+    from config import config
+except ImportError:
+    from backend.config import config
+
+logger = logging.getLogger(__name__)
+
+class DataVersions:
+    """表 -> 数据版本号 (提交写入后递增)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._listeners: List[Callable[[tuple], None]] = []
+
+    def add_listener(self, listener: Callable[[tuple], None]):
+        """注册版本变化监听 listener(变化的表)，在 bump 之后调用"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def bump(self, *tables: str):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(tables)
+
+    def get(self, tables: Iterable[str]) -> tuple:
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+class _Flight:
+    """一次进行中的计算，等待者复用其结果"""
+
+    def __init__(self, tables: tuple = ()):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.tables = set(tables)
+        # 计算期间依赖的表有新提交: 结果带旧版本，不再缓存
+        self.stale = False
+
+class ResponseCache:
+    """版本校验 + TTL 的 LRU 缓存，按条目数与结果字节总数限制大小"""
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 << 20,
+                 max_entry_bytes: Optional[int] = None):
+        self._lock = threading.Lock()
+        # 键 -> (依赖的表, 版本, 过期时间, 结果, 字节数)
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._flights: Dict[Any, _Flight] = {}
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _pop(self, key):
+        self.bytes -= self._entries.pop(key)[4]
+
+    def _store(self, key, tables: tuple, versions: tuple, expires: float, result, size: int):
+        if key in self._entries:
+            self._pop(key)
+        if size > self.max_entry_bytes:
+            return
+        self._entries[key] = (tables, versions, expires, result, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._pop(next(iter(self._entries)))
+
+    def invalidate(self, tables: Iterable[str]):
+        """移除依赖这些表的条目 (表的数据版本已变化，条目不会再被命中)"""
+        tables = set(tables)
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if tables.intersection(entry[0])]:
+                self._pop(key)
+            for flight in self._flights.values():
+                if tables & flight.tables:
+                    flight.stale = True
+
+    def get_or_compute(self, key, versions: tuple, compute: Callable[[], tuple],
+                       timeout: Optional[int] = None, tables: tuple = ()):
+        """compute() 返回 (结果, 字节数)，字节数为 None 时不缓存；
+        tables 为结果依赖的表 (invalidate 时移除)；返回 (结果, 'HIT'|'MISS'|'COALESCED')"""
+        timeout = timeout or config.CACHE_TIMEOUT
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == versions and entry[2] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[3], 'HIT'
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(tables)
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, 'COALESCED'
+
+        try:
+            result, size = compute()
+            flight.result = result
+            with self._lock:
+                if size is not None and not flight.stale:
+                    self._store(key, tuple(tables), versions, time.monotonic() + timeout, result, size)
+            return result, 'MISS'
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+            }
+
+# 全局数据版本与响应缓存
+data_versions = DataVersions()
+response_cache = ResponseCache(config.CACHE_MAX_ENTRIES, config.CACHE_MAX_BYTES, config.CACHE_MAX_ENTRY_BYTES)
+data_versions.add_listener(response_cache.invalidate)
+
+def _cached_response(key, versions: tuple, view, args, kwargs, tables: tuple = ()):
+    """由缓存中的字节构造响应 (同一版本只执行一次视图和序列化)"""
+    def compute():
+        response = make_response(view(*args, **kwargs))
+        body = response.get_data()
+        cacheable = response.status_code == 200 and not response.is_streamed
+        headers = [(name, value) for name, value in response.headers
+                   if name not in ('Content-Type', 'Content-Length')]
+        return (body, response.status_code, response.content_type, headers), len(body) if cacheable else None
+
+    (body, status, content_type, headers), state = response_cache.get_or_compute(
+        key, versions, compute, tables=tables)
+    response = current_app.response_class(body, status=status, content_type=content_type, headers=headers)
+    response.headers['X-Cache'] = state
+    return response
+
+def _request_key():
+    # 历史接口按 Accept 头协商响应格式
+    return (request.path, tuple(sorted(request.args.items(multi=True))), request.headers.get('Accept', ''))
+
+def cached_route(*tables: str):
+    """缓存 GET 路由的 200 响应，依赖的表有新提交时失效"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not config.CACHE_ENABLED:
+                return view(*args, **kwargs)
+            # 先取版本再查询: 查询期间有新提交时，条目带旧版本，下次请求即重新生成
+            return _cached_response(_request_key(), data_versions.get(tables), view, args, kwargs, tables)
+        return wrapper
+    return decorator
+
+def content_etag(body: bytes) -> str:
+    """响应内容的摘要: 多个 worker 进程的版本号各自计数，只有内容能在进程之间比较"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def _without(data, ignore: frozenset):
+    if isinstance(data, dict):
+        return {k: _without(v, ignore) for k, v in data.items() if k not in ignore}
+    if isinstance(data, list):
+        return [_without(v, ignore) for v in data]
+    return data
+
+def value_etag(body: bytes, ignore: Iterable[str]) -> str:
+    """JSON 响应去掉 ignore 字段 (任意层级) 后的内容摘要"""
+    data = _without(json.loads(body), frozenset(ignore))
+    return content_etag(json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+def etag_route(version: Callable[[], str], ignore: Iterable[str] = (),
+               headers: Optional[Callable[[], Dict[str, str]]] = None):
+    """按响应内容生成强 ETag；If-None-Match 匹配时返回 304。
+    version() 为本进程的快照版本 (视图的响应内容必须只由该版本决定)：
+    每个版本的响应字节与 ETag 只生成一次，之后的请求 (包括 304) 直接复用。
+    ignore 中的字段 (如确认时间 valid_until/updated_at) 不参与 ETag，只由取值决定；
+    headers() 返回每次请求另加的响应头 (包括 304)，不缓存、不参与 ETag"""
+    ignore = tuple(ignore)
+
+    def decorator(view):
+        def tagged_view(*args, **kwargs):
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                body = response.get_data()
+                response.set_etag(value_etag(body, ignore) if ignore else content_etag(body))
+            return response
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if config.CACHE_ENABLED:
+                response = _cached_response(_request_key(), (version(),), tagged_view, args, kwargs)
+            else:
+                response = tagged_view(*args, **kwargs)
+            if response.status_code != 200:
+                return response
+            etag, _ = response.get_etag()
+            # 弱比较: 压缩后的响应带弱 ETag (compression.py)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+            # 允许缓存但每次使用前必须重新验证
+            response.headers['Cache-Control'] = 'no-cache'
+            if headers is not None:
+                response.headers.update(headers())
+            return response
+        return wrapper
+    return decorator
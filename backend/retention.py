@@ -0,0 +1,157 @@
+"""
+数据保留 (分批清理)
+按表的保留天数删除过期行：由时间列索引确定过期行的主键范围，按主键区间分批，
+每批一个短写事务，批次之间让出写锁，采集线程和 API 不会被长时间阻塞；可在后台线程中持续运行。
+删除 (或归档) 数据行之后，同样分批删除不再被任何行引用的 payload_blob 内容
+"""
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import logging
+try:
+    from config import config
+    from response_cache import data_versions
+    from blob_store import BLOB_FIELDS
+except ImportError:
+    from backend.config import config
+    from backend.response_cache import data_versions
+    from backend.blob_store import BLOB_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# 表 -> 判断过期的时间列 (均有索引)
+RETENTION_COLUMNS = {
+    'comex_warehouse': 'date',
+    'silver_etf': 'date',
+    'silver_price': 'date',
+    'gold_data': 'date',
+    'data_log': 'created_at',
+    'price_candle': 'bucket_start',
+}
+
+def delete_in_batches(conn: sqlite3.Connection, table: str, where: str, params: tuple,
+                      batch_size: Optional[int] = None, pause: Optional[float] = None,
+                      stop_event: Optional[threading.Event] = None) -> int:
+    """分批删除 table 中满足 where 的行 (条件须能走索引)，返回删除行数
+
+    先按索引查出匹配行的主键范围 (只查一次)，再按主键区间每 batch_size 个一批，
+    在 BEGIN IMMEDIATE 短事务内删除区间内匹配的行，提交后暂停 pause 秒
+    """
+    batch_size = batch_size or config.RETENTION_BATCH_SIZE
+    pause = config.RETENTION_PAUSE if pause is None else pause
+
+    conn.commit()
+    lower, upper = conn.execute(
+        f"SELECT MIN(id), MAX(id) FROM {table} WHERE {where}", params
+    ).fetchone()
+    deleted = 0
+    start = lower
+    while start is not None and start <= upper and (stop_event is None or not stop_event.is_set()):
+        end = min(start + batch_size - 1, upper)
+        conn.execute("BEGIN IMMEDIATE")
+        cursor = conn.execute(
+            f"DELETE FROM {table} WHERE id >= ? AND id <= ? AND {where}", (start, end) + params
+        )
+        conn.commit()
+        deleted += cursor.rowcount
+        start = end + 1
+        if cursor.rowcount:
+            data_versions.bump(table)
+        if pause:
+            time.sleep(pause)
+    return deleted
+
+def purge_table(conn: sqlite3.Connection, table: str, days: int,
+                batch_size: Optional[int] = None, pause: Optional[float] = None,
+                now: Optional[datetime] = None,
+                stop_event: Optional[threading.Event] = None) -> int:
+    """按时间列索引分批删除 table 中超过 days 天的行，返回删除行数"""
+    column = RETENTION_COLUMNS[table]
+    cutoff = ((now or datetime.utcnow()) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+    deleted = delete_in_batches(conn, table, f"{column} < ?", (cutoff,),
+                                batch_size, pause, stop_event)
+    if deleted:
+        logger.info(f"[Retention] {table}: deleted {deleted} rows older than {days} days")
+    return deleted
+
+def purge_orphan_blobs(conn: sqlite3.Connection, batch_size: Optional[int] = None,
+                       pause: Optional[float] = None,
+                       stop_event: Optional[threading.Event] = None) -> int:
+    """删除不再被任何行引用的 payload_blob 内容，返回删除条数
+
+    按 rowid 分批，每批在 BEGIN IMMEDIATE 短事务内检查引用 (引用列均有索引) 并删除；
+    采集周期的写入在同一把写锁下插入内容和引用它的行，不会删除刚写入的内容
+    """
+    batch_size = batch_size or config.RETENTION_BATCH_SIZE
+    pause = config.RETENTION_PAUSE if pause is None else pause
+    unreferenced = ' AND '.join(
+        f"NOT EXISTS (SELECT 1 FROM {table} WHERE {field}_hash = payload_blob.hash)"
+        for table, fields in BLOB_FIELDS.items() for field in fields
+    )
+
+    conn.commit()
+    deleted = 0
+    last_rowid = 0
+    while stop_event is None or not stop_event.is_set():
+        upper = conn.execute(
+            "SELECT MAX(rowid) FROM (SELECT rowid FROM payload_blob WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+            (last_rowid, batch_size)
+        ).fetchone()[0]
+        if upper is None:
+            break
+        conn.execute("BEGIN IMMEDIATE")
+        cursor = conn.execute(
+            f"DELETE FROM payload_blob WHERE rowid > ? AND rowid <= ? AND {unreferenced}",
+            (last_rowid, upper)
+        )
+        conn.commit()
+        deleted += cursor.rowcount
+        last_rowid = upper
+        if cursor.rowcount:
+            data_versions.bump('payload_blob')
+        if pause:
+            time.sleep(pause)
+    if deleted:
+        logger.info(f"[Retention] payload_blob: deleted {deleted} unreferenced payloads")
+    return deleted
+
+def apply_retention(conn: sqlite3.Connection, policies: Optional[Dict[str, int]] = None,
+                    stop_event: Optional[threading.Event] = None, **kwargs) -> Dict[str, int]:
+    """按保留策略清理所有表 (删除过行时随后清理 payload_blob)，返回 表 -> 删除行数"""
+    results = {}
+    for table, days in (policies or config.RETENTION_POLICIES).items():
+        if stop_event is not None and stop_event.is_set():
+            break
+        results[table] = purge_table(conn, table, days, stop_event=stop_event, **kwargs)
+    if any(results.get(table) for table in BLOB_FIELDS):
+        results['payload_blob'] = purge_orphan_blobs(conn, kwargs.get('batch_size'), kwargs.get('pause'), stop_event)
+    return results
+
+def run_retention_loop(db_path: str, interval: Optional[int] = None,
+                       stop_event: Optional[threading.Event] = None):
+    """持续运行: 每 interval 秒按保留策略清理一次，直到 stop_event 被设置"""
+    interval = interval or config.RETENTION_INTERVAL
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        try:
+            conn = sqlite3.connect(db_path, timeout=config.SQLITE_BUSY_TIMEOUT / 1000.0)
+            try:
+                apply_retention(conn, stop_event=stop_event)
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"[Retention] 清理失败: {e}")
+        stop_event.wait(interval)
+
+def start_retention_thread(db_path: str, interval: Optional[int] = None,
+                           stop_event: Optional[threading.Event] = None) -> threading.Thread:
+    """在后台线程中运行保留策略"""
+    thread = threading.Thread(
+        target=run_retention_loop, args=(db_path, interval, stop_event),
+        name='retention', daemon=True
+    )
+    thread.start()
+    return thread
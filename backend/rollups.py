@@ -0,0 +1,167 @@
+"""
+价格K线汇总 (1m/5m/1h/1d)
+采集时随每个报价增量更新，历史数据通过 backfill_candles 重建
+"""
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# K线周期 -> 秒
+INTERVALS = {
+    '1m': 60,
+    '5m': 300,
+    '1h': 3600,
+    '1d': 86400,
+}
+
+# 增量更新: 同一根K线内保留开盘价，刷新最高/最低/收盘
+UPSERT_CANDLE_SQL = """
+    INSERT INTO price_candle (market, metal, interval, bucket_start, open, high, low, close, tick_count, updated_at)
+    VALUES (:market, :metal, :interval, :bucket_start, :price, :price, :price, :price, 1, :updated_at)
+    ON CONFLICT (market, metal, interval, bucket_start) DO UPDATE SET
+        high = MAX(high, excluded.high),
+        low = MIN(low, excluded.low),
+        close = excluded.close,
+        tick_count = tick_count + 1,
+        updated_at = excluded.updated_at
+"""
+
+# 重建: 直接写入完整的K线
+REPLACE_CANDLE_SQL = """
+    INSERT OR REPLACE INTO price_candle (market, metal, interval, bucket_start, open, high, low, close, tick_count, updated_at)
+    VALUES (:market, :metal, :interval, :bucket_start, :open, :high, :low, :close, :tick_count, :updated_at)
+"""
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _naive_utc(ts: datetime) -> datetime:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+def bucket_start(ts: datetime, seconds: int) -> datetime:
+    """时间所在K线的起始时间 (UTC 对齐)"""
+    ts = _naive_utc(ts)
+    offset = int((ts - _EPOCH).total_seconds()) // seconds * seconds
+    return _EPOCH + timedelta(seconds=offset)
+
+def _fmt(ts: datetime) -> str:
+    """与 SQLAlchemy SQLite DateTime 相同的存储格式，保证唯一键一致"""
+    return ts.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+def tick_price(spot_price: Optional[float], futures_price: Optional[float]) -> float:
+    """K线使用的价格 (与 /api/price/latest 的 price 字段一致)"""
+    return spot_price or futures_price or 0.0
+
+def candle_params(market: str, metal: str, price: float, ts: datetime) -> List[Dict]:
+    """一个报价对应的 UPSERT_CANDLE_SQL 参数 (每个周期一组，按报价顺序 executemany)"""
+    if not price:
+        return []
+    now = _fmt(datetime.utcnow())
+    return [{
+        'market': market,
+        'metal': metal,
+        'interval': interval,
+        'bucket_start': _fmt(bucket_start(ts, seconds)),
+        'price': price,
+        'updated_at': now
+    } for interval, seconds in INTERVALS.items()]
+
+def _parse_ts(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+def _kept_buckets(conn: sqlite3.Connection, market: str, metal: str) -> Dict[str, str]:
+    """原始报价已被归档或清理时，最早一行所在K线及之前的K线包含已删除的报价，重建时保留；
+    返回 周期 -> 保留到的 bucket_start (含)，原始报价完整时返回空字典"""
+    first = conn.execute(
+        "SELECT MIN(date) FROM silver_price WHERE market = ? AND metal = ?", (market, metal)
+    ).fetchone()[0]
+    if first is None:
+        return {}
+    first = _parse_ts(first)
+    trimmed = conn.execute(
+        "SELECT 1 FROM price_candle WHERE market = ? AND metal = ? AND interval = '1m' AND bucket_start < ? LIMIT 1",
+        (market, metal, _fmt(bucket_start(first, INTERVALS['1m'])))
+    ).fetchone()
+    if trimmed is None:
+        return {}
+    return {interval: _fmt(bucket_start(first, seconds)) for interval, seconds in INTERVALS.items()}
+
+def backfill_candles(conn: sqlite3.Connection, batch_size: int = 5000) -> int:
+    """从 silver_price 重建K线，每个 (市场, 金属) 一个事务，返回写入的K线数量。
+    只重建仍有原始报价的时间范围，已归档/清理日期的K线保持不变"""
+    conn.commit()
+    series = conn.execute("SELECT DISTINCT market, metal FROM silver_price").fetchall()
+    total = 0
+    for market, metal in series:
+        conn.execute("BEGIN IMMEDIATE")
+        kept = _kept_buckets(conn, market, metal)
+        if kept:
+            for interval, last_kept in kept.items():
+                conn.execute(
+                    "DELETE FROM price_candle WHERE market = ? AND metal = ? AND interval = ? AND bucket_start > ?",
+                    (market, metal, interval, last_kept)
+                )
+        else:
+            conn.execute("DELETE FROM price_candle WHERE market = ? AND metal = ?", (market, metal))
+        now = _fmt(datetime.utcnow())
+        bars: Dict[str, Dict] = {}
+        pending = []
+
+        def add_tick(ts: datetime, price: float):
+            for interval, seconds in INTERVALS.items():
+                start = _fmt(bucket_start(ts, seconds))
+                if interval in kept and start <= kept[interval]:
+                    continue
+                bar = bars.get(interval)
+                if bar is not None and bar['bucket_start'] != start:
+                    pending.append(bar)
+                    bar = None
+                if bar is None:
+                    bars[interval] = {
+                        'market': market, 'metal': metal, 'interval': interval,
+                        'bucket_start': start, 'open': price, 'high': price,
+                        'low': price, 'close': price, 'tick_count': 1, 'updated_at': now
+                    }
+                else:
+                    bar['high'] = max(bar['high'], price)
+                    bar['low'] = min(bar['low'], price)
+                    bar['close'] = price
+                    bar['tick_count'] += 1
+
+        cursor = conn.execute(
+            "SELECT date, valid_until, spot_price, futures_price FROM silver_price "
+            "WHERE market = ? AND metal = ? ORDER BY date",
+            (market, metal)
+        )
+        for date, valid_until, spot_price, futures_price in cursor:
+            price = tick_price(spot_price, futures_price)
+            if not price or date is None:
+                continue
+            start = _parse_ts(date)
+            add_tick(start, price)
+            # 合并行代表 [date, valid_until] 内取值不变，补齐其间每根 1m K线
+            if valid_until is not None:
+                end = _parse_ts(valid_until)
+                step = start + timedelta(seconds=INTERVALS['1m'])
+                while bucket_start(step, INTERVALS['1m']) < bucket_start(end, INTERVALS['1m']):
+                    add_tick(bucket_start(step, INTERVALS['1m']), price)
+                    step += timedelta(seconds=INTERVALS['1m'])
+                if end > start:
+                    add_tick(end, price)
+            if len(pending) >= batch_size:
+                conn.executemany(REPLACE_CANDLE_SQL, pending)
+                total += len(pending)
+                pending.clear()
+
+        pending.extend(bars.values())
+        conn.executemany(REPLACE_CANDLE_SQL, pending)
+        total += len(pending)
+        conn.commit()
+        logger.info(f"[Rollup] Rebuilt candles for {market}/{metal}")
+    return total
@@ -0,0 +1,71 @@
+"""
+生产环境启动入口
+    python serve.py [--workers N] [--threads N] [--host H] [--port P]
+安装了 gunicorn 时使用 gunicorn (gthread: 多个 worker 进程，每个进程多线程)，
+否则使用 waitress (单进程多线程)，都没有时退回 werkzeug 多线程服务器。
+每个 worker 各自加载应用 (不 preload)，由 leader 锁保证只有一个进程运行采集。
+每个 SSE 连接占用一个线程，每个进程的推送连接数上限随 --threads 计算 (stream_hub.stream_capacity)
+"""
+import argparse
+import importlib.util
+import logging
+try:
+    from config import config
+except ImportError:
+    from backend.config import config
+
+logger = logging.getLogger(__name__)
+
+def serve_gunicorn(host: str, port: int, workers: int, threads: int):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{host}:{port}")
+            self.cfg.set('workers', workers)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', threads)
+            # SSE 长连接不应被 worker 超时中断 (gthread 的超时只检查 worker 心跳)
+            self.cfg.set('timeout', 120)
+            self.cfg.set('preload_app', False)
+
+        def load(self):
+            # 每个 worker 在 fork 之后调用工厂创建自己的应用
+            from app import create_app
+            return create_app()
+
+    Application().run()
+
+def serve_waitress(host: str, port: int, threads: int):
+    from waitress import serve
+    from app import create_app
+    serve(create_app(), host=host, port=port, threads=threads)
+
+def serve_werkzeug(host: str, port: int):
+    from werkzeug.serving import run_simple
+    from app import create_app
+    run_simple(host, port, create_app(), threaded=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='金银市场数据 API 服务')
+    parser.add_argument('--host', default=config.SERVER_HOST)
+    parser.add_argument('--port', type=int, default=config.SERVER_PORT)
+    parser.add_argument('--workers', type=int, default=config.SERVER_WORKERS)
+    parser.add_argument('--threads', type=int, default=config.SERVER_THREADS)
+    args = parser.parse_args()
+    # SSE 连接上限按实际线程数计算 (worker 在 fork 之后加载应用，继承这里的设置)
+    config.SERVER_THREADS = args.threads
+
+    if importlib.util.find_spec('gunicorn'):
+        logger.info(f"gunicorn: {args.workers} workers x {args.threads} threads")
+        serve_gunicorn(args.host, args.port, args.workers, args.threads)
+    elif importlib.util.find_spec('waitress'):
+        logger.info(f"waitress: {args.threads} threads")
+        serve_waitress(args.host, args.port, args.threads)
+    else:
+        logger.warning("未安装 gunicorn / waitress，使用 werkzeug 多线程服务器")
+        serve_werkzeug(args.host, args.port)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -14,6 +14,13 @@ import logging
 import threading
 import time
 
+try:
+    from compression import encode_body
+    from snapshot_segment import SnapshotSegmentReader, segment_path
+except ImportError:
+    from backend.compression import encode_body
+    from backend.snapshot_segment import SnapshotSegmentReader, segment_path
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -34,6 +41,9 @@ except ImportError as e:
     logger.warning(f"✗ Could not import real API collector: {e}")
     RealTimeDataCollector = None
 
+# Flask 采集服务写入的共享快照段 (采集服务未运行时读取结果为 None)
+SEGMENT = SnapshotSegmentReader(segment_path(DB_PATH))
+
 # 全局数据缓存
 data_cache = {
     'last_update': None,
@@ -47,16 +57,27 @@ data_cache = {
 class DataHandler(BaseHTTPRequestHandler):
     """HTTP请求处理器"""
     
-    def do_GET(self):
-        """处理GET请求"""
+    def send_json(self, response):
+        """发送JSON响应 (按 Accept-Encoding 压缩)"""
+        body, encoding = encode_body(
+            json.dumps(response, ensure_ascii=False, default=str).encode('utf-8'),
+            'application/json', self.headers.get('Accept-Encoding')
+        )
         # CORS头
         self.send_response(200)
         self.send_header('Content-type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        """处理GET请求"""
         # 解析URL
         parsed_path = urlparse(self.path)
         path = parsed_path.path
@@ -99,16 +120,10 @@ class DataHandler(BaseHTTPRequestHandler):
             return
         
         # 返回JSON
-        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+        self.send_json(response)
     
     def do_POST(self):
         """处理POST请求"""
-        # CORS和响应头
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
         # 处理/api/collect POST请求
         parsed_path = urlparse(self.path)
         path = parsed_path.path
@@ -118,7 +133,7 @@ class DataHandler(BaseHTTPRequestHandler):
         else:
             response = {'success': False, 'message': 'Not Found'}
         
-        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+        self.send_json(response)
     
     def do_OPTIONS(self):
         """处理CORS预检请求"""
@@ -129,7 +144,15 @@ class DataHandler(BaseHTTPRequestHandler):
         self.end_headers()
     
     def get_comex_data(self):
-        """获取COMEX数据 - 使用真实API或缓存"""
+        """获取COMEX数据 - 优先读取共享快照段，其次使用真实API或缓存"""
+        snapshot = SEGMENT.read()
+        if snapshot and snapshot[1]['warehouse'].get('CME'):
+            return {
+                'success': True,
+                'source': 'Snapshot Segment',
+                'data': snapshot[1]['warehouse']['CME']
+            }
+        
         if REAL_API_AVAILABLE and data_cache['comex_data']:
             return {
                 'success': True,
@@ -159,7 +182,20 @@ class DataHandler(BaseHTTPRequestHandler):
         }
     
     def get_price_data(self):
-        """获取价格数据 - 使用真实API或缓存"""
+        """获取价格数据 - 优先读取共享快照段，其次使用真实API或缓存"""
+        snapshot = SEGMENT.read()
+        if snapshot and snapshot[1]['price']:
+            data = snapshot[1]['price']
+            for rows in data.values():
+                for row in rows.values():
+                    # 与 Flask /api/price/latest 相同的兼容字段
+                    row['price'] = row.get('spot_price') or row.get('futures_price') or 0.0
+            return {
+                'success': True,
+                'source': 'Snapshot Segment',
+                'data': data
+            }
+        
         if REAL_API_AVAILABLE and data_cache['silver_price']:
             return {
                 'success': True,
@@ -0,0 +1,335 @@
+"""
+最新快照的共享内存段 (mmap 文件，固定布局，seqlock 保护)
+采集 leader 进程在快照发布时把各品种的最新值写入段中，同一台机器上的其他进程
+(web_monitor_v2、silver_monitor、simple_server 等) 直接读取映射的内存，不再各自请求上游或查询数据库。
+
+布局:
+    头部 64 字节: magic(8) seq(u64) heartbeat(f64) layout(u32) capacity(u32) count(u32) _(4) last_publish(f64)
+    之后 capacity 个槽位，每个槽位一行: 类别、市场/来源、金属、id、date、valid_until、4 个数值、2 个文本
+seqlock: 写入前 seq 加一 (奇数表示写入中)，写完再加一；读取方在 seq 相同且为偶数时得到一致的内容，否则重试。
+只有一个写入方 (持有 leader 锁的进程)；heartbeat 由写入方定期刷新，超过 SNAPSHOT_SEGMENT_STALE 秒
+未刷新视为采集进程未运行。last_publish 为最近一次确认取值的时间 (各行 valid_until 与快照存储记录的
+确认时间中的最大值；取值未变化的采集周期只前移 last_publish，不改写各行，seq 不变)，
+采集周期持续失败时 heartbeat 照常刷新但 last_publish 不再前进，超过 SNAPSHOT_SEGMENT_MAX_AGE 秒同样视为不可用；
+两种情况下读取方都退回直接请求上游
+"""
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+import logging
+try:
+    from config import config
+except ImportError:
+    from backend.config import config
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'GSSNAP\x00\x01'
+LAYOUT_VERSION = 2
+
+HEADER = struct.Struct('=8sQdIII')
+HEADER_SIZE = 64
+COUNT = struct.Struct('=I')
+COUNT_OFFSET = 32
+# seq 与 heartbeat 通过 8 字节对齐的 memoryview 单次存取: struct.pack_into 会先把目标区域清零再写入，
+# 其他进程可能读到中间的 0
+SEQ_INDEX = 1
+HEARTBEAT_INDEX = 2
+LAST_PUBLISH_INDEX = 5
+
+# 类别 (16) 市场/来源 (16) 金属 (16) id date valid_until 数值 x4 文本 (16, 32)
+SLOT = struct.Struct('<16s16s16sqdd4d16s32s')
+
+# 类别 -> (分组字段, 数值字段, 文本字段)，与 snapshot_store.SNAPSHOT_KINDS 的类别一致
+SEGMENT_KINDS = {
+    'price': ('market', ('spot_price', 'futures_price', 'premium', 'is_error'), ('quality', 'provider_as_of')),
+    'warehouse': ('source', ('total_oz', 'registered_oz', 'eligible_oz', 'price'), ('quality', 'report_date')),
+}
+
+# 新浪行情代码 -> (类别, 市场, 金属, 价格字段)，供按新浪代码取价的监控脚本使用
+SINA_CODES = {
+    'hf_SI': ('price', 'Comex', 'silver', 'futures_price'),
+    'hf_GC': ('price', 'Comex', 'gold', 'futures_price'),
+    'hf_HG': ('price', 'Comex', 'copper', 'futures_price'),
+    'fx_sxagusd': ('price', 'London', 'silver', 'spot_price'),
+    'fx_sxauusd': ('price', 'London', 'gold', 'spot_price'),
+    'nf_AG0': ('price', 'Shanghai', 'silver', 'spot_price'),
+    'nf_AU0': ('price', 'Shanghai', 'gold', 'spot_price'),
+    'nf_CU0': ('price', 'Shanghai', 'copper', 'spot_price'),
+}
+
+def segment_path(db_path: Optional[str] = None) -> str:
+    """段文件路径: SNAPSHOT_SEGMENT_PATH，默认为数据库文件旁的 <db>.snapshot"""
+    return config.SNAPSHOT_SEGMENT_PATH or f"{db_path or config.DB_PATH}.snapshot"
+
+def segment_size(capacity: int) -> int:
+    return HEADER_SIZE + capacity * SLOT.size
+
+def _pack_time(value: Optional[datetime]) -> float:
+    if value is None:
+        return math.nan
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def _unpack_time(value: float) -> Optional[datetime]:
+    if math.isnan(value):
+        return None
+    return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+
+def _pack_text(value: Any, size: int) -> bytes:
+    # 按字节截断，避免截断半个 UTF-8 字符
+    return str(value or '').encode('utf-8')[:size].decode('utf-8', 'ignore').encode('utf-8')
+
+def _unpack_text(value: bytes) -> str:
+    return value.rstrip(b'\x00').decode('utf-8', 'ignore')
+
+class SnapshotSegmentWriter:
+    """快照存储的监听器: 每次发布后把全部最新行写入段 (只在采集 leader 进程中创建)"""
+
+    def __init__(self, path: str, store, capacity: Optional[int] = None):
+        self.path = path
+        self.store = store
+        self.capacity = capacity or config.SNAPSHOT_SEGMENT_SLOTS
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._warned = False
+        self._mm = self._open()
+        self._words = memoryview(self._mm).cast('Q')
+        self._floats = memoryview(self._mm).cast('d')
+        if self._words[SEQ_INDEX] % 2:
+            # 上一个写入方在写入过程中退出
+            self._words[SEQ_INDEX] += 1
+
+    def _open(self) -> mmap.mmap:
+        size = segment_size(self.capacity)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        seq = 0
+        if os.path.exists(self.path) and os.path.getsize(self.path) == size:
+            with open(self.path, 'r+b') as f:
+                mm = mmap.mmap(f.fileno(), size)
+            magic, seq, _, layout, capacity, _ = HEADER.unpack_from(mm)
+            if magic == MAGIC and layout == LAYOUT_VERSION and capacity == self.capacity:
+                # 接任上一个写入方: seq 继续递增，读取方据此判断内容变化
+                return mm
+            mm.close()
+            seq = 0
+        # 新建 (或布局变化): 写入临时文件后替换，已映射旧文件的读取方在 heartbeat 过期后重新打开
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, seq, 0.0, LAYOUT_VERSION, self.capacity, 0).ljust(size, b'\x00'))
+        os.replace(tmp, self.path)
+        with open(self.path, 'r+b') as f:
+            return mmap.mmap(f.fileno(), size)
+
+    def write(self, rows: List[tuple], confirmed_at: Optional[datetime] = None):
+        """rows: [(类别, 市场/来源, 金属, 行)]，confirmed_at 为快照存储记录的最近确认时间"""
+        if len(rows) > self.capacity and not self._warned:
+            logger.warning(f"[Segment] {len(rows)} 行超过段容量 {self.capacity}，多出的行不写入")
+            self._warned = True
+        rows = rows[:self.capacity]
+        with self._lock:
+            mm = self._mm
+            seq = self._words[SEQ_INDEX]
+            self._words[SEQ_INDEX] = seq + 1
+            for i, (kind, group, metal, row) in enumerate(rows):
+                _, numbers, texts = SEGMENT_KINDS[kind]
+                values = [row.get(name) for name in numbers]
+                SLOT.pack_into(
+                    mm, HEADER_SIZE + i * SLOT.size,
+                    _pack_text(kind, 16), _pack_text(group, 16), _pack_text(metal, 16),
+                    row.get('id') or 0, _pack_time(row.get('date')), _pack_time(row.get('valid_until')),
+                    *(math.nan if v is None else float(v) for v in values),
+                    _pack_text(row.get(texts[0]), 16), _pack_text(row.get(texts[1]), 32)
+                )
+            COUNT.pack_into(mm, COUNT_OFFSET, len(rows))
+            confirmed = [_pack_time(row.get('valid_until') or row.get('date')) for *_, row in rows]
+            confirmed.append(_pack_time(confirmed_at))
+            self._floats[LAST_PUBLISH_INDEX] = max((t for t in confirmed if not math.isnan(t)), default=0.0)
+            self._floats[HEARTBEAT_INDEX] = time.time()
+            self._words[SEQ_INDEX] = seq + 2
+
+    def publish_store(self, *_):
+        """把快照存储的当前内容写入段 (作为 snapshot_store 的监听器调用)"""
+        _, data = self.store.dump()
+        rows = [
+            (kind, group, metal, row)
+            for kind, groups in data.items() if kind in SEGMENT_KINDS
+            for group, metals in groups.items()
+            for metal, row in metals.items()
+        ]
+        confirmed = [self.store.confirmed(kind) for kind in SEGMENT_KINDS]
+        self.write(rows, max((t for t in confirmed if t is not None), default=None))
+
+    def confirm_store(self, kind: str, confirmed_at: datetime):
+        """取值未变化时只前移 last_publish (作为 snapshot_store 的确认监听调用)，段中各行不变"""
+        if kind not in SEGMENT_KINDS:
+            return
+        with self._lock:
+            self._floats[LAST_PUBLISH_INDEX] = max(self._floats[LAST_PUBLISH_INDEX], _pack_time(confirmed_at))
+            self._floats[HEARTBEAT_INDEX] = time.time()
+
+    def _heartbeat(self):
+        while not self._stop.wait(config.SNAPSHOT_SEGMENT_HEARTBEAT):
+            self._floats[HEARTBEAT_INDEX] = time.time()
+
+    def start(self):
+        self.publish_store()
+        self.store.add_listener(self.publish_store)
+        self.store.add_confirm_listener(self.confirm_store)
+        threading.Thread(target=self._heartbeat, name='segment-heartbeat', daemon=True).start()
+        logger.info(f"[Segment] 快照段: {self.path}")
+
+    def stop(self):
+        self._stop.set()
+
+class SnapshotSegmentReader:
+    """只读映射段文件，段不存在或写入方未运行时 read() 返回 None"""
+
+    def __init__(self, path: Optional[str] = None, max_retries: int = 100):
+        self.path = path or segment_path()
+        self.max_retries = max_retries
+        self._mm: Optional[mmap.mmap] = None
+        self._words = self._floats = None
+        self._inode = None
+
+    def _map(self) -> Optional[mmap.mmap]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        if self._mm is not None and st.st_ino == self._inode:
+            return self._mm
+        if st.st_size < HEADER_SIZE:
+            return None
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:8] != MAGIC:
+            mm.close()
+            return None
+        if self._mm is not None:
+            self._words.release()
+            self._floats.release()
+            self._mm.close()
+        self._mm, self._inode = mm, st.st_ino
+        self._words, self._floats = memoryview(mm).cast('Q'), memoryview(mm).cast('d')
+        return mm
+
+    def _alive(self) -> bool:
+        return time.time() - self._floats[HEARTBEAT_INDEX] < config.SNAPSHOT_SEGMENT_STALE
+
+    def last_publish(self) -> Optional[float]:
+        """段中最近一次确认取值的时间 (epoch 秒)，段不可用时返回 None"""
+        if self._mm is None and self._map() is None:
+            return None
+        return self._floats[LAST_PUBLISH_INDEX] or None
+
+    def fresh(self) -> bool:
+        """写入方在 SNAPSHOT_SEGMENT_STALE 秒内刷新过 heartbeat，
+        且段中的数据在 SNAPSHOT_SEGMENT_MAX_AGE 秒内确认过 (采集没有持续失败)"""
+        if self._mm is None and self._map() is None:
+            return False
+        # 写入方可能重建了段文件，heartbeat 过期时重新映射后再判断一次
+        if not self._alive() and (self._map() is None or not self._alive()):
+            return False
+        return time.time() - self._floats[LAST_PUBLISH_INDEX] < config.SNAPSHOT_SEGMENT_MAX_AGE
+
+    def seq(self) -> Optional[int]:
+        """当前序号 (内容每变化一次加 2)，用于判断是否需要重新读取"""
+        return self._words[SEQ_INDEX] if self.fresh() else None
+
+    def read(self) -> Optional[tuple]:
+        """(seq, {类别: {市场/来源: {金属: 行}}})，写入方未运行时返回 None"""
+        if not self.fresh():
+            return None
+        mm = self._mm
+        for _ in range(self.max_retries):
+            seq = self._words[SEQ_INDEX]
+            if seq % 2:
+                time.sleep(0)
+                continue
+            count = min(COUNT.unpack_from(mm, COUNT_OFFSET)[0], (len(mm) - HEADER_SIZE) // SLOT.size)
+            slots = [SLOT.unpack_from(mm, HEADER_SIZE + i * SLOT.size) for i in range(count)]
+            if self._words[SEQ_INDEX] != seq:
+                continue
+            result: Dict[str, Dict[str, Dict[str, Any]]] = {kind: {} for kind in SEGMENT_KINDS}
+            for kind, group, metal, row_id, date, valid_until, *rest in slots:
+                kind, group, metal = _unpack_text(kind), _unpack_text(group), _unpack_text(metal)
+                if kind not in SEGMENT_KINDS:
+                    continue
+                group_field, numbers, texts = SEGMENT_KINDS[kind]
+                row = {
+                    'id': row_id, 'date': _unpack_time(date), 'valid_until': _unpack_time(valid_until),
+                    group_field: group, 'metal': metal,
+                }
+                for name, value in zip(numbers, rest[:4]):
+                    row[name] = None if math.isnan(value) else value
+                for name, value in zip(texts, rest[4:]):
+                    row[name] = _unpack_text(value)
+                result[kind].setdefault(group, {})[metal] = row
+            return seq, result
+        logger.warning("[Segment] 读取时写入一直未完成，放弃本次读取")
+        return None
+
+    def get_group(self, kind: str, group: str, metals: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """与 SnapshotStore.get_group 相同的结构，段不可用时返回 None"""
+        snapshot = self.read()
+        if snapshot is None:
+            return None
+        rows = snapshot[1][kind].get(group, {})
+        return {metal: rows[metal] for metal in metals if metal in rows}
+
+    def quotes(self, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """按新浪代码取价 {代码: {price, time, name}} (与监控脚本的 SinaSpiderFetcher 结果格式一致)，
+        只包含段中有的代码"""
+        snapshot = self.read()
+        if snapshot is None:
+            return {}
+        result = {}
+        for code in codes:
+            if code not in SINA_CODES:
+                continue
+            kind, group, metal, field = SINA_CODES[code]
+            row = snapshot[1][kind].get(group, {}).get(metal)
+            if row is None or row.get(field) is None:
+                continue
+            as_of = (row.get('provider_as_of') or '').split(' ')[-1]
+            if len(as_of) == 6 and as_of.isdigit():
+                # 国内期货的时间为 hhmmss
+                as_of = f"{as_of[:2]}:{as_of[2:4]}:{as_of[4:]}"
+            elif not as_of and (row['valid_until'] or row['date']):
+                # 取值未变化时 valid_until 为最近一次确认的时间
+                as_of = (row['valid_until'] or row['date']).strftime('%H:%M:%S')
+            result[code] = {'price': row[field], 'time': as_of or '--', 'name': code}
+        return result
+
+class QuoteFeed:
+    """监控脚本的行情源: 采集进程运行时读取共享快照段，段中没有的代码 (如汇率) 由 fetch 直接获取并缓存 ttl 秒；
+    采集进程未运行时每次都直接获取"""
+
+    def __init__(self, fetch: Callable[[List[str]], Dict[str, Dict[str, Any]]],
+                 reader: Optional[SnapshotSegmentReader] = None, ttl: Optional[float] = None):
+        self.fetch = fetch
+        self.reader = reader or SnapshotSegmentReader()
+        self.ttl = config.SNAPSHOT_SEGMENT_FALLBACK_TTL if ttl is None else ttl
+        self._cache: Dict[str, tuple] = {}
+
+    def get(self, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        result = self.reader.quotes(codes)
+        if not result:
+            return self.fetch(codes)
+        now = time.time()
+        missing = [c for c in codes if c not in result
+                   and (c not in self._cache or now - self._cache[c][0] >= self.ttl)]
+        if missing:
+            for code, quote in self.fetch(missing).items():
+                self._cache[code] = (now, quote)
+        for code in codes:
+            if code not in result and code in self._cache:
+                result[code] = self._cache[code][1]
+        return result
@@ -0,0 +1,159 @@
+"""
+最新数据快照存储
+采集器提交后写入，API 路由直接读取，不再为"最新值"查询 SQLite
+"""
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Any
+import logging
+try:
+    from models import ComexWarehouse, SilverPrice
+except ImportError:
+    from backend.models import ComexWarehouse, SilverPrice
+
+logger = logging.getLogger(__name__)
+
+# 快照类别 -> (模型, 分组字段)
+SNAPSHOT_KINDS = {
+    'price': (SilverPrice, 'market'),
+    'warehouse': (ComexWarehouse, 'source'),
+}
+
+def row_to_dict(model_instance) -> Dict[str, Any]:
+    """将 ORM 对象转换为字典，带时区的时间统一为 UTC naive (与 SQLite 读回一致)"""
+    result = {}
+    for c in model_instance.__table__.columns:
+        value = getattr(model_instance, c.name)
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        result[c.name] = value
+    return result
+
+class SnapshotStore:
+    """按 (类别, 市场/来源, 金属) 保存最新一行数据的版本化存储。
+    版本号只随取值变化 (publish) 递增；取值未变化的采集周期只记录确认时间 (confirm)，不改变快照内容"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: Dict[tuple, Dict[str, Any]] = {}
+        self._kind_versions: Dict[str, int] = {kind: 0 for kind in SNAPSHOT_KINDS}
+        self._confirmed: Dict[str, datetime] = {}
+        self._listeners: List[Callable[[int, str, List[Dict[str, Any]]], None]] = []
+        self._confirm_listeners: List[Callable[[str, datetime], None]] = []
+        self.version = 0
+
+    def add_listener(self, listener: Callable[[int, str, List[Dict[str, Any]]], None]):
+        """注册变更监听 listener(版本号, 类别, 变化的行)，在 publish 之后调用"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def add_confirm_listener(self, listener: Callable[[str, datetime], None]):
+        """注册确认监听 listener(类别, 确认时间)，在 confirm 之后调用"""
+        with self._lock:
+            self._confirm_listeners.append(listener)
+
+    def _advance_confirmed(self, kind: str, confirmed_at: Optional[datetime]) -> bool:
+        current = self._confirmed.get(kind)
+        if confirmed_at is None or (current is not None and confirmed_at <= current):
+            return False
+        self._confirmed[kind] = confirmed_at
+        return True
+
+    def publish(self, kind: str, rows: List[Dict[str, Any]]) -> int:
+        """写入已提交的行 (只保留每个键时间最新的一行)，返回新的版本号"""
+        _, group_field = SNAPSHOT_KINDS[kind]
+        with self._lock:
+            changed = []
+            for row in rows:
+                key = (kind, row.get(group_field), row.get('metal'))
+                current = self._rows.get(key)
+                if current is not None and current.get('date') and row.get('date') \
+                        and row['date'] < current['date']:
+                    continue
+                self._rows[key] = dict(row)
+                changed.append(dict(row))
+            self._advance_confirmed(kind, max(
+                (row.get('valid_until') or row.get('date') for row in changed
+                 if row.get('valid_until') or row.get('date')), default=None))
+            if changed:
+                self.version += 1
+                self._kind_versions[kind] = self.version
+            version = self.version
+            listeners = list(self._listeners) if changed else []
+        for listener in listeners:
+            try:
+                listener(version, kind, changed)
+            except Exception as e:
+                logger.error(f"[Snapshot] listener failed: {e}")
+        return version
+
+    def confirm(self, kind: str, confirmed_at: datetime):
+        """取值未变化 (只延长了 valid_until) 时记录最近一次确认的时间：
+        不改变快照内容与版本号 (接口的 ETag 与 SSE 不受影响)，只通知确认监听"""
+        with self._lock:
+            if not self._advance_confirmed(kind, confirmed_at):
+                return
+            listeners = list(self._confirm_listeners)
+        for listener in listeners:
+            try:
+                listener(kind, confirmed_at)
+            except Exception as e:
+                logger.error(f"[Snapshot] confirm listener failed: {e}")
+
+    def confirmed(self, kind: str) -> Optional[datetime]:
+        """某类别最近一次确认取值的时间 (新行的 valid_until 或之后的延长)"""
+        with self._lock:
+            return self._confirmed.get(kind)
+
+    def get(self, kind: str, group: str, metal: str) -> Optional[Dict[str, Any]]:
+        """获取单个键的最新行 (返回副本)"""
+        with self._lock:
+            row = self._rows.get((kind, group, metal))
+            return dict(row) if row is not None else None
+
+    def get_group(self, kind: str, group: str, metals: List[str]) -> Dict[str, Dict[str, Any]]:
+        """获取某市场/来源下多个金属的最新行"""
+        with self._lock:
+            result = {}
+            for metal in metals:
+                row = self._rows.get((kind, group, metal))
+                if row is not None:
+                    result[metal] = dict(row)
+            return result
+
+    def dump(self) -> tuple:
+        """(版本号, {类别: {市场/来源: {金属: 行}}})，同一把锁内取出，版本与内容一致"""
+        with self._lock:
+            result: Dict[str, Dict[str, Dict[str, Any]]] = {kind: {} for kind in SNAPSHOT_KINDS}
+            for (kind, group, metal), row in self._rows.items():
+                result[kind].setdefault(group, {})[metal] = dict(row)
+            return self.version, result
+
+    def kind_version(self, kind: str) -> int:
+        """某类别最近一次变更时的版本号"""
+        with self._lock:
+            return self._kind_versions[kind]
+
+    def seed_from_db(self, session_factory) -> int:
+        """启动时从数据库加载每个键的最新一行，避免重启后返回空数据"""
+        session = session_factory()
+        try:
+            for kind, (model, group_field) in SNAPSHOT_KINDS.items():
+                group_col = getattr(model, group_field)
+                keys = session.query(group_col, model.metal).distinct().all()
+                rows = []
+                for group, metal in keys:
+                    latest = session.query(model).filter(
+                        group_col == group,
+                        model.metal == metal
+                    ).order_by(model.date.desc()).first()
+                    if latest:
+                        rows.append(row_to_dict(latest))
+                self.publish(kind, rows)
+                logger.info(f"[Snapshot] Seeded {len(rows)} {kind} rows from DB")
+            return self.version
+        finally:
+            session.close()
+
+# 全局快照存储 (采集线程写入，请求线程读取)
+snapshot_store = SnapshotStore()
@@ -0,0 +1,194 @@
+"""
+实时推送 (Server-Sent Events)
+快照发布时每个品种的变化只编码一次，同一份字节放入所有客户端的队列；
+客户端队列按品种合并 (慢客户端只收到最新值)，有上限，溢出时改发完整快照；
+最近的事件按版本保存在环形缓冲中 (整版本淘汰)，断线重连时按 Last-Event-ID 补发。
+事件 id 为 "<来源>-<版本号>"，来源在每个进程 (每个 StreamHub) 启动时随机生成：
+版本号只在本进程内有意义，重连到其他 worker 或重启后的进程时 id 不匹配，改发完整快照
+"""
+import json
+import threading
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterator, List, Optional, Any
+import logging
+try:
+    from config import config
+    from rollups import tick_price
+    from snapshot_store import SNAPSHOT_KINDS
+except ImportError:
+    from backend.config import config
+    from backend.rollups import tick_price
+    from backend.snapshot_store import SNAPSHOT_KINDS
+
+logger = logging.getLogger(__name__)
+
+def _with_price(kind: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    """与 /api/price/latest 相同，价格行带上 price 字段"""
+    if kind == 'price':
+        row['price'] = tick_price(row.get('spot_price'), row.get('futures_price'))
+    return row
+
+class _Client:
+    """一个 SSE 连接: 按品种合并的待发送事件"""
+
+    def __init__(self, max_pending: int):
+        self.cond = threading.Condition()
+        self.pending: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self.max_pending = max_pending
+        self.resync = False
+
+    def push(self, key: tuple, event: bytes):
+        with self.cond:
+            if key in self.pending:
+                # 合并: 同一品种只保留最新一条
+                del self.pending[key]
+            elif len(self.pending) >= self.max_pending:
+                self.pending.clear()
+                self.resync = True
+            if not self.resync:
+                self.pending[key] = event
+            self.cond.notify()
+
+    def take(self, timeout: float) -> tuple:
+        """等待事件，返回 (是否需要完整快照, 事件列表)"""
+        with self.cond:
+            if not self.pending and not self.resync:
+                self.cond.wait(timeout)
+            resync, events = self.resync, list(self.pending.values())
+            self.pending.clear()
+            self.resync = False
+            return resync, events
+
+def stream_capacity() -> int:
+    """每个进程同时保持的 SSE 连接上限: 每个连接在整个生命周期内占用一个服务线程，
+    默认为服务线程数 (SERVER_THREADS) 减去留给普通请求的 STREAM_RESERVED_THREADS"""
+    if config.STREAM_MAX_CLIENTS:
+        return config.STREAM_MAX_CLIENTS
+    return max(1, config.SERVER_THREADS - config.STREAM_RESERVED_THREADS)
+
+class StreamHub:
+    """快照存储的 SSE 广播器"""
+
+    def __init__(self, store, dumps: Callable[[Any], str] = json.dumps, max_clients: Optional[int] = None):
+        self.store = store
+        self.dumps = dumps
+        self.origin = uuid.uuid4().hex[:12]
+        self.max_clients = max_clients or stream_capacity()
+        self._slots = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._clients: List[_Client] = []
+        # (版本号, [(品种键, 事件字节)])；超过 STREAM_HISTORY_SIZE 个事件时淘汰最早的整个版本，
+        # 缓冲中的每个版本都是完整的
+        self._history: deque = deque()
+        self._history_events = 0
+        self.broadcasts = 0
+        store.add_listener(self.broadcast)
+
+    def reserve(self) -> bool:
+        """为一个新连接占用名额，已满时返回 False (调用方拒绝连接)；连接关闭时调用 release()"""
+        with self._lock:
+            if self._slots >= self.max_clients:
+                self.rejected += 1
+                return False
+            self._slots += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._slots -= 1
+
+    def _event(self, event_id: str, name: str, data: Any) -> bytes:
+        return f"id: {event_id}\nevent: {name}\ndata: {self.dumps(data)}\n\n".encode('utf-8')
+
+    def broadcast(self, version: int, kind: str, rows: List[Dict[str, Any]]):
+        """快照监听: 每行编码一次后分发给所有客户端"""
+        _, group_field = SNAPSHOT_KINDS[kind]
+        events = []
+        for row in rows:
+            key = (kind, row.get(group_field), row.get('metal'))
+            events.append((key, self._event(f"{self.origin}-{version}", kind, {
+                'group': key[1],
+                'metal': key[2],
+                'row': _with_price(kind, row),
+            })))
+        with self._lock:
+            self._history.append((version, events))
+            self._history_events += len(events)
+            while self._history_events > config.STREAM_HISTORY_SIZE and len(self._history) > 1:
+                self._history_events -= len(self._history.popleft()[1])
+            clients = list(self._clients)
+            self.broadcasts += 1
+        for client in clients:
+            for key, event in events:
+                client.push(key, event)
+
+    def snapshot_event(self) -> bytes:
+        """完整快照事件 (新连接、无法补发或队列溢出时发送)"""
+        version, data = self.store.dump()
+        for kind, groups in data.items():
+            for metals in groups.values():
+                for row in metals.values():
+                    _with_price(kind, row)
+        return self._event(f"{self.origin}-{version}", 'snapshot', data)
+
+    def _replay(self, last_event_id: Optional[str]) -> Optional[List[bytes]]:
+        """Last-Event-ID 之后的事件 (按品种合并)；无法补发时返回 None"""
+        if not last_event_id:
+            return None
+        origin, _, version = last_event_id.rpartition('-')
+        if origin != self.origin or not version.isdigit():
+            return None
+        version = int(version)
+        with self._lock:
+            if version > self.store.version:
+                return None
+            if version < self.store.version:
+                oldest = self._history[0][0] if self._history else None
+                if oldest is None or oldest > version + 1:
+                    # 环形缓冲中已没有需要补发的全部版本
+                    return None
+            missed: "OrderedDict[tuple, bytes]" = OrderedDict()
+            for event_version, events in self._history:
+                if event_version > version:
+                    for key, event in events:
+                        missed.pop(key, None)
+                        missed[key] = event
+            return list(missed.values())
+
+    def stream(self, last_event_id: Optional[str] = None) -> Iterator[bytes]:
+        """一个客户端的 SSE 字节流"""
+        client = _Client(config.STREAM_CLIENT_QUEUE_SIZE)
+        # 先注册再取补发内容: 两者之间发布的事件可能重复，但不会丢失
+        with self._lock:
+            self._clients.append(client)
+        try:
+            yield f"retry: {config.STREAM_RETRY_MS}\n\n".encode('utf-8')
+            replay = self._replay(last_event_id)
+            if replay is None:
+                yield self.snapshot_event()
+            elif replay:
+                yield b''.join(replay)
+            while True:
+                resync, events = client.take(config.STREAM_HEARTBEAT)
+                if resync:
+                    yield self.snapshot_event()
+                elif events:
+                    yield b''.join(events)
+                else:
+                    # 心跳注释，保持连接并及时发现断开的客户端
+                    yield b": keepalive\n\n"
+        finally:
+            with self._lock:
+                self._clients.remove(client)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'max_clients': self.max_clients,
+                'rejected': self.rejected,
+                'broadcasts': self.broadcasts,
+                'history': self._history_events,
+            }
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+测试冷数据归档
+按天写入 Parquet 后分批删除热数据、归档读取的过滤与游标、历史分页跨热数据和归档连续翻页，
+只查询热数据窗口时不读取归档
+"""
+
+import sys
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import pagination
+from config import config
+from models import Base, SilverPrice
+from archive import archive_horizon, archive_table, read_archive
+from pagination import decode_cursor, keyset_page
+
+pytest.importorskip('pyarrow')
+
+START = datetime(2024, 1, 2)
+DAYS = 4
+PER_DAY = 6
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ARCHIVE_DIR', str(tmp_path / 'archive'))
+    path = str(tmp_path / 'silver_gold.db')
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    # 每天 PER_DAY 行，两个市场交替，按时间顺序写入 (时间格式与 ORM 写入的相同)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO silver_price (market, metal, spot_price, date, valid_until) VALUES (?, 'silver', ?, ?, ?)",
+        [(('Comex', 'London')[i % 2], 30.0 + i, stamp, stamp)
+         for i, stamp in enumerate(
+             (START + timedelta(days=day, hours=3 * hour))
+             .strftime('%Y-%m-%d %H:%M:%S.%f')
+             for day in range(DAYS) for hour in range(PER_DAY))]
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def archive_first_days(db_path, days=2, **kwargs):
+    conn = sqlite3.connect(db_path)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    archived = archive_table(conn, 'silver_price', START + timedelta(days=days), **kwargs)
+    conn.close()
+    return archived, statements
+
+
+def test_archive_moves_closed_days_in_batches(db_path):
+    archived, statements = archive_first_days(db_path, delete_batch_size=2, pause=0)
+    assert archived == 2 * PER_DAY
+    # 每天的 PER_DAY 行按 2 行一批删除
+    assert sum(sql.startswith('DELETE') for sql in statements) == 2 * PER_DAY // 2
+
+    conn = sqlite3.connect(db_path)
+    remaining = [row[0] for row in conn.execute("SELECT date FROM silver_price ORDER BY id")]
+    conn.close()
+    assert len(remaining) == (DAYS - 2) * PER_DAY
+    assert min(remaining) == (START + timedelta(days=2)).strftime('%Y-%m-%d %H:%M:%S.%f')
+    assert archive_horizon('silver_price') == START + timedelta(days=2)
+
+
+def test_read_archive_filters_and_pages(db_path):
+    archive_first_days(db_path, pause=0)
+
+    rows = read_archive('silver_price', START)
+    assert len(rows) == 2 * PER_DAY
+    assert [(row['date'], row['id']) for row in rows] == \
+        sorted(((row['date'], row['id']) for row in rows), reverse=True)
+
+    london = read_archive('silver_price', START, {'market': 'London'})
+    assert {row['market'] for row in london} == {'London'}
+    assert len(london) == PER_DAY
+
+    # 游标之后的一页，只读取部分列
+    cursor = (rows[2]['date'], rows[2]['id'])
+    page = read_archive('silver_price', START, before=cursor, limit=3, columns=['id', 'date', 'spot_price'])
+    assert [row['id'] for row in page] == [row['id'] for row in rows[3:6]]
+    assert set(page[0]) == {'id', 'date', 'spot_price'}
+
+
+def paginate(session, start_date, limit):
+    """从首页翻到最后一页，返回所有行的 id"""
+    ids, cursor = [], None
+    while True:
+        query = session.query(SilverPrice).filter(SilverPrice.valid_until >= start_date)
+        rows, token = keyset_page(query, SilverPrice, lambda row: {'id': row.id, 'date': row.date},
+                                  limit, cursor, 'silver_price', start_date)
+        ids += [row['id'] for row in rows]
+        if token is None:
+            return ids
+        cursor = decode_cursor(token)
+
+
+def test_pagination_continues_from_hot_rows_into_archive(db_path, monkeypatch):
+    archive_first_days(db_path, pause=0)
+    reads = []
+    monkeypatch.setattr(pagination, 'read_archive',
+                        lambda *args, **kwargs: reads.append(args) or read_archive(*args, **kwargs))
+    engine = create_engine(f'sqlite:///{db_path}')
+    session = sessionmaker(bind=engine)()
+
+    # 页边界不与热数据/归档的分界对齐
+    ids = paginate(session, START, limit=5)
+    assert ids == list(range(DAYS * PER_DAY, 0, -1))
+    assert reads
+
+    # 只查询热数据窗口: 最后一页不足一页也不读取归档
+    reads.clear()
+    ids = paginate(session, START + timedelta(days=3), limit=5)
+    assert ids == list(range(DAYS * PER_DAY, 3 * PER_DAY, -1))
+    assert reads == []
+
+    session.close()
+    engine.dispose()
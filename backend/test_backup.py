@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+测试在线备份
+完整备份 + 变更页增量备份恢复后与源库内容一致
+"""
+
+import sys
+import os
+import sqlite3
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from config import config
+from backup import create_full_backup, create_incremental_backup, read_delta_header, restore_backup
+
+
+def table_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT id, market, price, note FROM tick ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    # 每步只复制几页，覆盖分步复制
+    monkeypatch.setattr(config, 'BACKUP_PAGES_PER_STEP', 4)
+    monkeypatch.setattr(config, 'BACKUP_STEP_PAUSE', 0)
+    path = str(tmp_path / 'silver_gold.db')
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE tick (id INTEGER PRIMARY KEY, market TEXT, price REAL, note TEXT)")
+    conn.executemany("INSERT INTO tick (market, price, note) VALUES (?, ?, ?)",
+                     [('Comex', 30.0 + i / 100, 'x' * 200) for i in range(2000)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_full_and_incremental_restore_round_trip(db_path, tmp_path):
+    backup_dir = str(tmp_path / 'backup')
+    full = create_full_backup(db_path, backup_dir)
+    before = table_rows(db_path)
+
+    # 完整备份之后: 修改中间的页、删除行、追加行 (文件变大)
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE tick SET price = price + 1 WHERE id % 97 = 0")
+    conn.execute("DELETE FROM tick WHERE id BETWEEN 500 AND 520")
+    conn.executemany("INSERT INTO tick (market, price, note) VALUES (?, ?, ?)",
+                     [('London', 25.0 + i / 100, 'y' * 300) for i in range(1500)])
+    conn.commit()
+    conn.close()
+    after = table_rows(db_path)
+
+    delta = create_incremental_backup(db_path, backup_dir)
+    header = read_delta_header(delta)
+    assert header['base'] == os.path.basename(full)
+
+    restored = restore_backup(delta, str(tmp_path / 'restored.db'))
+    assert table_rows(restored) == after
+
+    # 完整备份单独恢复仍是备份时的内容
+    restored_full = restore_backup(full, str(tmp_path / 'restored_full.db'))
+    assert table_rows(restored_full) == before
+
+
+def test_incremental_only_stores_changed_pages(db_path, tmp_path):
+    backup_dir = str(tmp_path / 'backup')
+    full = create_full_backup(db_path, backup_dir)
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE tick SET price = -1 WHERE id = 1000")
+    conn.commit()
+    conn.close()
+
+    delta = create_incremental_backup(db_path, backup_dir)
+    assert os.path.getsize(delta) < os.path.getsize(full) / 10
+    assert table_rows(restore_backup(delta, str(tmp_path / 'restored.db'))) == table_rows(db_path)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+测试多 worker 部署
+leader 锁互斥、follower 同步其他连接提交的行、导入 app 模块不启动采集
+"""
+
+import sys
+import os
+import subprocess
+from datetime import datetime, timedelta
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, SilverPrice
+from snapshot_store import SnapshotStore
+from response_cache import data_versions
+from cluster import FileLock, FollowerSync, LeaderElection
+
+START = datetime(2024, 1, 2, 9, 30)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'silver_gold.db')
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return path
+
+
+@pytest.fixture
+def leader_session(db_path):
+    """另一个进程 (leader) 的写连接"""
+    engine = create_engine(f'sqlite:///{db_path}')
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def follower_factory(db_path):
+    engine = create_engine(f'sqlite:///{db_path}')
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def test_second_lock_holder_fails(tmp_path):
+    path = str(tmp_path / 'leader.lock')
+    first, second = FileLock(path), FileLock(path)
+    assert first.acquire(blocking=False)
+    assert not second.acquire(blocking=False)
+    first.release()
+    assert second.acquire(blocking=False)
+    second.release()
+
+
+def test_only_one_election_wins(tmp_path):
+    path = str(tmp_path / 'leader.lock')
+    elected = []
+    first = LeaderElection(path, lambda: elected.append('first'), retry_interval=0.01)
+    second = LeaderElection(path, lambda: elected.append('second'), retry_interval=0.01)
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    # 已是 leader 时不重复调用 on_elected
+    assert first.try_acquire()
+    assert elected == ['first']
+    assert open(path).read() == str(os.getpid())
+
+    # leader 退出 (锁释放) 后由另一个 worker 接任
+    first.lock.release()
+    assert second.try_acquire()
+    assert elected == ['first', 'second']
+    second.lock.release()
+
+
+def tick(price, seconds, valid_seconds=None):
+    date = START + timedelta(seconds=seconds)
+    return SilverPrice(market='Comex', metal='silver', spot_price=price, source='test', date=date,
+                       valid_until=START + timedelta(seconds=valid_seconds if valid_seconds is not None else seconds))
+
+
+def test_follower_picks_up_rows_committed_elsewhere(db_path, leader_session, follower_factory):
+    store = SnapshotStore()
+    follower = FollowerSync(db_path, store, follower_factory)
+    follower.sync_once()
+    # 没有新提交时不做任何事
+    assert not follower.sync_once()
+
+    leader_session.add(tick(30.0, 0))
+    leader_session.commit()
+    before = data_versions.get(['silver_price'])
+    assert follower.sync_once()
+    assert data_versions.get(['silver_price']) != before
+    latest = store.get('price', 'Comex', 'silver')
+    assert latest['spot_price'] == 30.0
+
+    # 取值未变化: leader 只延长 valid_until
+    row = leader_session.query(SilverPrice).one()
+    row.valid_until = START + timedelta(seconds=4)
+    leader_session.commit()
+    version = store.version
+    assert follower.sync_once()
+    # 与 leader 一致: 只记录确认时间，快照内容与版本号不变
+    assert store.version == version
+    assert store.get('price', 'Comex', 'silver')['valid_until'] == START
+    assert store.confirmed('price') == START + timedelta(seconds=4)
+
+    leader_session.add(tick(30.5, 6))
+    leader_session.commit()
+    assert follower.sync_once()
+    assert store.get('price', 'Comex', 'silver')['spot_price'] == 30.5
+    assert follower.syncs == 3
+
+
+def test_importing_app_starts_nothing():
+    # 工厂之外不创建应用: 导入 app 模块不建库、不参与选举、不启动任何线程
+    script = ("import threading, app; "
+              "print(hasattr(app, 'app'), sorted(t.name for t in threading.enumerate()))")
+    output = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False ['MainThread']"
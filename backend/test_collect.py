@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+测试采集周期
+抓取阶段并发发出所有上游请求，解析与写入只在调用线程中进行；
+伦敦金银由 Metals.Live 与新浪提供主源和备源时不请求 Yahoo
+"""
+
+import sys
+import os
+import threading
+import time
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import data_collector
+import http_client
+import write_batch
+from models import Base
+from change_writer import ChangeOnlyWriter
+from snapshot_store import SnapshotStore
+
+DELAY = 0.2
+
+
+class FakeResponse:
+    """上游不可用 (503)，各采集器按失败处理"""
+    status_code = 503
+    text = ''
+    content = b''
+
+    def json(self):
+        raise ValueError('no json')
+
+
+class FakeUpstream:
+    """记录并发请求数的假上游，每个请求耗时 DELAY 秒"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    def get(self, url, timeout=None, **kwargs):
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(DELAY)
+        with self.lock:
+            self.active -= 1
+        return FakeResponse()
+
+
+class QuoteResponse:
+    def __init__(self, status_code=200, text='', payload=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode()
+        self.payload = payload
+
+    def json(self):
+        if self.payload is None:
+            raise ValueError('no json')
+        return self.payload
+
+
+class QuoteUpstream:
+    """按 URL 返回行情的假上游: 新浪伦敦三个品种、Metals.Live 金银 (down 中的金属不可用)、Yahoo"""
+
+    def __init__(self, down=()):
+        self.lock = threading.Lock()
+        self.urls = []
+        self.down = set(down)
+
+    def get(self, url, timeout=None, **kwargs):
+        with self.lock:
+            self.urls.append(url)
+        if url.startswith(data_collector.PriceDataCollector.SINA_URL):
+            fields = ['2000.5'] + ['0'] * 5 + ['10:00:00'] + ['0'] * 5 + ['2024-01-02']
+            return QuoteResponse(text=''.join(
+                f'var hq_str_{symbol}="{",".join(fields)}";\n' for symbol in url.split('=')[1].split(',')))
+        if 'metals.live' in url:
+            metal = url.rsplit('/', 1)[1]
+            if metal in self.down:
+                return QuoteResponse(503)
+            return QuoteResponse(payload=[['2024-01-02 10:00:00', 2001.0]])
+        return QuoteResponse(payload={'chart': {'result': [{'meta': {
+            'regularMarketPrice': 2002.0, 'regularMarketTime': 1704189600}}]}})
+
+    def yahoo_symbols(self):
+        prefix = data_collector.PriceDataCollector.YAHOO_URL
+        return sorted(url[len(prefix):] for url in self.urls if url.startswith(prefix))
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    fake = FakeUpstream()
+    monkeypatch.setattr(http_client, 'get', fake.get)
+    return fake
+
+
+@pytest.fixture
+def staged_threads(tmp_path, monkeypatch):
+    """周期写入临时数据库，并记录暂存写入的线程"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'silver_gold.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    threads = set()
+
+    class RecordingBatch(write_batch.WriteBatch):
+        def __init__(self):
+            super().__init__(factory, factory)
+
+        def stage(self, row):
+            threads.add(threading.get_ident())
+            return super().stage(row)
+
+        def add_log(self, *args, **kwargs):
+            threads.add(threading.get_ident())
+            return super().add_log(*args, **kwargs)
+
+    monkeypatch.setattr(data_collector, 'WriteBatch', RecordingBatch)
+    monkeypatch.setattr(write_batch, 'change_writer', ChangeOnlyWriter())
+    monkeypatch.setattr(write_batch, 'snapshot_store', SnapshotStore())
+    yield threads
+    engine.dispose()
+
+
+def test_fetch_phase_runs_upstream_requests_concurrently(upstream, staged_threads):
+    stats = data_collector.collect_all_data()
+
+    assert upstream.calls >= 10
+    assert stats['requests'] == upstream.calls
+    # 串行需要 calls * DELAY 秒；并发时接近单个请求的耗时
+    assert upstream.max_active >= min(upstream.calls, data_collector.config.COLLECT_MAX_WORKERS) // 2
+    assert stats['collect_ms'] < upstream.calls * DELAY * 1000 / 3
+    # 写入批次只在调用线程中使用
+    assert staged_threads == {threading.get_ident()}
+    assert stats['logs'] > 0
+
+
+@pytest.mark.parametrize('down, yahoo_symbols, sources', [
+    # Metals.Live 主源 + 新浪备源: 金银不请求 Yahoo，铜以新浪为主源、Yahoo 为备源
+    ((), ['HG=F'], {'gold': 'Metals.Live', 'silver': 'Metals.Live', 'copper': 'Sina'}),
+    # Metals.Live 白银不可用: 回退新浪主源，补发 Yahoo 作备源
+    (('silver',), ['HG=F', 'XAGUSD=X'], {'gold': 'Metals.Live', 'silver': 'Sina', 'copper': 'Sina'}),
+])
+def test_london_requests_yahoo_only_as_fallback(monkeypatch, staged_threads, down, yahoo_symbols, sources):
+    fake = QuoteUpstream(down)
+    monkeypatch.setattr(http_client, 'get', fake.get)
+    collector = data_collector.PriceDataCollector(data_collector.WriteBatch(), http_client.RequestMemo())
+
+    results = collector.collect_prices_by_market('London')
+    assert fake.yahoo_symbols() == yahoo_symbols
+    assert {row['metal']: row['source'] for row in results} == sources
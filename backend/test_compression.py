@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+测试响应压缩
+Accept-Encoding 协商 (q 值、拒绝压缩、brotli 未安装时只用 gzip)、大小与类型阈值、
+带强 ETag 的响应压缩后改为弱 ETag 且条件请求仍返回 304、每个版本只压缩一次
+"""
+
+import sys
+import os
+import gzip
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from flask import Flask, jsonify
+import compression
+import response_cache
+from compression import BROTLI_AVAILABLE, StaticAsset, choose_encoding, init_compression
+from response_cache import etag_route
+
+ROWS = [{'market': 'Comex', 'metal': 'silver', 'spot_price': 30.0 + i} for i in range(100)]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(response_cache, 'response_cache', response_cache.ResponseCache())
+    app = Flask('compression')
+
+    @app.route('/rows')
+    def rows():
+        return jsonify(ROWS)
+
+    @app.route('/small')
+    def small():
+        return jsonify(ROWS[:1])
+
+    @app.route('/binary')
+    def binary():
+        return app.response_class(b'\0' * 4096, mimetype='application/octet-stream')
+
+    @app.route('/latest')
+    @etag_route(lambda: 'v1')
+    def latest():
+        return jsonify(ROWS)
+
+    init_compression(app)
+    return app.test_client()
+
+
+@pytest.mark.parametrize('accept_encoding, expected', [
+    (None, None),
+    ('', None),
+    ('identity', None),
+    ('gzip', 'gzip'),
+    ('GZIP, deflate', 'gzip'),
+    ('gzip;q=0', None),
+    ('*', 'br' if BROTLI_AVAILABLE else 'gzip'),
+    ('*;q=0.5, gzip;q=0', 'br' if BROTLI_AVAILABLE else None),
+    ('gzip;q=0.2, br;q=0.8', 'br' if BROTLI_AVAILABLE else 'gzip'),
+])
+def test_choose_encoding(accept_encoding, expected):
+    assert choose_encoding(accept_encoding) == expected
+
+
+def test_brotli_is_not_offered_when_missing():
+    if BROTLI_AVAILABLE:
+        pytest.skip('brotli 已安装')
+    assert compression.ENCODINGS == ('gzip',)
+    # 只接受 brotli 的客户端收到未压缩的响应
+    assert choose_encoding('br') is None
+
+
+def test_json_is_gzipped_when_accepted(client):
+    plain = client.get('/rows')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+
+    response = client.get('/rows', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert int(response.headers['Content-Length']) < len(plain.get_data())
+    assert gzip.decompress(response.get_data()) == plain.get_data()
+
+
+def test_small_and_incompressible_responses_are_untouched(client):
+    for path in ('/small', '/binary'):
+        response = client.get(path, headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+
+
+def test_compressed_snapshot_gets_weak_etag_and_revalidates(client, monkeypatch):
+    calls = []
+    original = compression.compress
+
+    def counting_compress(data, encoding, static=False):
+        calls.append(encoding)
+        return original(data, encoding, static)
+
+    monkeypatch.setattr(compression, 'compress', counting_compress)
+
+    plain = client.get('/latest')
+    etag, weak = plain.get_etag()
+    assert not weak
+
+    gzipped = client.get('/latest', headers={'Accept-Encoding': 'gzip'})
+    # 压缩后的表示与原文字节不同: 同一摘要的弱 ETag
+    assert gzipped.get_etag() == (etag, True)
+    assert gzip.decompress(gzipped.get_data()) == plain.get_data()
+
+    # 客户端以弱 ETag 重新验证 (压缩与未压缩均匹配)
+    for headers in ({'Accept-Encoding': 'gzip'}, {}):
+        revalidated = client.get('/latest', headers={'If-None-Match': gzipped.headers['ETag'], **headers})
+        assert revalidated.status_code == 304
+        assert revalidated.headers['ETag'] == f'W/"{etag}"'
+    # 以强 ETag 重新验证未压缩的表示时保持强 ETag
+    revalidated = client.get('/latest', headers={'If-None-Match': plain.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == f'"{etag}"'
+
+    # 同一版本的压缩结果复用
+    assert client.get('/latest', headers={'Accept-Encoding': 'gzip'}).get_data() == gzipped.get_data()
+    assert calls == ['gzip']
+
+
+def test_static_asset_variants():
+    body = b'<html>' + b'silver ' * 1000 + b'</html>'
+    asset = StaticAsset(body, 'text/html; charset=utf-8')
+    data, encoding = asset.select('gzip, br')
+    assert encoding == ('br' if BROTLI_AVAILABLE else 'gzip')
+    if encoding == 'gzip':
+        assert gzip.decompress(data) == body
+    assert asset.select('identity') == (body, None)
+
+
+def test_brotli_is_preferred_when_installed(client):
+    brotli = pytest.importorskip('brotli')
+    response = client.get('/rows', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.get_data()) == client.get('/rows').get_data()
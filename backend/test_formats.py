@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+测试历史接口的响应格式
+format 参数与 Accept 头协商、按列的 JSON / MessagePack / Arrow 与行对象 JSON 内容一致、
+分页游标在 X-Next-Cursor 响应头中，msgpack 未安装时返回 400
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import app as app_module
+import formats
+import response_cache
+from models import Base, SilverPrice
+from json_provider import FastJSONProvider
+
+FIELDS = 'id,date,market,spot_price'
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'silver_gold.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    session = factory()
+    session.add_all([
+        SilverPrice(market=('Comex', '上海')[i % 2], metal='silver', spot_price=30.0 + i,
+                    date=NOW - timedelta(minutes=10 - i), valid_until=NOW - timedelta(minutes=10 - i))
+        for i in range(5)
+    ])
+    session.commit()
+    session.close()
+    monkeypatch.setattr(app_module, 'ReadSession', factory)
+    monkeypatch.setattr(response_cache, 'response_cache', response_cache.ResponseCache())
+
+    app = Flask('formats')
+    app.json = FastJSONProvider(app)
+    app.register_blueprint(app_module.api)
+    yield app.test_client()
+    engine.dispose()
+
+
+def get(client, fmt=None, accept=None, limit=3):
+    query = f'/api/price/all?fields={FIELDS}&limit={limit}' + (f'&format={fmt}' if fmt else '')
+    return client.get(query, headers={'Accept': accept} if accept else {})
+
+
+def json_page(client):
+    body = get(client).get_json()
+    return body['data'], body['next_cursor']
+
+
+def test_columnar_json_matches_rows(client):
+    rows, cursor = json_page(client)
+    response = get(client, 'columnar')
+    assert response.mimetype == 'application/vnd.columnar+json'
+    assert response.headers['X-Next-Cursor'] == cursor
+    body = response.get_json()
+    assert body['columns'] == FIELDS.split(',')
+    assert body['count'] == 3 and body['next_cursor'] == cursor
+    assert body['data'] == {name: [row[name] for row in rows] for name in body['columns']}
+
+
+def test_accept_header_selects_format(client):
+    assert get(client, accept='application/vnd.columnar+json').mimetype == 'application/vnd.columnar+json'
+    assert get(client, accept='text/html, */*;q=0.8').mimetype == 'application/json'
+    # format 参数优先于 Accept 头
+    assert get(client, 'json', accept='application/vnd.columnar+json').mimetype == 'application/json'
+    assert get(client).headers['Vary'] == 'Accept'
+
+
+def test_arrow_stream_matches_rows(client):
+    pa = pytest.importorskip('pyarrow')
+    rows, cursor = json_page(client)
+    response = get(client, accept='application/vnd.apache.arrow.stream')
+    assert response.mimetype == 'application/vnd.apache.arrow.stream'
+    # Arrow 流中没有 JSON 包装，游标只在响应头中
+    assert response.headers['X-Next-Cursor'] == cursor
+    table = pa.ipc.open_stream(response.get_data()).read_all()
+    assert table.column_names == FIELDS.split(',')
+    assert table.schema.field('date').type == pa.timestamp('us')
+    assert table.column('id').to_pylist() == [row['id'] for row in rows]
+    assert table.column('market').to_pylist() == ['Comex', '上海', 'Comex']
+    assert table.column('date').to_pylist() == [NOW - timedelta(minutes=6 + i) for i in range(3)]
+
+
+def test_last_page_has_no_cursor_header(client):
+    for fmt in ('json', 'columnar'):
+        response = get(client, fmt, limit=10)
+        assert 'X-Next-Cursor' not in response.headers
+        assert response.get_json()['count'] == 5
+
+
+def test_msgpack_body(client):
+    msgpack = pytest.importorskip('msgpack')
+    rows, cursor = json_page(client)
+    response = get(client, 'msgpack')
+    assert response.mimetype == 'application/msgpack'
+    assert response.headers['X-Next-Cursor'] == cursor
+    body = msgpack.unpackb(response.get_data(), timestamp=3)
+    assert body['data']['id'] == [row['id'] for row in rows]
+    # 无时区的时间按 UTC 打包为 Timestamp
+    assert body['data']['date'][0] == (NOW - timedelta(minutes=6)).replace(tzinfo=timezone.utc)
+
+
+def test_msgpack_unavailable_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(formats, 'MSGPACK_AVAILABLE', False)
+    for response in (get(client, 'msgpack'), get(client, accept='application/msgpack')):
+        assert response.status_code == 400
+        assert 'msgpack' in response.get_json()['message']
+
+
+def test_unknown_format_is_rejected(client):
+    response = get(client, 'xml')
+    assert response.status_code == 400
+    assert 'Unsupported format' in response.get_json()['message']
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+测试共用的 HTTP 客户端
+5xx 按退避重试、4xx 不重试、同一主机的请求复用长连接、周期内的请求记忆按请求头区分
+"""
+
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+import http_client
+from config import config
+
+
+class Upstream(BaseHTTPRequestHandler):
+    """本地假上游: 按路径返回预设的状态码序列，并记录请求"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.client_address[1], dict(self.headers)))
+            statuses = server.statuses.get(self.path.split('?')[0], [200])
+            status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+        body = f'{status} {self.path}'.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.statuses = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_address[1]}'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_session(monkeypatch):
+    monkeypatch.setattr(config, 'HTTP_BACKOFF_FACTOR', 0.01)
+    monkeypatch.setattr(http_client, '_session', None)
+    yield
+    if http_client._session is not None:
+        http_client._session.close()
+
+
+def test_server_errors_are_retried(upstream):
+    upstream.statuses['/quote'] = [503, 503, 200]
+    response = http_client.get(upstream.url + '/quote')
+    assert response.status_code == 200
+    assert len(upstream.requests) == 3
+
+
+def test_retries_exhausted_return_last_response(upstream):
+    upstream.statuses['/quote'] = [503]
+    response = http_client.get(upstream.url + '/quote')
+    assert response.status_code == 503
+    assert len(upstream.requests) == config.HTTP_RETRIES + 1
+
+
+def test_client_errors_are_not_retried(upstream):
+    upstream.statuses['/missing'] = [404]
+    assert http_client.get(upstream.url + '/missing').status_code == 404
+    assert len(upstream.requests) == 1
+
+
+def test_requests_reuse_one_connection(upstream):
+    for i in range(5):
+        assert http_client.get(upstream.url + f'/quote?i={i}').status_code == 200
+    assert len(upstream.requests) == 5
+    # 同一个客户端端口: 5 次请求走同一条 TCP 连接
+    assert len({port for _, port, _ in upstream.requests}) == 1
+    assert http_client.get_session() is http_client.get_session()
+
+
+def test_memo_merges_identical_requests(upstream):
+    memo = http_client.RequestMemo()
+    url = upstream.url + '/quote'
+    first = memo.get(url, params={'a': 1, 'b': 2}, headers={'Referer': 'http://finance.sina.com.cn'})
+    second = memo.get(url, params={'b': 2, 'a': 1}, headers={'referer': 'http://finance.sina.com.cn'},
+                      timeout=5)
+    assert second is first
+    assert len(upstream.requests) == 1
+    assert memo.stats() == {'requests': 1, 'memo_hits': 1}
+
+
+def test_memo_keeps_requests_with_different_headers_apart(upstream):
+    memo = http_client.RequestMemo()
+    url = upstream.url + '/quote'
+    plain = memo.get(url)
+    sina = memo.get(url, headers={'Referer': 'http://finance.sina.com.cn'})
+    yahoo = memo.get(url, headers={'Accept': 'application/json'})
+    proxied = memo.get(url, headers={'Accept': 'application/json'}, proxies={'http': None})
+    assert len({id(r) for r in (plain, sina, yahoo, proxied)}) == 4
+    assert len(upstream.requests) == 4
+    assert [headers.get('Referer') for _, _, headers in upstream.requests[:2]] == \
+        [None, 'http://finance.sina.com.cn']
+
+    # 带 cookies 的请求不记忆
+    memo.get(url, cookies={'session': 'x'})
+    memo.get(url, cookies={'session': 'x'})
+    assert len(upstream.requests) == 6
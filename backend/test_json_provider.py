@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+测试 JSON 编码
+orjson 与标准库两种实现的输出逐字节一致 (datetime、中文、非字符串键、缩进)，
+没有 orjson 时自动回退到标准库
+"""
+
+import sys
+import os
+import json
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from flask import Flask, jsonify
+import json_provider
+from config import config
+from json_provider import FastJSONProvider
+
+PAYLOAD = {
+    'success': True,
+    'data': [
+        {'market': '上海', 'metal': 'silver', 'spot_price': 7.8125, 'change': -0.1,
+         'date': datetime(2024, 1, 2, 3, 4, 5, 678901),
+         'valid_until': datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=8))),
+         'day': date(2024, 1, 2), 'volume': 10 ** 12, 'note': None, 'amount': Decimal('1.50')},
+    ],
+    'counts': {1: 'one', 2: 'two'},
+    'empty': {'list': [], 'dict': {}},
+}
+
+
+def provider(monkeypatch, backend):
+    monkeypatch.setattr(config, 'JSON_PROVIDER', backend)
+    return FastJSONProvider(Flask('json'))
+
+
+@pytest.mark.parametrize('indent', [False, True])
+def test_orjson_and_stdlib_output_match(monkeypatch, indent):
+    pytest.importorskip('orjson')
+    fast = provider(monkeypatch, 'orjson')
+    std = provider(monkeypatch, 'json')
+    assert fast.use_orjson and not std.use_orjson
+    assert fast.dumpb(PAYLOAD, indent) == std.dumpb(PAYLOAD, indent)
+    assert fast.dumps(PAYLOAD) == std.dumps(PAYLOAD)
+
+
+def test_datetimes_are_iso_seconds_in_utc(monkeypatch):
+    row = json.loads(provider(monkeypatch, 'json').dumpb(PAYLOAD))['data'][0]
+    # 无时区的按 UTC 处理，微秒截去
+    assert row['date'] == '2024-01-02T03:04:05+00:00'
+    assert row['valid_until'] == '2024-01-02T03:04:05+08:00'
+    assert row['day'] == '2024-01-02'
+    assert row['amount'] == '1.50'
+    # 中文不转义
+    assert '上海'.encode('utf-8') in provider(monkeypatch, 'json').dumpb(PAYLOAD)
+
+
+def test_falls_back_to_stdlib_without_orjson(monkeypatch):
+    monkeypatch.setattr(json_provider, 'ORJSON_AVAILABLE', False)
+    assert not provider(monkeypatch, 'auto').use_orjson
+    with pytest.raises(RuntimeError):
+        provider(monkeypatch, 'orjson')
+
+
+@pytest.mark.parametrize('backend', ['auto', 'json'])
+def test_jsonify_responses_use_provider(monkeypatch, backend):
+    monkeypatch.setattr(config, 'JSON_PROVIDER', backend)
+    app = Flask('json')
+    app.json = FastJSONProvider(app)
+    with app.app_context():
+        response = jsonify(PAYLOAD)
+    assert response.mimetype == 'application/json'
+    assert response.get_data() == app.json.dumpb(PAYLOAD) + b'\n'
+    assert app.json.loads(response.get_data())['counts'] == {'1': 'one', '2': 'two'}
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+测试结构迁移、查询计划与分页
+验证旧库可原地升级，且各 API 端点实际执行的查询 (测试客户端请求时捕获的 SQL) 都走索引
+"""
+
+import sys
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+import app as app_module
+import response_cache
+from config import config
+from models import Base, ComexWarehouse, SilverPrice, valid_since
+from pagination import decode_cursor, encode_cursor, keyset_page
+from migrations import migrate, get_schema_version, SCHEMA_VERSION
+from json_provider import FastJSONProvider
+from snapshot_store import SnapshotStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """创建一个没有任何索引的旧版数据库 (schema v0)"""
+    path = str(tmp_path / 'silver_gold.db')
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='index' AND sql IS NOT NULL").fetchall():
+        conn.execute(f"DROP INDEX {name}")
+    conn.execute("CREATE INDEX idx_price_market ON silver_price(market)")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    migrate(conn)
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def engine(db_path):
+    engine = create_engine(f'sqlite:///{db_path}')
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    s = sessionmaker(bind=engine)()
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def captured(engine, tmp_path, monkeypatch):
+    """记录经由 engine 执行的 (SQL, 参数)"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    # 表中有数据，快照加载会查询每个键的最新一行
+    s = sessionmaker(bind=engine)()
+    s.add(SilverPrice(market='London', metal='silver', spot_price=30.0, date=datetime.utcnow()))
+    s.add(ComexWarehouse(source='CME', metal='silver', total_oz=1.0, date=datetime.utcnow()))
+    s.commit()
+    s.close()
+    monkeypatch.setattr(config, 'ARCHIVE_DIR', str(tmp_path / 'archive'))
+    event.listen(engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    monkeypatch.setattr(app_module, 'ReadSession', sessionmaker(bind=engine))
+    monkeypatch.setattr(response_cache, 'response_cache', response_cache.ResponseCache())
+    app = Flask('plans')
+    app.json = FastJSONProvider(app)
+    app.register_blueprint(app_module.api)
+    return app.test_client()
+
+
+def query_plans(engine, statements):
+    """每条 SQL 的 EXPLAIN QUERY PLAN 明细文本"""
+    conn = engine.raw_connection()
+    try:
+        return [(statement, ' | '.join(
+                    row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)))
+                for statement, parameters in statements]
+    finally:
+        conn.close()
+
+
+def assert_indexed(engine, label, statements, index_name):
+    assert statements, f"{label}: 没有执行任何查询"
+    plans = query_plans(engine, statements)
+    for statement, plan in plans:
+        assert 'TEMP B-TREE' not in plan, f"{label} 需要额外排序: {statement}: {plan}"
+        # 每张表都按索引 (或主键) 访问，不做全表扫描
+        for step in plan.split(' | '):
+            assert not step.startswith('SCAN') or 'INDEX' in step, f"{label} 全表扫描: {statement}: {plan}"
+    assert any(index_name in plan for _, plan in plans), f"{label}: {plans}"
+
+
+def test_migrate_upgrades_in_place(db_path):
+    conn = sqlite3.connect(db_path)
+    assert get_schema_version(conn) == SCHEMA_VERSION
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert 'ix_silver_price_market_metal_date' in names
+    assert 'ix_comex_warehouse_source_metal_date' in names
+    assert 'idx_price_market' not in names
+    # 重复执行不做任何事
+    assert migrate(conn) == SCHEMA_VERSION
+    conn.close()
+
+
+START = datetime.utcnow() - timedelta(days=30)
+CURSOR = encode_cursor({'date': datetime.utcnow() - timedelta(days=3), 'id': 12345})
+
+ENDPOINTS = {
+    '/api/price/all': 'ix_silver_price_date',
+    f'/api/price/all?cursor={CURSOR}': 'ix_silver_price_date',
+    '/api/price/by-market/Comex': 'ix_silver_price_market_date',
+    f'/api/price/by-market/Comex?cursor={CURSOR}': 'ix_silver_price_market_date',
+    '/api/price/candles?market=Comex&metal=silver&interval=1d': 'ux_price_candle_series',
+    '/api/comex/warehouse': 'ix_comex_warehouse_date',
+    '/api/etf/holdings': 'ix_silver_etf_date',
+    '/api/etf/latest': 'ix_silver_etf_date',
+    f'/api/analytics?category=认知层级&cursor={CURSOR}': 'ix_gold_data_category_date',
+    '/api/analytics/summary': 'ix_gold_data_category_date',
+    '/api/logs': 'ix_data_log_created_at',
+}
+
+
+@pytest.mark.parametrize('endpoint', sorted(ENDPOINTS))
+def test_endpoint_query_uses_index(engine, captured, client, endpoint):
+    response = client.get(endpoint)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert_indexed(engine, endpoint, captured, ENDPOINTS[endpoint])
+
+
+def test_snapshot_seed_uses_index(engine, captured):
+    """最新快照接口读取内存快照，数据库查询只在启动加载时执行"""
+    SnapshotStore().seed_from_db(sessionmaker(bind=engine))
+    prices = [item for item in captured if 'silver_price' in item[0]]
+    warehouses = [item for item in captured if 'comex_warehouse' in item[0]]
+    assert_indexed(engine, '/api/price/latest', prices, 'ix_silver_price_market_metal_date')
+    assert_indexed(engine, '/api/comex/latest', warehouses, 'ix_comex_warehouse_source_metal_date')
+
+
+def test_keyset_pages_cover_all_rows_once(session):
+    """相同 date 的行跨页时不重复、不遗漏"""
+    base = datetime.utcnow() - timedelta(hours=1)
+    session.add_all(SilverPrice(market='Comex', metal='silver', spot_price=float(i),
+                                date=base + timedelta(seconds=i // 3)) for i in range(50))
+    session.commit()
+
+    seen, token = [], None
+    while True:
+        query = session.query(SilverPrice).filter(valid_since(SilverPrice, START))
+        rows, token = keyset_page(query, SilverPrice, lambda item: {'date': item.date, 'id': item.id},
+                                  7, decode_cursor(token))
+        assert len(rows) <= 7
+        seen += [(row['date'], row['id']) for row in rows]
+        if token is None:
+            break
+    assert len(seen) == 50
+    assert seen == sorted(set(seen), reverse=True)
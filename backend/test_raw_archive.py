@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+测试原始报表归档
+相同内容只保存一次、旧布局导入、已结束日期打包后仍可按哈希读取
+"""
+
+import sys
+import os
+import hashlib
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from raw_archive import RawReportArchive
+
+REPORT = b'Silver_stocks.xls v1'
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return RawReportArchive(tmp_path / 'raw')
+
+
+def test_identical_reports_are_stored_once(archive):
+    first = archive.store('CME', 'Silver_stocks.xls', REPORT, day='2024-01-02')
+    again = archive.store('CME', 'Silver_stocks.xls', REPORT, day='2024-01-02')
+    assert first == again == hashlib.sha256(REPORT).hexdigest()
+    assert len(list(archive.objects_path.rglob('*'))) == 2  # 前缀目录 + 对象
+    # 同一天只记录一次索引
+    assert archive._index_file('2024-01-02').read_text().count('\n') == 1
+    assert archive.load(first) == REPORT
+
+
+def test_import_pack_and_load_round_trip(archive):
+    # 旧布局: data/raw/<source>/<YYYY-MM-DD>/<filename>
+    reports = {
+        ('2024-01-02', 'Silver_stocks.xls'): REPORT,
+        ('2024-01-03', 'Silver_stocks.xls'): REPORT,
+        ('2024-01-03', 'Gold_stocks.xls'): b'Gold_stocks.xls v1',
+    }
+    for (day, filename), content in reports.items():
+        path = archive.base_path / 'CME' / day / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+
+    assert archive.import_legacy() == 3
+    assert not (archive.base_path / 'CME').exists()
+    assert {entry['filename'] for entry in archive.hashes_for('2024-01-03', 'CME')} == \
+        {'Silver_stocks.xls', 'Gold_stocks.xls'}
+
+    # 两份不同内容，各打包进首次出现的日期
+    assert archive.pack_closed_days('2024-01-04') == 2
+    assert sorted(p.name for p in archive.packs_path.iterdir()) == ['2024-01-02.zip', '2024-01-03.zip']
+    assert not list(archive.objects_path.rglob('*'))
+
+    # 新实例只读磁盘: 审计链上的哈希仍可解析
+    reopened = RawReportArchive(archive.base_path)
+    for (day, filename), content in reports.items():
+        [entry] = [e for e in reopened.hashes_for(day) if e['filename'] == filename]
+        assert reopened.load(entry['hash']) == content
+    # 已打包的内容再次出现不重复保存
+    reopened.store('CME', 'Silver_stocks.xls', REPORT, day='2024-01-04')
+    assert not list(archive.objects_path.rglob('*'))
+
+
+def test_day_rollover_packs_previous_day(archive):
+    archive.store('CME', 'Silver_stocks.xls', REPORT, day='2024-01-02')
+    assert not archive.packs_path.exists()
+    archive.store('CME', 'Silver_stocks.xls', b'Silver_stocks.xls v2', day='2024-01-03')
+    assert [p.name for p in archive.packs_path.iterdir()] == ['2024-01-02.zip']
+    assert archive.load(hashlib.sha256(REPORT).hexdigest()) == REPORT
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+测试响应缓存
+按字节数限制大小、数据版本变化时移除条目、并发未命中只计算一次 (single-flight)、
+最新快照接口的 ETag 只由取值决定
+"""
+
+import sys
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import app as app_module
+import response_cache
+import write_batch
+from models import Base, ComexWarehouse
+from change_writer import ChangeOnlyWriter
+from snapshot_store import SnapshotStore
+from json_provider import FastJSONProvider
+from response_cache import DataVersions, ResponseCache, etag_route
+
+
+def body(size):
+    return lambda: (b'x' * size, size)
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = ResponseCache(max_entries=100, max_bytes=1000, max_entry_bytes=400)
+    for i in range(5):
+        cache.get_or_compute(i, (0,), body(300))
+    # 1000 字节只能容纳 3 个 300 字节的条目，最早的被移除
+    assert cache.stats()['entries'] == 3
+    assert cache.stats()['bytes'] == 900
+    assert cache.get_or_compute(0, (0,), body(300))[1] == 'MISS'
+    assert cache.get_or_compute(4, (0,), body(300))[1] == 'HIT'
+
+    # 超过单条上限的响应不缓存
+    cache.get_or_compute('big', (0,), body(500))
+    assert cache.get_or_compute('big', (0,), body(500))[1] == 'MISS'
+    assert cache.stats()['bytes'] <= 1000
+
+
+def test_version_bump_evicts_dependent_entries():
+    versions = DataVersions()
+    cache = ResponseCache()
+    versions.add_listener(cache.invalidate)
+
+    cache.get_or_compute('prices', versions.get(['silver_price']), body(10), tables=('silver_price',))
+    cache.get_or_compute('etf', versions.get(['silver_etf']), body(10), tables=('silver_etf',))
+    versions.bump('silver_price')
+    stats = cache.stats()
+    assert (stats['entries'], stats['bytes']) == (1, 10)
+    assert cache.get_or_compute('etf', versions.get(['silver_etf']), body(10), tables=('silver_etf',))[1] == 'HIT'
+
+
+def test_fill_overtaken_by_commit_is_not_cached():
+    versions = DataVersions()
+    cache = ResponseCache()
+    versions.add_listener(cache.invalidate)
+
+    def compute():
+        # 查询期间有新提交
+        versions.bump('silver_price')
+        return b'old', 3
+
+    cache.get_or_compute('prices', versions.get(['silver_price']), compute, tables=('silver_price',))
+    assert cache.stats()['entries'] == 0
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResponseCache()
+    calls = []
+    start = threading.Barrier(16)
+    results = []
+
+    def compute():
+        calls.append(1)
+        # 其余线程在计算期间到达
+        time.sleep(0.2)
+        return b'rows', 4
+
+    def request():
+        start.wait()
+        results.append(cache.get_or_compute('history', (1,), compute))
+
+    threads = [threading.Thread(target=request) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert [state for _, state in results].count('MISS') == 1
+    assert {result for result, _ in results} == {b'rows'}
+    stats = cache.stats()
+    assert (stats['misses'], stats['coalesced']) == (1, 15)
+
+
+def test_waiters_see_the_fill_error():
+    cache = ResponseCache()
+    entered = threading.Event()
+    errors = []
+
+    def compute():
+        entered.set()
+        time.sleep(0.1)
+        raise RuntimeError('database is locked')
+
+    def waiter():
+        entered.wait()
+        try:
+            cache.get_or_compute('history', (1,), lambda: (b'unused', 6))
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    try:
+        cache.get_or_compute('history', (1,), compute)
+    except RuntimeError:
+        pass
+    thread.join()
+    assert errors == ['database is locked']
+    # 失败的计算不留下进行中的记录，下一次请求重新计算
+    assert cache.get_or_compute('history', (1,), lambda: (b'rows', 4)) == (b'rows', 'MISS')
+
+
+def test_etag_is_shared_by_workers_with_different_versions():
+    # 两个 worker 的本地快照版本号不同，内容相同时 ETag 相同
+    data = {'Comex': {'silver': 30.0}}
+    versions = {'a': 3, 'b': 17}
+    apps = {}
+    for worker in versions:
+        app = Flask(worker)
+        app.add_url_rule('/latest', 'latest', etag_route(lambda w=worker: f"price-{versions[w]}")(
+            lambda: jsonify(data)))
+        apps[worker] = app.test_client()
+
+    first = apps['a'].get('/latest')
+    etag = first.headers['ETag']
+    assert apps['b'].get('/latest').headers['ETag'] == etag
+    assert apps['b'].get('/latest', headers={'If-None-Match': etag}).status_code == 304
+
+    # worker b 有新数据 (版本变化): 旧 ETag 不再匹配
+    data['Comex']['silver'] = 30.5
+    versions['b'] += 1
+    response = apps['b'].get('/latest', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+
+START = datetime(2024, 1, 2, 9, 30)
+
+
+class Worker:
+    """挂载 API 蓝图的应用 (不经过 create_app，不启动采集)，快照与响应缓存都是本 worker 独有的"""
+
+    def __init__(self, monkeypatch, store):
+        self.monkeypatch = monkeypatch
+        self.store = store
+        self.cache = ResponseCache()
+        app = Flask('snapshot')
+        app.json = FastJSONProvider(app)
+        app.register_blueprint(app_module.api)
+        self.client = app.test_client()
+
+    def get(self, path, etag=None):
+        self.monkeypatch.setattr(app_module, 'snapshot_store', self.store)
+        self.monkeypatch.setattr(response_cache, 'response_cache', self.cache)
+        return self.client.get(path, headers={'If-None-Match': etag} if etag else {})
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'silver_gold.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def leader(session_factory, monkeypatch):
+    worker = Worker(monkeypatch, SnapshotStore())
+    monkeypatch.setattr(write_batch, 'snapshot_store', worker.store)
+    monkeypatch.setattr(write_batch, 'change_writer', ChangeOnlyWriter())
+    worker.batch = write_batch.WriteBatch(session_factory, session_factory)
+    return worker
+
+
+def collect_warehouse(batch, seconds, registered=120.0):
+    """一个采集周期: 写入 CME 白银库存并发布"""
+    mark = batch.mark()
+    batch.stage(ComexWarehouse(source='CME', metal='silver', total_oz=300.0, registered_oz=registered,
+                               eligible_oz=180.0, quality='REALTIME', date=START + timedelta(seconds=seconds)))
+    batch.tag(mark, 'warehouse')
+    batch.commit()
+
+
+@pytest.mark.parametrize('path', ['/api/comex/latest', '/api/inventory/aggregated'])
+def test_unchanged_inventory_cycles_return_304(leader, session_factory, monkeypatch, path):
+    collect_warehouse(leader.batch, 0)
+    first = leader.get(path)
+    etag = first.headers['ETag']
+    assert first.headers['X-Last-Confirmed'] == '2024-01-02 09:30:00'
+
+    # 取值未变化的两个采集周期: 仍返回 304，确认时间由响应头单独给出
+    for seconds in (2, 4):
+        collect_warehouse(leader.batch, seconds)
+        response = leader.get(path, etag)
+        assert response.status_code == 304
+    assert response.headers['X-Last-Confirmed'] == '2024-01-02 09:30:04'
+
+    # 另一个 worker 启动时从数据库加载: valid_until/updated_at 与 leader 内存中的行不同，取值相同时 ETag 相同
+    follower = Worker(monkeypatch, SnapshotStore())
+    follower.store.seed_from_db(session_factory)
+    assert follower.store.get('warehouse', 'CME', 'silver')['valid_until'] == START + timedelta(seconds=4)
+    assert follower.get(path, etag).status_code == 304
+
+    # 取值变化: 新的 ETag
+    collect_warehouse(leader.batch, 6, registered=121.0)
+    response = leader.get(path, etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
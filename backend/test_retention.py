@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+测试数据保留
+过期行跨多个批次删除、较新的行保留，过期行的范围由时间列索引确定
+"""
+
+import sys
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from sqlalchemy import create_engine
+from models import Base
+from retention import purge_table
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    path = str(tmp_path / 'silver_gold.db')
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    conn = sqlite3.connect(path)
+    yield conn
+    conn.close()
+
+
+def insert_prices(conn, ages_in_days):
+    conn.executemany(
+        "INSERT INTO silver_price (market, metal, spot_price, date) VALUES ('Comex', 'silver', ?, ?)",
+        [(30.0 + i, (NOW - timedelta(days=age)).strftime('%Y-%m-%d %H:%M:%S'))
+         for i, age in enumerate(ages_in_days)]
+    )
+    conn.commit()
+
+
+def test_purge_spans_several_batches_and_keeps_newer_rows(conn):
+    # 过期行与较新的行主键交错 (补采的历史数据)，并在末尾追加一段新数据
+    ages = [400 if i % 3 else 10 for i in range(95)] + [1] * 20
+    insert_prices(conn, ages)
+    expired = sum(1 for age in ages if age > 365)
+
+    statements = []
+    conn.set_trace_callback(statements.append)
+    assert purge_table(conn, 'silver_price', 365, batch_size=10, pause=0, now=NOW) == expired
+    conn.set_trace_callback(None)
+
+    deletes = [sql for sql in statements if sql.startswith('DELETE')]
+    assert len(deletes) > 5
+    remaining = conn.execute("SELECT COUNT(*), MIN(date) FROM silver_price").fetchone()
+    assert remaining[0] == len(ages) - expired
+    assert remaining[1] >= (NOW - timedelta(days=365)).strftime('%Y-%m-%d %H:%M:%S')
+    # 再次执行: 没有过期行，不开启写事务
+    statements.clear()
+    conn.set_trace_callback(statements.append)
+    assert purge_table(conn, 'silver_price', 365, batch_size=10, pause=0, now=NOW) == 0
+    conn.set_trace_callback(None)
+    assert not [sql for sql in statements if sql.startswith(('BEGIN', 'DELETE'))]
+
+
+def test_expired_range_is_found_through_the_date_index(conn):
+    insert_prices(conn, [400] * 5 + [1] * 10)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    purge_table(conn, 'silver_price', 365, pause=0, now=NOW)
+    conn.set_trace_callback(None)
+
+    # purge_table 实际执行的查询 (不含 DELETE 与事务语句)
+    selects = [sql for sql in statements if sql.startswith('SELECT')]
+    assert selects
+    for sql in selects:
+        plan = ' | '.join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+        assert 'ix_silver_price_date' in plan, f"{sql}: {plan}"
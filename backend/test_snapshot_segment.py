@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+测试最新快照的共享内存段
+采集持续失败时 heartbeat 照常刷新，读取方按 last_publish 判断段已过期；
+取值未变化的周期只前移 last_publish
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from snapshot_store import SnapshotStore
+from snapshot_segment import SEQ_INDEX, SnapshotSegmentReader, SnapshotSegmentWriter
+
+
+def publish(store, confirmed_at):
+    store.publish('price', [{
+        'id': 1, 'market': 'Comex', 'metal': 'silver', 'futures_price': 30.0,
+        'date': confirmed_at - timedelta(hours=2), 'valid_until': confirmed_at,
+    }])
+
+
+def open_segment(tmp_path, confirmed_at):
+    path = str(tmp_path / 'silver_gold.db.snapshot')
+    store = SnapshotStore()
+    publish(store, confirmed_at)
+    writer = SnapshotSegmentWriter(path, store)
+    writer.start()
+    return writer, SnapshotSegmentReader(path)
+
+
+def test_recently_confirmed_segment_is_used(tmp_path):
+    writer, reader = open_segment(tmp_path, datetime.utcnow())
+    try:
+        assert reader.fresh()
+        assert reader.quotes(['hf_SI'])['hf_SI']['price'] == 30.0
+    finally:
+        writer.stop()
+
+
+def test_segment_with_live_heartbeat_but_old_data_is_stale(tmp_path):
+    # 采集持续失败: 写入方进程在运行 (heartbeat 刚刷新)，但数据很久没有确认
+    writer, reader = open_segment(tmp_path, datetime.utcnow() - timedelta(seconds=config.SNAPSHOT_SEGMENT_MAX_AGE + 5))
+    try:
+        assert reader.last_publish() is not None
+        assert not reader.fresh()
+        assert reader.read() is None
+        assert reader.quotes(['hf_SI']) == {}
+    finally:
+        writer.stop()
+
+
+def test_unchanged_values_only_advance_last_publish(tmp_path):
+    old = datetime.utcnow() - timedelta(seconds=config.SNAPSHOT_SEGMENT_MAX_AGE + 5)
+    writer, reader = open_segment(tmp_path, old)
+    try:
+        assert not reader.fresh()
+        seq = reader._words[SEQ_INDEX]
+        # 采集周期确认了相同的取值: 段中的行与 seq 不变，段重新可用
+        writer.store.confirm('price', datetime.utcnow())
+        assert reader.fresh()
+        assert reader.seq() == seq
+        assert reader.read()[1]['price']['Comex']['silver']['valid_until'] == old
+    finally:
+        writer.stop()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+测试 SSE 推送
+断线重连时按 Last-Event-ID 补发、缓冲淘汰后改发完整快照
+"""
+
+import sys
+import os
+import json
+from datetime import datetime, timedelta
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from config import config
+from snapshot_store import SnapshotStore
+from stream_hub import StreamHub
+
+START = datetime(2024, 1, 2, 9, 30)
+
+
+@pytest.fixture
+def store():
+    return SnapshotStore()
+
+
+@pytest.fixture
+def hub(store, monkeypatch):
+    monkeypatch.setattr(config, 'STREAM_HISTORY_SIZE', 4)
+    return StreamHub(store, dumps=lambda data: json.dumps(data, default=str))
+
+
+def publish(store, prices, step):
+    """一次发布 (一个版本)，prices: {金属: 价格}"""
+    store.publish('price', [
+        {'id': step * 10 + i, 'market': 'Comex', 'metal': metal, 'spot_price': price,
+         'date': START + timedelta(seconds=step)}
+        for i, (metal, price) in enumerate(prices.items())
+    ])
+
+
+def event_ids(chunks):
+    return [line.split(b': ', 1)[1].decode() for chunk in chunks
+            for line in chunk.split(b'\n') if line.startswith(b'id: ')]
+
+
+def event_names(chunks):
+    return [line.split(b': ', 1)[1].decode() for chunk in chunks
+            for line in chunk.split(b'\n') if line.startswith(b'event: ')]
+
+
+def connect(hub, last_event_id=None):
+    """建立连接并取出重连补发的内容 (retry 指令之后的第一段)"""
+    stream = hub.stream(last_event_id)
+    next(stream)
+    first = next(stream)
+    stream.close()
+    return first
+
+
+def test_new_client_gets_snapshot(hub, store):
+    publish(store, {'silver': 30.0}, 1)
+    assert event_names([connect(hub)]) == ['snapshot']
+
+
+def test_replay_after_last_event_id(hub, store):
+    publish(store, {'silver': 30.0}, 1)
+    last_id = event_ids([hub.snapshot_event()])[0]
+    publish(store, {'silver': 30.1}, 2)
+    publish(store, {'silver': 30.2, 'gold': 2000.0}, 3)
+
+    replay = connect(hub, last_id)
+    # 同一品种合并为最新的一条
+    assert event_names([replay]) == ['price', 'price']
+    assert b'30.2' in replay and b'30.1' not in replay
+    # 已是最新版本: 不补发
+    current = event_ids([hub.snapshot_event()])[0]
+    assert hub._replay(current) == []
+
+
+def test_evicted_versions_fall_back_to_snapshot(hub, store):
+    publish(store, {'silver': 30.0}, 1)
+    last_id = event_ids([hub.snapshot_event()])[0]
+    publish(store, {'silver': 30.1, 'gold': 2000.0, 'copper': 4.0}, 2)
+    # 第 2 个版本的 3 个事件与第 3 个版本的 3 个事件超过缓冲上限 4: 第 2 个版本整个淘汰
+    publish(store, {'silver': 30.2, 'gold': 2001.0, 'copper': 4.1}, 3)
+    assert hub.stats()['history'] == 3
+
+    assert event_names([connect(hub, last_id)]) == ['snapshot']
+
+
+def test_foreign_event_id_gets_snapshot(hub, store):
+    publish(store, {'silver': 30.0}, 1)
+    assert event_names([connect(hub, 'unknown-1')]) == ['snapshot']
+    assert event_names([connect(hub, 'garbage')]) == ['snapshot']
+
+
+def test_event_id_from_another_worker_gets_snapshot(store, hub):
+    # 两个 worker 的版本号各自计数，数字相同也不能互相补发
+    other = StreamHub(store, dumps=hub.dumps)
+    publish(store, {'silver': 30.0}, 1)
+    other_id = event_ids([other.snapshot_event()])[0]
+    assert other_id.rsplit('-', 1)[1] == event_ids([hub.snapshot_event()])[0].rsplit('-', 1)[1]
+    assert event_names([connect(hub, other_id)]) == ['snapshot']
+
+
+def test_connections_beyond_capacity_are_rejected(store):
+    hub = StreamHub(store, max_clients=2)
+    assert hub.reserve() and hub.reserve()
+    assert not hub.reserve()
+    hub.release()
+    assert hub.reserve()
+    assert hub.stats()['rejected'] == 1
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+测试采集写入路径
+仅变更写入 (相同取值只延长 valid_until)、组提交后的快照发布
+"""
+
+import sys
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+# 添加backend路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import write_batch
+from models import Base, ComexWarehouse, SilverPrice, PriceCandle, PayloadBlob
+from change_writer import ChangeOnlyWriter
+from rollups import backfill_candles
+from retention import purge_orphan_blobs, purge_table
+from archive import archive_table, read_archive
+from data_collector import DataCollector
+from snapshot_store import SnapshotStore
+from write_batch import WriteBatch
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'silver_gold.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    """独立的写入层与快照存储，测试之间互不影响"""
+    writer = ChangeOnlyWriter()
+    monkeypatch.setattr(write_batch, 'change_writer', writer)
+    return writer
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = SnapshotStore()
+    monkeypatch.setattr(write_batch, 'snapshot_store', store)
+    return store
+
+
+@pytest.fixture
+def batch(session_factory, writer, store):
+    return WriteBatch(session_factory, session_factory)
+
+
+START = datetime(2024, 1, 2, 9, 30)
+
+
+def tick(price=30.0, seconds=0, market='Comex'):
+    return SilverPrice(market=market, metal='silver', spot_price=price, futures_price=price,
+                       source='test', quality='REALTIME', date=START + timedelta(seconds=seconds))
+
+
+def commit_tick(batch, row, kind='price'):
+    mark = batch.mark()
+    inserted = batch.stage(row)
+    batch.tag(mark, kind)
+    batch.commit()
+    return inserted
+
+
+def test_extension_only_records_confirmation(batch, store):
+    published = []
+    store.add_listener(lambda version, kind, rows: published.append(version))
+    for seconds in (0, 2, 4):
+        row = ComexWarehouse(source='CME', metal='silver', total_oz=300.0, registered_oz=120.0,
+                             eligible_oz=180.0, quality='REALTIME', date=START + timedelta(seconds=seconds))
+        commit_tick(batch, row, kind='warehouse')
+    first = store.get('warehouse', 'CME', 'silver')
+
+    # 相同取值的后两次提交不重新发布: 版本号与快照内容不变 (接口 ETag 与 SSE 不受影响)
+    assert published == [1]
+    assert store.kind_version('warehouse') == 1
+    assert first['valid_until'] == first['date'] == START
+    # 最近一次确认的时间单独记录
+    assert store.confirmed('warehouse') == START + timedelta(seconds=4)
+
+
+def test_unchanged_value_extends_valid_until(session_factory, writer):
+    session = session_factory()
+    first = tick(seconds=0)
+    assert writer.classify(session, first) is None
+    assert first.valid_until == first.date
+    session.add(first)
+    session.commit()
+
+    extension = writer.classify(session, tick(seconds=2))
+    assert extension['id'] == first.id
+    assert extension['valid_until'] == START + timedelta(seconds=2)
+    session.close()
+
+
+def test_changed_value_inserts(session_factory, writer):
+    session = session_factory()
+    session.add(tick(seconds=0))
+    session.commit()
+
+    changed = tick(price=30.5, seconds=2)
+    assert writer.classify(session, changed) is None
+    assert changed.valid_until == changed.date
+    # 序列键不同 (其他市场) 同样插入
+    assert writer.classify(session, tick(seconds=2, market='London')) is None
+    session.close()
+
+
+def test_max_span_forces_new_row(session_factory, writer):
+    session = session_factory()
+    session.add(tick(seconds=0))
+    session.commit()
+
+    assert writer.classify(session, tick(seconds=writer.max_span.total_seconds() - 1)) is not None
+    assert writer.classify(session, tick(seconds=writer.max_span.total_seconds())) is None
+    session.close()
+
+
+def test_batch_writes_one_row_per_unchanged_series(batch, session_factory):
+    assert commit_tick(batch, tick(seconds=0))
+    for i in range(1, 5):
+        assert not commit_tick(batch, tick(seconds=2 * i))
+    assert commit_tick(batch, tick(price=31.0, seconds=10))
+
+    session = session_factory()
+    rows = session.query(SilverPrice).order_by(SilverPrice.id).all()
+    assert [(row.spot_price, row.date, row.valid_until) for row in rows] == [
+        (30.0, START, START + timedelta(seconds=8)),
+        (31.0, START + timedelta(seconds=10), START + timedelta(seconds=10)),
+    ]
+    session.close()
+
+
+def test_backfill_keeps_candles_of_removed_raw_rows(batch, session_factory, tmp_path):
+    # 两天的报价，每个都写入K线
+    for day in range(2):
+        for i in range(3):
+            row = tick(price=30.0 + day + i, seconds=day * 86400 + i * 60)
+            batch.stage(row)
+            batch.add_candles('Comex', 'silver', row.spot_price, row.date)
+            batch.commit()
+
+    def daily():
+        session = session_factory()
+        bars = {bar.bucket_start.date(): (bar.open, bar.high, bar.low, bar.close)
+                for bar in session.query(PriceCandle).filter(PriceCandle.interval == '1d')}
+        session.close()
+        return bars
+
+    before = daily()
+    # 第一天的原始报价已归档/清理
+    session = session_factory()
+    session.query(SilverPrice).filter(SilverPrice.date < START + timedelta(days=1)).delete()
+    session.commit()
+    session.close()
+
+    conn = sqlite3.connect(str(tmp_path / 'silver_gold.db'))
+    backfill_candles(conn)
+    conn.close()
+    assert daily() == before
+
+
+def test_unchanged_tick_adds_no_blob(batch, session_factory):
+    collector = DataCollector(batch)
+    for i in range(3):
+        row = tick(seconds=2 * i)
+        # 上游报文带每次不同的时间戳
+        row.raw_payload = f'{{"price": 30.0, "ts": {i}}}'
+        row.mapping = '{"price": "api"}'
+        assert collector.stage(row, 'raw_payload', 'mapping') == (i == 0)
+        batch.commit()
+
+    session = session_factory()
+    hashes = {h for row in session.query(SilverPrice) for h in (row.raw_payload_hash, row.mapping_hash)}
+    assert {blob.hash for blob in session.query(PayloadBlob)} == hashes
+    assert len(hashes) == 2
+    session.close()
+
+
+def stage_with_payload(batch, price, seconds, payload):
+    """写入一行价格及其审计内容 (每行的报文不同)"""
+    row = tick(price=price, seconds=seconds)
+    row.raw_payload = payload
+    row.mapping = '{"price": "api"}'
+    mark = batch.mark()
+    DataCollector(batch).stage(row, 'raw_payload', 'mapping')
+    batch.tag(mark, 'price')
+    batch.commit()
+    return row
+
+
+def blob_hashes(session_factory):
+    session = session_factory()
+    try:
+        return {blob.hash for blob in session.query(PayloadBlob)}
+    finally:
+        session.close()
+
+
+def referenced_hashes(session_factory):
+    session = session_factory()
+    try:
+        return {h for row in session.query(SilverPrice) for h in (row.raw_payload_hash, row.mapping_hash)}
+    finally:
+        session.close()
+
+
+def test_purge_removes_blobs_of_deleted_rows(batch, session_factory, tmp_path):
+    for i in range(10):
+        stage_with_payload(batch, 30.0 + i, i * 86400, f'{{"price": {30.0 + i}, "day": {i}}}')
+    assert len(blob_hashes(session_factory)) == 11
+
+    conn = sqlite3.connect(str(tmp_path / 'silver_gold.db'))
+    # 保留最近 4 天: 删除 6 行，每批 2 行
+    now = START + timedelta(days=9, hours=1)
+    assert purge_table(conn, 'silver_price', 4, batch_size=2, pause=0, now=now) == 6
+    assert purge_orphan_blobs(conn, batch_size=3, pause=0) == 6
+    conn.close()
+    # 仍被引用的内容 (包括共用的 mapping) 保留
+    assert blob_hashes(session_factory) == referenced_hashes(session_factory)
+    assert len(blob_hashes(session_factory)) == 5
+
+
+def test_archived_rows_keep_payload_after_blob_purge(batch, session_factory, tmp_path):
+    payloads = {i: f'{{"price": {30.0 + i}, "day": {i}}}' for i in range(3)}
+    for i, payload in payloads.items():
+        stage_with_payload(batch, 30.0 + i, i * 86400, payload)
+
+    archive_dir = str(tmp_path / 'archive')
+    conn = sqlite3.connect(str(tmp_path / 'silver_gold.db'))
+    assert archive_table(conn, 'silver_price', START + timedelta(days=2), archive_dir) == 2
+    assert purge_orphan_blobs(conn, pause=0) == 2
+    conn.close()
+
+    rows = read_archive('silver_price', START - timedelta(days=1), archive_dir=archive_dir)
+    # 审计内容已内联写入归档文件
+    assert {row['raw_payload'] for row in rows} == {payloads[0], payloads[1]}
+    assert {row['mapping'] for row in rows} == {'{"price": "api"}'}
+    assert len(blob_hashes(session_factory)) == 2
+
+
+def test_latest_prices_resolve_payload_hash(batch, session_factory, monkeypatch):
+    import app as app_module
+    import response_cache
+    from flask import Flask
+    from json_provider import FastJSONProvider
+    monkeypatch.setattr(app_module, 'snapshot_store', write_batch.snapshot_store)
+    monkeypatch.setattr(app_module, 'ReadSession', session_factory)
+    monkeypatch.setattr(response_cache, 'response_cache', response_cache.ResponseCache())
+    stage_with_payload(batch, 30.0, 0, '{"price": 30.0}')
+
+    app = Flask('latest')
+    app.json = FastJSONProvider(app)
+    app.register_blueprint(app_module.api)
+    silver = app.test_client().get('/api/price/latest').get_json()['data']['Comex']['silver']
+    assert silver['raw_payload'] == '{"price": 30.0}'
+    assert silver['mapping'] == '{"price": "api"}'
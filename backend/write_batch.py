@@ -0,0 +1,191 @@
+"""
+采集周期写入批次 (组提交)
+一个采集周期内所有采集器的写入先在内存中累积，周期结束时在一个事务内批量写入：
+每类语句一次 executemany，整个周期只提交一次
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any
+import logging
+from sqlalchemy import event, insert, text, update
+try:
+    from models import Session, ReadSession, DataLog
+    from snapshot_store import snapshot_store, row_to_dict
+    from change_writer import change_writer
+    from rollups import UPSERT_CANDLE_SQL, candle_params
+    from blob_store import INSERT_BLOB_SQL, blob_store
+    from response_cache import data_versions
+except ImportError:
+    from backend.models import Session, ReadSession, DataLog
+    from backend.snapshot_store import snapshot_store, row_to_dict
+    from backend.change_writer import change_writer
+    from backend.rollups import UPSERT_CANDLE_SQL, candle_params
+    from backend.blob_store import INSERT_BLOB_SQL, blob_store
+    from backend.response_cache import data_versions
+
+logger = logging.getLogger(__name__)
+
+def column_values(row: Any) -> Dict[str, Any]:
+    """INSERT 参数：补齐列默认值并回写到对象上 (提交后的快照与数据库一致)，不含主键"""
+    values = {}
+    for column in type(row).__table__.columns:
+        if column.primary_key:
+            continue
+        value = getattr(row, column.key)
+        if value is None and column.default is not None:
+            value = column.default.arg if column.default.is_scalar else column.default.arg(None)
+            setattr(row, column.key, value)
+        values[column.key] = value
+    return values
+
+def insert_rows(connection, model, rows: List[Any]):
+    """一条 executemany 插入同一模型的多行，并回填自增主键
+    (写锁在事务内一直持有，同一批插入的 rowid 连续，最后一个即 last_insert_rowid())"""
+    connection.execute(insert(model.__table__), [column_values(row) for row in rows])
+    last_id = connection.execute(text("SELECT last_insert_rowid()")).scalar()
+    for offset, row in enumerate(rows):
+        row.id = last_id - len(rows) + 1 + offset
+
+class WriteBatch:
+    """累积插入行、valid_until 延长、K线更新、payload_blob 与采集日志，commit() 一次写入"""
+
+    def __init__(self, session_factory=Session, lookup_session_factory=ReadSession):
+        self.session_factory = session_factory
+        self.lookup_session_factory = lookup_session_factory
+        self.clear()
+
+    def clear(self):
+        self.inserts: List[List[Any]] = []          # [行, 快照类型]
+        self.extensions: List[List[Any]] = []       # [模型, 更新参数, 快照类型]
+        self.candles: List[Dict[str, Any]] = []
+        self.blobs: Dict[str, Dict[str, Any]] = OrderedDict()
+        self.logs: List[Dict[str, str]] = []
+
+    def mark(self) -> tuple:
+        """当前位置，采集失败时用 discard() 丢弃其后的写入"""
+        return (len(self.inserts), len(self.extensions), len(self.candles), len(self.blobs))
+
+    def discard(self, mark: tuple):
+        inserts, extensions, candles, blobs = mark
+        del self.inserts[inserts:]
+        del self.extensions[extensions:]
+        del self.candles[candles:]
+        for digest in list(self.blobs)[blobs:]:
+            del self.blobs[digest]
+
+    def tag(self, mark: tuple, kind: str):
+        """把 mark 之后插入和延长的行归入某个快照类型，提交后发布"""
+        for item in self.inserts[mark[0]:]:
+            item[1] = kind
+        for item in self.extensions[mark[1]:]:
+            item[2] = kind
+
+    def stage(self, row: Any) -> bool:
+        """暂存一行，返回是否插入新行；取值与上一行相同时只记录对上一行 valid_until 的延长"""
+        # 查找上一行走只读连接，不占用写连接
+        lookup = self.lookup_session_factory()
+        try:
+            extension = change_writer.classify(lookup, row)
+        finally:
+            lookup.close()
+        if extension is not None:
+            self.extensions.append([type(row), extension, None])
+            return False
+        self.inserts.append([row, None])
+        return True
+
+    def add_blob(self, payload: Optional[str]) -> Optional[str]:
+        """暂存一段审计内容，返回其哈希"""
+        if payload is None:
+            return None
+        params = blob_store.params(payload)
+        self.blobs.setdefault(params['hash'], params)
+        return params['hash']
+
+    def add_candles(self, market: str, metal: str, price: float, ts):
+        self.candles.extend(candle_params(market, metal, price, ts))
+
+    def add_log(self, source: str, status: str, message: str = ""):
+        self.logs.append({'source': source, 'status': status, 'message': message})
+
+    def commit(self) -> Dict[str, Any]:
+        """在一个事务内写入全部暂存内容，提交后发布快照；返回本次提交的统计"""
+        rows = len(self.inserts) + len(self.extensions) + len(self.candles) + len(self.blobs) + len(self.logs)
+        statements = [0]
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements[0] += 1
+
+        started = time.perf_counter()
+        session = self.session_factory()
+        try:
+            connection = session.connection()
+            event.listen(connection, 'before_cursor_execute', count_statement)
+            try:
+                if self.blobs:
+                    session.execute(text(INSERT_BLOB_SQL), list(self.blobs.values()))
+                updates: Dict[Any, List[Dict[str, Any]]] = OrderedDict()
+                for model, params, _ in self.extensions:
+                    updates.setdefault(model, []).append(params)
+                for model, params in updates.items():
+                    # 按主键批量 UPDATE
+                    session.execute(update(model), params)
+                inserts: Dict[Any, List[Any]] = OrderedDict()
+                for row, _ in self.inserts:
+                    inserts.setdefault(type(row), []).append(row)
+                if self.logs:
+                    inserts[DataLog] = [DataLog(**log) for log in self.logs]
+                for model, model_rows in inserts.items():
+                    insert_rows(connection, model, model_rows)
+                if self.candles:
+                    session.execute(text(UPSERT_CANDLE_SQL), self.candles)
+                staged = [(type(row), kind, row_to_dict(row)) for row, kind in self.inserts]
+            finally:
+                event.remove(connection, 'before_cursor_execute', count_statement)
+            flushed = time.perf_counter()
+            session.commit()
+            committed = time.perf_counter()
+        except Exception:
+            session.rollback()
+            self.clear()
+            raise
+        finally:
+            session.close()
+
+        # 写入过的表的缓存响应失效
+        touched = {model.__tablename__ for model in list(updates) + list(inserts)}
+        if self.candles:
+            touched.add('price_candle')
+        if self.blobs:
+            touched.add('payload_blob')
+        data_versions.bump(*sorted(touched))
+
+        published: Dict[str, List[Dict[str, Any]]] = OrderedDict()
+        for model, kind, snapshot in staged:
+            change_writer.remember(snapshot, model)
+            if kind:
+                published.setdefault(kind, []).append(snapshot)
+        for kind, snapshots in published.items():
+            snapshot_store.publish(kind, snapshots)
+        # 只延长了 valid_until 的行不重新发布 (快照版本、ETag 与 SSE 只随取值变化)，只记录确认时间
+        confirmed: Dict[str, Any] = {}
+        for _, params, kind in self.extensions:
+            if kind:
+                confirmed[kind] = max(confirmed.get(kind, params['valid_until']), params['valid_until'])
+        for kind, confirmed_at in confirmed.items():
+            snapshot_store.confirm(kind, confirmed_at)
+
+        stats = {
+            'inserted': len(self.inserts),
+            'extended': len(self.extensions),
+            'candles': len(self.candles),
+            'blobs': len(self.blobs),
+            'logs': len(self.logs),
+            'rows': rows,
+            'statements': statements[0],
+            'rows_per_statement': round(rows / statements[0], 2) if statements[0] else 0,
+            'write_ms': round((flushed - started) * 1000, 2),
+            'commit_ms': round((committed - flushed) * 1000, 2),
+        }
+        self.clear()
+        return stats
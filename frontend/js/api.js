@@ -4,6 +4,9 @@
 
 const API_BASE = 'http://127.0.0.1:5000/api';
 
+// 条件请求缓存: url -> { etag, data }，数据未变化时服务端返回 304
+const _validators = new Map();
+
 class APIClient {
     /**
      * 获取最新实时价格数据 (伦敦 vs 纽约)
@@ -33,21 +36,35 @@ class APIClient {
         try {
             const options = {
                 method: method,
-                headers: {
-                    'Content-Type': 'application/json',
-                }
+                headers: {},
+                // 由本模块自行处理 ETag，避免浏览器缓存再做一次重验证
+                cache: 'no-store'
             };
 
             if (data && method !== 'GET') {
+                options.headers['Content-Type'] = 'application/json';
                 options.body = JSON.stringify(data);
             }
 
+            const cached = method === 'GET' ? _validators.get(url) : null;
+            if (cached) {
+                options.headers['If-None-Match'] = cached.etag;
+            }
+
             const response = await fetch(url, options);
+            if (response.status === 304 && cached) {
+                return cached.data;
+            }
             if (!response.ok) {
                 throw new Error(`HTTP Error: ${response.status}`);
             }
 
-            return await response.json();
+            const result = await response.json();
+            const etag = response.headers.get('ETag');
+            if (method === 'GET' && etag) {
+                _validators.set(url, { etag, data: result });
+            }
+            return result;
         } catch (error) {
             console.error('API请求失败:', error);
             throw error;
@@ -74,6 +91,90 @@ class APIClient {
     }
 }
 
+/**
+ * 实时推送 (SSE): 采集提交后服务端只推送变化的品种，所有页面共享同一次广播；
+ * 断线后浏览器按 Last-Event-ID 自动续传，不支持 EventSource 或连接断开期间退回轮询
+ */
+class MarketStream {
+    /**
+     * @param {Function} onUpdate (state) => void，state = { price: {市场: {金属: 行}}, warehouse: {来源: {金属: 行}} }
+     * @param {Function} pollFn 轮询函数 (推送不可用时调用)
+     * @param {number} pollInterval 轮询间隔 (毫秒)
+     */
+    constructor(onUpdate, pollFn = null, pollInterval = 1000) {
+        this.onUpdate = onUpdate;
+        this.pollFn = pollFn;
+        this.pollInterval = pollInterval;
+        this.state = { price: {}, warehouse: {} };
+        this.source = null;
+        this.pollTimer = null;
+        this.pending = false;
+    }
+
+    start() {
+        if (typeof EventSource === 'undefined') {
+            this._startPolling();
+            return;
+        }
+        this.source = new EventSource(`${API_BASE}/stream`);
+        this.source.addEventListener('snapshot', (e) => {
+            this.state = JSON.parse(e.data);
+            this._emit();
+        });
+        ['price', 'warehouse'].forEach((kind) => {
+            this.source.addEventListener(kind, (e) => {
+                const { group, metal, row } = JSON.parse(e.data);
+                const groups = this.state[kind];
+                if (!groups[group]) groups[group] = {};
+                groups[group][metal] = row;
+                this._emit();
+            });
+        });
+        this.source.onopen = () => this._stopPolling();
+        // 浏览器会自动重连 (服务端 retry 间隔)，重连成功前由轮询兜底
+        this.source.onerror = () => this._startPolling();
+    }
+
+    stop() {
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+        this._stopPolling();
+    }
+
+    get running() {
+        return this.source !== null || this.pollTimer !== null;
+    }
+
+    /**
+     * 同一帧内的多条推送合并为一次界面更新
+     */
+    _emit() {
+        if (this.pending) return;
+        this.pending = true;
+        const schedule = typeof requestAnimationFrame === 'function' ? requestAnimationFrame : (fn) => setTimeout(fn, 0);
+        schedule(() => {
+            this.pending = false;
+            this.onUpdate(this.state);
+        });
+    }
+
+    _startPolling() {
+        if (!this.pollFn || this.pollTimer) return;
+        this.pollFn();
+        this.pollTimer = setInterval(this.pollFn, this.pollInterval);
+    }
+
+    _stopPolling() {
+        if (this.pollTimer) {
+            clearInterval(this.pollTimer);
+            this.pollTimer = null;
+        }
+    }
+}
+
 if (typeof module !== 'undefined' && module.exports) {
     module.exports = APIClient;
+    module.exports.MarketStream = MarketStream;
 }
@@ -2,7 +2,7 @@
  * Terminal#2-18 主控脚本
  */
 
-let autoUpdateInterval = null;
+let marketStream = null;
 let isUpdating = false;
 
 /**
@@ -15,12 +15,25 @@ document.addEventListener('DOMContentLoaded', () => {
 });
 
 /**
- * 启动自动刷新 (1秒一次)
+ * 启动自动刷新 (服务端推送，不可用时退回 1 秒一次的轮询)
  */
 function startAutoUpdate() {
-    if (autoUpdateInterval) clearInterval(autoUpdateInterval);
-    autoUpdateInterval = setInterval(updateAllData, 1000);
-    console.log('已启动秒级自动刷新');
+    if (marketStream) marketStream.stop();
+    marketStream = new MarketStream(applyStreamState, updateAllData, 1000);
+    marketStream.start();
+    console.log('已启动实时推送');
+}
+
+/**
+ * 推送状态 -> 与轮询接口相同结构的数据
+ */
+function applyStreamState(state) {
+    updatePriceUI(state.price);
+    updateInventoryUI({
+        comex: state.warehouse.CME || {},
+        lme: state.warehouse.LME || {}
+    });
+    document.getElementById('last-update').textContent = `最后更新: ${new Date().toLocaleTimeString()}`;
 }
 
 /**
@@ -28,9 +41,9 @@ function startAutoUpdate() {
  */
 function toggleAutoUpdate() {
     const btn = document.querySelector('.controls .btn:first-child');
-    if (autoUpdateInterval) {
-        clearInterval(autoUpdateInterval);
-        autoUpdateInterval = null;
+    if (marketStream) {
+        marketStream.stop();
+        marketStream = null;
         btn.textContent = '启动自动刷新';
         btn.style.backgroundColor = 'var(--accent-green)';
     } else {
@@ -8,9 +8,22 @@ document.addEventListener('DOMContentLoaded', () => {
     
     // 启动秒级刷新 (1s)
     setInterval(updateTime, 1000);
-    setInterval(refreshData, 2000); // 考虑到后端采集频率，数据每2秒拉取一次即可
+    // 数据由服务端推送；推送不可用时每2秒轮询一次
+    new MarketStream(applyStreamState, refreshData, 2000).start();
 });
 
+function applyStreamState(state) {
+    updatePriceTicker(state.price);
+    calculatePremiums(state.price);
+    updateInventoryDisplay({
+        comex: state.warehouse.CME || {},
+        lme: state.warehouse.LME || {},
+        shfe: state.warehouse.SHFE || {}
+    });
+    document.getElementById('last-update').textContent = `最后同步: ${new Date().toLocaleTimeString()}`;
+    document.getElementById('api-status').innerHTML = '<span class="up">● 正常</span>';
+}
+
 function updateTime() {
     const now = new Date();
     const timeStr = now.toLocaleTimeString('zh-CN', { hour12: false });
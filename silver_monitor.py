@@ -2,10 +2,11 @@ import os
 import time
 import sys
 import re
-import urllib.request
-import urllib.error
 from datetime import datetime
 
+from backend import http_client
+from backend.snapshot_segment import QuoteFeed
+
 # 强制禁用代理，防止 WinError 10061
 os.environ['http_proxy'] = ''
 os.environ['https_proxy'] = ''
@@ -37,10 +38,10 @@ class SinaSpiderFetcher:
         """
         url = self.base_url.format(",".join(codes))
         try:
-            req = urllib.request.Request(url, headers=self.headers)
-            with urllib.request.urlopen(req, timeout=5) as response:
-                content = response.read().decode('gbk', errors='ignore')
-                return self.parse_sina_response(content)
+            # 共享连接池: 每秒刷新时复用与新浪的长连接
+            response = http_client.get(url, headers=self.headers, timeout=5)
+            content = response.content.decode('gbk', errors='ignore')
+            return self.parse_sina_response(content)
         except Exception as e:
             return {}
 
@@ -120,6 +121,8 @@ def main():
     print("=== 启动实时行情监控 (Sina 直连版) ===")
     
     spider = SinaSpiderFetcher()
+    # 采集服务运行时读取共享快照段，否则直接请求新浪
+    quotes = QuoteFeed(spider.fetch_data)
     target_codes = ['hf_SI', 'hf_GC', 'hf_HG', 'fx_sxagusd', 'fx_sxauusd', 'nf_AG0', 'fx_usdcny'] 
 
     # 静态库存数据 (来源: 用户提供 2026/02/03 截图)
@@ -131,7 +134,7 @@ def main():
 
     try:
         while True:
-            data_map = spider.fetch_data(target_codes)
+            data_map = quotes.get(target_codes)
             sys_time = datetime.now().strftime("%H:%M:%S")
             
             # --- Helper ---
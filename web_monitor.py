@@ -2,10 +2,10 @@ import http.server
 import socketserver
 import os
 import re
-import urllib.request
-import urllib.error
 from datetime import datetime
 
+from backend import http_client
+
 # 强制禁用代理
 os.environ['http_proxy'] = ''
 os.environ['https_proxy'] = ''
@@ -27,10 +27,10 @@ class SinaSpiderFetcher:
     def fetch_data(self, codes):
         url = self.base_url.format(",".join(codes))
         try:
-            req = urllib.request.Request(url, headers=self.headers)
-            with urllib.request.urlopen(req, timeout=5) as response:
-                content = response.read().decode('gbk', errors='ignore')
-                return self.parse_sina_response(content)
+            # 共享连接池: 每秒刷新时复用与新浪的长连接
+            response = http_client.get(url, headers=self.headers, timeout=5)
+            content = response.content.decode('gbk', errors='ignore')
+            return self.parse_sina_response(content)
         except Exception as e:
             return {}
 
@@ -2,11 +2,13 @@ import http.server
 import socketserver
 import os
 import re
-import urllib.request
-import urllib.error
 import json
 from datetime import datetime
 
+from backend import http_client
+from backend.compression import StaticAsset, encode_body
+from backend.snapshot_segment import QuoteFeed
+
 # 强制禁用代理
 os.environ['http_proxy'] = ''
 os.environ['https_proxy'] = ''
@@ -28,10 +30,10 @@ class SinaSpiderFetcher:
     def fetch_data(self, codes):
         url = self.base_url.format(",".join(codes))
         try:
-            req = urllib.request.Request(url, headers=self.headers)
-            with urllib.request.urlopen(req, timeout=5) as response:
-                content = response.read().decode('gbk', errors='ignore')
-                return self.parse_sina_response(content)
+            # 共享连接池: 每秒刷新时复用与新浪的长连接
+            response = http_client.get(url, headers=self.headers, timeout=5)
+            content = response.content.decode('gbk', errors='ignore')
+            return self.parse_sina_response(content)
         except Exception as e:
             return {}
 
@@ -73,81 +75,9 @@ class SinaSpiderFetcher:
         return results
 
 # ==========================================
-# Web Server Handler (API + Static)
+# Dashboard Page
 # ==========================================
-class DashboardHandler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        # API Endpoint for JSON Data
-        if self.path == '/api/data':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            
-            # Fetch Live Data
-            spider = SinaSpiderFetcher()
-            # hf_SI: COMEX Silver Future, fx_sxagusd: London Silver Spot
-            # nf_AG0: Shanghai Silver Future
-            # hf_GC: COMEX Gold Future, fx_sxauusd: London Gold Spot
-            # hf_HG: Copper
-            codes = ['hf_SI', 'hf_GC', 'hf_HG', 'fx_sxagusd', 'fx_sxauusd', 'nf_AG0', 'fx_usdcny']
-            raw_data = spider.fetch_data(codes)
-            
-            # Helper
-            def get_val(code): return raw_data.get(code, {}).get('price', 0)
-            def get_time(code): return raw_data.get(code, {}).get('time', '--')
-
-            ldn_silver = get_val('fx_sxagusd')
-            cmx_silver = get_val('hf_SI')
-            sh_silver = get_val('nf_AG0')
-            usdcny = get_val('fx_usdcny')
-            
-            # Calculations
-            efp_silver = "N/A"
-            if isinstance(ldn_silver, float) and isinstance(cmx_silver, float):
-                efp_silver = f"${cmx_silver - ldn_silver:+.3f}"
-            
-            sh_premium = "N/A"
-            status_sh = "Neutral"
-            if isinstance(sh_silver, float) and isinstance(usdcny, float) and isinstance(ldn_silver, float):
-                try:
-                    sh_usd = (sh_silver / usdcny) / 32.1507
-                    prem = (sh_usd - ldn_silver) / ldn_silver * 100
-                    sh_premium = f"{prem:+.2f}%"
-                    if prem > 10: status_sh = "High Demand"
-                    elif prem < -1: status_sh = "Discount"
-                    else: status_sh = "Normal"
-                except: pass
-
-            # Construct JSON Response
-            response_data = {
-                "sys_time": datetime.now().strftime("%H:%M:%S"),
-                "prices": {
-                    "ldn_silver_spot": {"price": ldn_silver, "time": get_time('fx_sxagusd')},
-                    "ldn_gold_spot": {"price": get_val('fx_sxauusd'), "time": get_time('fx_sxauusd')},
-                    
-                    "cmx_silver_fut": {"price": cmx_silver, "time": get_time('hf_SI')},
-                    "cmx_gold_fut": {"price": get_val('hf_GC'), "time": get_time('hf_GC')},
-                    "cmx_copper": {"price": get_val('hf_HG'), "time": get_time('hf_HG')},
-                    
-                    "sh_silver_fut": {"price": sh_silver, "time": get_time('nf_AG0')},
-                },
-                "analysis": {
-                    "efp_silver": efp_silver,
-                    "sh_premium": sh_premium,
-                    "status_sh": status_sh
-                }
-            }
-            
-            self.wfile.write(json.dumps(response_data).encode('utf-8'))
-            return
-
-        # Serve Main HTML
-        if self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html; charset=utf-8')
-            self.end_headers()
-            
-            html = """
+DASHBOARD_HTML = """
 <!DOCTYPE html>
 <html lang="zh-CN">
 <head>
@@ -408,8 +338,99 @@ class DashboardHandler(http.server.SimpleHTTPRequestHandler):
 
 </body>
 </html>
-            """
-            self.wfile.write(html.encode('utf-8'))
+"""
+
+# 启动时压缩一次，之后每个请求直接发送对应编码的版本
+DASHBOARD_PAGE = StaticAsset(DASHBOARD_HTML.encode('utf-8'), 'text/html; charset=utf-8')
+
+# 行情源: 优先读取采集服务写入的共享快照段
+QUOTES = QuoteFeed(SinaSpiderFetcher().fetch_data)
+
+# ==========================================
+# Web Server Handler (API + Static)
+# ==========================================
+class DashboardHandler(http.server.SimpleHTTPRequestHandler):
+    def send_body(self, body, content_type, encoding=None):
+        self.send_response(200)
+        self.send_header('Content-type', content_type)
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_asset(self, asset):
+        body, encoding = asset.select(self.headers.get('Accept-Encoding'))
+        self.send_body(body, asset.content_type, encoding)
+
+    def do_GET(self):
+        # API Endpoint for JSON Data
+        if self.path == '/api/data':
+            # Live Data: 采集服务运行时读取共享快照段，否则直接请求新浪
+            # hf_SI: COMEX Silver Future, fx_sxagusd: London Silver Spot
+            # nf_AG0: Shanghai Silver Future
+            # hf_GC: COMEX Gold Future, fx_sxauusd: London Gold Spot
+            # hf_HG: Copper
+            codes = ['hf_SI', 'hf_GC', 'hf_HG', 'fx_sxagusd', 'fx_sxauusd', 'nf_AG0', 'fx_usdcny']
+            raw_data = QUOTES.get(codes)
+            
+            # Helper
+            def get_val(code): return raw_data.get(code, {}).get('price', 0)
+            def get_time(code): return raw_data.get(code, {}).get('time', '--')
+
+            ldn_silver = get_val('fx_sxagusd')
+            cmx_silver = get_val('hf_SI')
+            sh_silver = get_val('nf_AG0')
+            usdcny = get_val('fx_usdcny')
+            
+            # Calculations
+            efp_silver = "N/A"
+            if isinstance(ldn_silver, float) and isinstance(cmx_silver, float):
+                efp_silver = f"${cmx_silver - ldn_silver:+.3f}"
+            
+            sh_premium = "N/A"
+            status_sh = "Neutral"
+            if isinstance(sh_silver, float) and isinstance(usdcny, float) and isinstance(ldn_silver, float):
+                try:
+                    sh_usd = (sh_silver / usdcny) / 32.1507
+                    prem = (sh_usd - ldn_silver) / ldn_silver * 100
+                    sh_premium = f"{prem:+.2f}%"
+                    if prem > 10: status_sh = "High Demand"
+                    elif prem < -1: status_sh = "Discount"
+                    else: status_sh = "Normal"
+                except: pass
+
+            # Construct JSON Response
+            response_data = {
+                "sys_time": datetime.now().strftime("%H:%M:%S"),
+                "prices": {
+                    "ldn_silver_spot": {"price": ldn_silver, "time": get_time('fx_sxagusd')},
+                    "ldn_gold_spot": {"price": get_val('fx_sxauusd'), "time": get_time('fx_sxauusd')},
+                    
+                    "cmx_silver_fut": {"price": cmx_silver, "time": get_time('hf_SI')},
+                    "cmx_gold_fut": {"price": get_val('hf_GC'), "time": get_time('hf_GC')},
+                    "cmx_copper": {"price": get_val('hf_HG'), "time": get_time('hf_HG')},
+                    
+                    "sh_silver_fut": {"price": sh_silver, "time": get_time('nf_AG0')},
+                },
+                "analysis": {
+                    "efp_silver": efp_silver,
+                    "sh_premium": sh_premium,
+                    "status_sh": status_sh
+                }
+            }
+            
+            body, encoding = encode_body(
+                json.dumps(response_data).encode('utf-8'), 'application/json',
+                self.headers.get('Accept-Encoding')
+            )
+            self.send_body(body, 'application/json', encoding)
+            return
+
+        # Serve Main HTML (pre-compressed at startup)
+        if self.path == '/':
+            self.send_asset(DASHBOARD_PAGE)
         else:
             self.send_error(404)
 